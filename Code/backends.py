@@ -0,0 +1,282 @@
+"""
+Pluggable execution backends for sizing tasks: local processes, Dask or Ray.
+
+Every backend runs `fn(task, shared)` for a list of small tasks, where
+`shared` holds the large read-only inputs (profiles, parameter tables). The
+shared data is shipped once per worker, never once per task:
+
+  * local - a process pool whose initializer receives `shared`
+  * dask  - `Client.scatter(shared, broadcast=True)`; tasks reference the scattered future
+  * ray   - `ray.put(shared)`; one object-store copy per node, zero-copy numpy reads
+
+Results come back in task order in the `runner.run_tasks` format (`workers`
+gives the number of tasks the backend runs at once), failures are
+isolated per task, and the same call runs on a laptop (`local`, or `dask` /
+`ray` with no address, which start a local multi-process cluster) or on a
+cluster (`address=` the scheduler / head node).
+
+Remote workers don't need a checkout of this repository: Dask workers are sent
+a zip of the modules loaded here (`code_archive`), Ray workers get `Code/` in
+their runtime environment. Third-party packages (pyomo, the CBC binary,
+pandas, ...) still have to be installed on the workers.
+
+    backend = get_backend("dask", address="tcp://scheduler:8786")
+    results = backend.map(size_site, tasks, shared={"profiles": profiles})
+"""
+import base64
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from runner import error_message, task_result
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(CWD)
+
+BACKENDS = ["local", "dask", "ray"]
+
+# Module uploaded to Dask workers: unpacks the code archive next to itself and puts it on sys.path
+_DASK_BOOTSTRAP = """import base64, io, os, sys, zipfile
+
+_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), {name!r})
+zipfile.ZipFile(io.BytesIO(base64.b64decode({data!r}))).extractall(_path)
+if _path not in sys.path:
+    sys.path.insert(0, _path)
+"""
+
+# Set in each local worker by the pool initializer
+_SHARED = None
+
+
+def _call(fn, task, shared):
+    started = time.monotonic()
+    try:
+        return task_result(task, "ok", fn(task, shared), started)
+    except Exception as e:
+        return task_result(task, "error", error_message(e), started)
+
+
+def code_archive(file):
+    """
+    Zip every module loaded from this repository, laid out as an import root.
+
+    Only modules this process has already imported are included, so the archive
+    holds what the tasks need and nothing that runs on import (e.g. converter.py).
+
+    Args:
+        file (str or file-like): Where to write the zip.
+
+    Returns:
+        The `file` argument.
+    """
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, module in list(sys.modules.items()):
+            source = os.path.abspath(getattr(module, "__file__", None) or "")
+            if not source.endswith(".py") or not source.startswith(CWD + os.sep):
+                continue
+            if name == "__main__":
+                archive.write(source, os.path.basename(source))
+            elif os.path.basename(source) == "__init__.py":
+                archive.write(source, name.replace(".", "/") + "/__init__.py")
+            else:
+                archive.write(source, name.replace(".", "/") + ".py")
+    return file
+
+
+def _init_local(shared):
+    global _SHARED
+    _SHARED = shared
+
+
+def _call_local(fn, task):
+    return _call(fn, task, _SHARED)
+
+
+class LocalBackend:
+    """
+    Process pool on this machine; `shared` is sent to each worker once, at start-up.
+
+    Exceptions only fail their own task, but a worker that dies outright breaks the
+    pool and fails the tasks still queued; use `runner.run_tasks` where that matters.
+    """
+
+    name = "local"
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count()
+
+    @property
+    def workers(self):
+        return self.processes
+
+    def map(self, fn, tasks, shared=None, on_result=None, desc="Tasks"):
+        tasks = list(tasks)
+        results = [None] * len(tasks)
+        with ProcessPoolExecutor(self.processes, initializer=_init_local, initargs=(shared,)) as pool:
+            futures = {pool.submit(_call_local, fn, task): i for i, task in enumerate(tasks)}
+            for future in tqdm(as_completed(futures), total=len(tasks), desc=desc):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:  # the worker process died
+                    results[i] = task_result(tasks[i], "error", error_message(e), time.monotonic())
+                if on_result:
+                    on_result(results[i])
+        return results
+
+    def close(self):
+        pass
+
+
+class DaskBackend:
+    """
+    Dask distributed client.
+
+    Args:
+        address (str, optional): Scheduler address; without one a `LocalCluster` with
+            `processes` single-threaded workers is started.
+    """
+
+    name = "dask"
+
+    def __init__(self, address=None, processes=None):
+        from dask.distributed import Client, LocalCluster
+
+        if address:
+            self.client = Client(address)
+        else:
+            self.client = Client(LocalCluster(n_workers=processes or os.cpu_count(), threads_per_worker=1))
+        self._uploaded = set()
+
+    @property
+    def workers(self):
+        """Worker threads currently in the cluster (it may scale during a run)."""
+        return sum(self.client.nthreads().values())
+
+    def _upload_code(self):
+        """
+        Send workers the modules loaded since the last upload, which tasks unpickle against.
+
+        Workers keep modules they imported before, so restart long-lived workers after
+        changing the code.
+        """
+        loaded = {name for name, module in sys.modules.items()
+                  if (getattr(module, "__file__", None) or "").startswith(CWD + os.sep)}
+        if loaded <= self._uploaded:
+            return
+        # upload_file imports a .py (a .zip would have every module in it imported) and
+        # caches by file name, so each upload gets a new one
+        name = f"lcoe_code_{len(self._uploaded)}"
+        data = base64.b64encode(code_archive(io.BytesIO()).getvalue()).decode()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, name + ".py")
+            with open(path, "w") as f:
+                f.write(_DASK_BOOTSTRAP.format(name=name, data=data))
+            self.client.upload_file(path)
+        self._uploaded |= loaded
+
+    def map(self, fn, tasks, shared=None, on_result=None, desc="Tasks"):
+        from dask.distributed import as_completed as dask_as_completed
+
+        tasks = list(tasks)
+        self._upload_code()
+        # One copy per worker; tasks only carry a reference to it
+        shared_future = self.client.scatter(shared, broadcast=True) if shared is not None else None
+        futures = self.client.map(_call, [fn] * len(tasks), tasks, [shared_future] * len(tasks), pure=False)
+        index = {future.key: i for i, future in enumerate(futures)}
+        results = [None] * len(tasks)
+        for future in tqdm(dask_as_completed(futures), total=len(tasks), desc=desc):
+            i = index[future.key]
+            try:
+                results[i] = future.result()
+            except Exception as e:  # worker lost, deserialisation error, ...
+                results[i] = task_result(tasks[i], "error", error_message(e), time.monotonic())
+            if on_result:
+                on_result(results[i])
+        return results
+
+    def close(self):
+        self.client.close()
+
+
+class RayBackend:
+    """
+    Ray cluster.
+
+    Args:
+        address (str, optional): Head node address (e.g. 'ray://head:10001'); without one
+            Ray starts locally with `processes` CPUs.
+
+    The repository's code is shipped as the workers' working directory, with `Code/`
+    on their PYTHONPATH, so both the flat imports (`main`) and `Code.archive.assumptions`
+    resolve; inputs, outputs and other top-level directories are left out.
+    """
+
+    name = "ray"
+
+    def __init__(self, address=None, processes=None):
+        import ray
+
+        self.ray = ray
+        if not ray.is_initialized():
+            code_dir = os.path.basename(CWD)
+            runtime_env = {
+                "working_dir": ROOT,
+                "excludes": [f"/{name}" for name in os.listdir(ROOT) if name != code_dir] + ["__pycache__"],
+                # Relative to the working directory, which is the workers' cwd
+                "env_vars": {"PYTHONPATH": code_dir},
+            }
+            ray.init(address=address, num_cpus=None if address else processes, runtime_env=runtime_env)
+        self._call = ray.remote(num_cpus=1)(_call)
+
+    @property
+    def workers(self):
+        """CPUs in the cluster, i.e. how many single-CPU tasks can run at once."""
+        return int(self.ray.cluster_resources().get("CPU", 0))
+
+    def map(self, fn, tasks, shared=None, on_result=None, desc="Tasks"):
+        tasks = list(tasks)
+        shared_ref = self.ray.put(shared)
+        refs = [self._call.remote(fn, task, shared_ref) for task in tasks]
+        index = {ref: i for i, ref in enumerate(refs)}
+        results = [None] * len(tasks)
+        pending = list(refs)
+        with tqdm(total=len(tasks), desc=desc) as bar:
+            while pending:
+                done, pending = self.ray.wait(pending, num_returns=1)
+                i = index[done[0]]
+                try:
+                    results[i] = self.ray.get(done[0])
+                except Exception as e:  # worker or node died
+                    results[i] = task_result(tasks[i], "error", error_message(e), time.monotonic())
+                if on_result:
+                    on_result(results[i])
+                bar.update()
+        return results
+
+    def close(self):
+        pass
+
+
+def get_backend(name="local", address=None, processes=None):
+    """
+    Backend by name.
+
+    Raises:
+        ValueError: For an unknown backend name.
+        ImportError: If the backend's package (dask[distributed] or ray) is not installed.
+    """
+    if name == "local":
+        return LocalBackend(processes)
+    if name == "dask":
+        return DaskBackend(address, processes)
+    if name == "ray":
+        return RayBackend(address, processes)
+    raise ValueError(f"Unknown backend '{name}'; expected one of {BACKENDS}")
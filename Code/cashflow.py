@@ -0,0 +1,130 @@
+"""
+Year-by-year cash-flow LCOE for Solar+BESS, for every scenario at once.
+
+`lcoe.lcoe` assumes a flat annuity of output and opex over `solar_lifetime`.
+Here each scenario (row) gets explicit (row x year) matrices of
+
+  * capex            - solar + BESS at year 0
+  * replacement      - BESS capex again every `bess_lifetime` years within the horizon
+  * opex             - fixed opex every year
+  * energy           - served energy, derated by solar degradation (from year 0)
+                       and BESS fade (reset at each replacement)
+
+Cash flows fall at the start of each year (as in `lcoe.lcoe`'s annuity-due),
+and are discounted with one matrix-vector product per distinct discount
+rate. With zero degradation and no replacement inside the horizon the result
+equals `lcoe.lcoe`.
+"""
+import numpy as np
+import pandas as pd
+
+from lcoe_vec import HOURS_PER_YEAR, to_frac
+
+# Defaults used where the parameter frame has no column of that name
+CASHFLOW_DEFAULTS = {
+    "bess_lifetime": 15,                # years between BESS replacements
+    "bess_replacement_factor": 1.0,     # replacement cost as a share of the year's BESS capex
+    "solar_degradation": 0.005,         # fraction of output lost per year
+    "bess_degradation": 0.0,            # fraction of served energy lost per year of BESS age
+}
+
+
+def _column(params, name, n):
+    if name in params.columns:
+        return params[name].to_numpy(dtype=float)
+    return np.full(n, float(CASHFLOW_DEFAULTS[name]))
+
+
+def cashflow_matrices(params: pd.DataFrame, solar_capacity_mw, bess_capacity_mwh, availability) -> dict:
+    """
+    Build the (row x year) cash-flow and energy matrices.
+
+    Args:
+        params (pd.DataFrame): `SOLAR_BESS_PARAMS` columns, optionally plus any of CASHFLOW_DEFAULTS.
+        solar_capacity_mw, bess_capacity_mwh (array-like or scalar): Aligned with `params`' rows.
+        availability (float or array-like): Share of the year the load is served.
+
+    Returns:
+        dict: 'capex', 'replacement', 'opex', 'energy' (n_rows x horizon arrays, zero past each
+        row's lifetime), 'discount_rate' (fractions) and 'lifetime' (whole years).
+    """
+    n = len(params)
+    solar = np.broadcast_to(np.asarray(solar_capacity_mw, dtype=float), n)
+    bess = np.broadcast_to(np.asarray(bess_capacity_mwh, dtype=float), n)
+    lifetime = np.trunc(params["solar_lifetime"].to_numpy(dtype=float))
+    horizon = int(np.nanmax(lifetime)) if n and np.isfinite(lifetime).any() else 0
+
+    years = np.arange(horizon)[None, :]
+    in_life = years < lifetime[:, None]
+
+    bess_capex = bess * params["bess_capex"].to_numpy(dtype=float) * 1000
+    solar_capex = solar * params["solar_capex"].to_numpy(dtype=float) * 1000
+    capex = np.zeros((n, horizon))
+    if horizon:
+        capex[:, 0] = solar_capex + bess_capex
+
+    # BESS replaced at every multiple of its lifetime that falls inside the horizon
+    bess_life = np.maximum(np.trunc(_column(params, "bess_lifetime", n)), 1)[:, None]
+    replaced = (years > 0) & (years % bess_life == 0) & in_life
+    replacement = replaced * (bess_capex * _column(params, "bess_replacement_factor", n))[:, None]
+
+    annual_opex = (solar * params["solar_opex"].to_numpy(dtype=float)
+                   + bess * params["bess_opex"].to_numpy(dtype=float)) * 1000
+    opex = in_life * annual_opex[:, None]
+
+    energy_0 = np.broadcast_to(to_frac(availability) * HOURS_PER_YEAR, n)
+    solar_derate = (1 - _column(params, "solar_degradation", n)[:, None]) ** years
+    bess_derate = (1 - _column(params, "bess_degradation", n)[:, None]) ** (years % bess_life)
+    energy = in_life * energy_0[:, None] * solar_derate * bess_derate
+
+    return {
+        "capex": capex, "replacement": replacement, "opex": opex, "energy": energy,
+        "discount_rate": to_frac(params["discount_rate"].to_numpy(dtype=float)), "lifetime": lifetime,
+    }
+
+
+def present_values(matrices: dict) -> dict:
+    """
+    Discount every matrix with a start-of-year factor (1 + r)^-t.
+
+    Rows sharing a discount rate are discounted together with one matrix-vector product.
+
+    Returns:
+        dict: Same keys as the cash-flow matrices, each a length-n_rows array of present values.
+    """
+    names = ["capex", "replacement", "opex", "energy"]
+    rates = matrices["discount_rate"]
+    n, horizon = matrices["capex"].shape
+    pv = {name: np.full(n, np.nan) for name in names}
+
+    known = ~np.isnan(rates)
+    unique, inverse = np.unique(rates[known], return_inverse=True)
+    rows_known = np.flatnonzero(known)
+    for i, rate in enumerate(unique):
+        rows = rows_known[inverse.ravel() == i]
+        factors = (1 + rate) ** -np.arange(horizon)
+        for name in names:
+            pv[name][rows] = matrices[name][rows] @ factors
+    return pv
+
+
+def solar_bess_cashflow_lcoe(params: pd.DataFrame, solar_capacity_mw, bess_capacity_mwh,
+                             availability) -> pd.DataFrame:
+    """
+    Cash-flow LCOE for every row of a Solar+BESS parameter frame.
+
+    Returns:
+        pd.DataFrame: On `params`' index: 'LCOE', 'PV_Capex', 'PV_Replacement', 'PV_Opex'
+        and 'PV_Energy_MWh'; NaN where a parameter is missing.
+    """
+    pv = present_values(cashflow_matrices(params, solar_capacity_mw, bess_capacity_mwh, availability))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lcoe = (pv["capex"] + pv["replacement"] + pv["opex"]) / pv["energy"]
+    result = pd.DataFrame({
+        "LCOE": lcoe, "PV_Capex": pv["capex"], "PV_Replacement": pv["replacement"],
+        "PV_Opex": pv["opex"], "PV_Energy_MWh": pv["energy"],
+    }, index=params.index)
+    complete = params[["solar_capex", "bess_capex", "solar_opex", "bess_opex", "discount_rate",
+                       "solar_lifetime"]].notna().all(axis=1)
+    result.loc[~complete.to_numpy()] = np.nan
+    return result
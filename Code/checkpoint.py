@@ -0,0 +1,89 @@
+"""
+Per-task checkpoints in a local SQLite file, so long runs survive restarts.
+
+Each finished task is committed as soon as it completes, keyed by
+(country, year, tech, scenario), where `scenario` is a hash of every input the
+task depends on. A resumed run skips tasks already stored as done under the
+same key, and a changed input simply misses the old entry. Failed tasks
+(timeouts, crashes) are stored too, but are retried on resume.
+
+    with Checkpoint() as checkpoint:
+        checkpoint.record("Chile", 2024, "Solar+BESS", scenario, {"Solar_Capacity_MW": 1.2})
+        checkpoint.done("Chile", 2024, "Solar+BESS", scenario)
+"""
+import json
+import os
+import sqlite3
+import time
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CHECKPOINT_PATH = os.path.join(CWD, "..", "outputs", "checkpoints", "main.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    country  TEXT    NOT NULL,
+    year     INTEGER NOT NULL,
+    tech     TEXT    NOT NULL,
+    scenario TEXT    NOT NULL,
+    status   TEXT    NOT NULL,
+    result   TEXT,
+    error    TEXT,
+    seconds  REAL,
+    updated  REAL    NOT NULL,
+    PRIMARY KEY (country, year, tech, scenario)
+)
+"""
+
+
+class Checkpoint:
+    """
+    SQLite-backed store of finished tasks.
+
+    Args:
+        path (str, optional): Database file; created with its directory if missing.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        # WAL keeps each commit cheap and the file readable while a run is writing it
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def record(self, country, year, tech, scenario, result=None, error=None, seconds=None):
+        """Store a task's JSON-serialisable result (or its error) and commit immediately."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (country, int(year), tech, scenario, "failed" if error else "done",
+                 json.dumps(result), error, seconds, time.time()),
+            )
+
+    def done(self, country, year, tech, scenario):
+        """
+        Result of a completed task.
+
+        Returns:
+            tuple: (True, result) if the task is stored as done, else (False, None).
+        """
+        row = self._conn.execute(
+            "SELECT result FROM tasks WHERE country = ? AND year = ? AND tech = ? AND scenario = ? AND status = 'done'",
+            (country, int(year), tech, scenario),
+        ).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def counts(self) -> dict:
+        """Stored tasks per status."""
+        return dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,6 +2,7 @@ import pandas as pd
 import os
 
 from Code.archive.assumptions import base_path
+from input_store import read_sheets
 
 # === CONFIG ===
 input_path = os.path.join(base_path,"inputs")
@@ -11,10 +12,12 @@ output_file = os.path.join(input_path,"capex_opex_converted_2025USD.xlsx")
 log_file = os.path.join(input_path,"conversion_log.csv")
 
 # === LOAD DATA ===
-df = pd.read_excel(input_file, sheet_name="capex_opex")
-deflators = pd.read_excel(input_file, sheet_name="deflators")
-exchange = pd.read_excel(input_file, sheet_name="exchange_rates")
-unit_df = pd.read_excel(input_file, sheet_name="unit_conversion")
+# Parquet copies of the sheets; only re-parsed from the workbook when it changes
+sheets = read_sheets(input_file, ["capex_opex", "deflators", "exchange_rates", "unit_conversion"])
+df = sheets["capex_opex"]
+deflators = sheets["deflators"]
+exchange = sheets["exchange_rates"]
+unit_df = sheets["unit_conversion"]
 
 
 # Set target
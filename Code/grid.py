@@ -0,0 +1,312 @@
+"""
+Gridded intra-country Solar+BESS sizing.
+
+Instead of one system at each country's centroid, every country is tiled into
+cells of `resolution` degrees using the bundled Natural Earth shapefile. Each
+cell is sized with the sparse-LP fast path (`optimiser.optimise_bess_fast`) in a
+process pool, with results cached on disk so repeated runs only solve new
+cells. Cell LCOEs are then aggregated to area- or population-weighted
+country-level distributions. Priced cells can be streamed country by country to
+a partitioned Parquet dataset (see results_sink.py); the command line always
+does, and exports grid_lcoe_cells.csv from it.
+
+    python grid.py --countries Chile Australia --resolution 1.0
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from input_store import read_table
+from reader import get_val, ParamLookup
+from results_sink import ResultsSink, export_csv
+from profile import generate_hourly_solar_profile
+from lcoe_helpers import calculate_solar_bess_lcoe
+from spatial_index import SHAPEFILE_PATH, load_country_shapes
+from sizing_cache import load_sizing_cache, sizing_key
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+DEFAULT_CACHE_PATH = os.path.join(OUTPUT_PATH, "grid_cache", "sizing.jsonl")
+
+KM_PER_DEGREE = 111.32
+QUANTILES = [0.1, 0.5, 0.9]
+CELL_COLS = ["Country", "Cell_Row", "Cell_Col", "Latitude", "Longitude", "Area_km2", "Solar_Capex", "BESS_Capex",
+             "Weight", "Solar_Capacity_MW", "BESS_Energy_MWh", "Cost", "Year", "LCOE", "Total_Capex"]
+
+
+# --- Geometry ---
+def tile_country(geometry, resolution=1.0):
+    """
+    Cover a country polygon with cells on a global `resolution`-degree grid.
+
+    Cells are aligned to the global grid (edges at -180 + k*res, -90 + k*res) so
+    the same cell always gets the same id. A cell's site is its centre, or a
+    point inside the country if the centre falls outside (coastlines, borders).
+
+    Returns:
+        pd.DataFrame: One row per cell with 'Cell_Row', 'Cell_Col', 'Latitude',
+        'Longitude' and 'Area_km2' (the part of the cell inside the country).
+    """
+    import shapely
+
+    minx, miny, maxx, maxy = geometry.bounds
+    cols = np.arange(np.floor((minx + 180) / resolution), np.ceil((maxx + 180) / resolution))
+    rows = np.arange(np.floor((miny + 90) / resolution), np.ceil((maxy + 90) / resolution))
+    col_idx, row_idx = (a.ravel() for a in np.meshgrid(cols, rows))
+
+    x0 = col_idx * resolution - 180
+    y0 = row_idx * resolution - 90
+    boxes = shapely.box(x0, y0, x0 + resolution, y0 + resolution)
+
+    shapely.prepare(geometry)
+    overlap = shapely.intersection(boxes, geometry)
+    area_deg2 = shapely.area(overlap)
+    keep = area_deg2 > 0
+
+    cx, cy = x0[keep] + resolution / 2, y0[keep] + resolution / 2
+    inside = shapely.contains_xy(geometry, cx, cy)
+    if not inside.all():
+        surface = shapely.point_on_surface(overlap[keep][~inside])
+        cx[~inside], cy[~inside] = shapely.get_x(surface), shapely.get_y(surface)
+
+    return pd.DataFrame({
+        "Cell_Row": row_idx[keep].astype(int),
+        "Cell_Col": col_idx[keep].astype(int),
+        "Latitude": cy,
+        "Longitude": cx,
+        "Area_km2": area_deg2[keep] * KM_PER_DEGREE ** 2 * np.cos(np.radians(cy)),
+    })
+
+
+def population_weights(cells, population_csv, resolution):
+    """
+    Sum a point population dataset ('Latitude', 'Longitude', 'Population') into grid cells.
+
+    Returns:
+        np.ndarray: Population per row of `cells` (0 where no points fall).
+    """
+    pop = pd.read_csv(population_csv)
+    pop_cells = pd.DataFrame({
+        "Cell_Row": np.floor((pop["Latitude"] + 90) / resolution).astype(int),
+        "Cell_Col": np.floor((pop["Longitude"] + 180) / resolution).astype(int),
+        "Population": pop["Population"],
+    }).groupby(["Cell_Row", "Cell_Col"])["Population"].sum()
+
+    merged = cells[["Cell_Row", "Cell_Col"]].merge(
+        pop_cells.reset_index(), on=["Cell_Row", "Cell_Col"], how="left"
+    )
+    return merged["Population"].fillna(0.0).to_numpy()
+
+
+# --- Sizing cache ---
+def _size_cell(args):
+    key, lat, lon, solar_year, solar_capex, bess_capex, availability, efficiency = args
+    # Imported here so the pool's workers only pay for the optimiser when they size something
+    from optimiser import optimise_bess_fast
+
+    profile = generate_hourly_solar_profile(lat, lon, solar_year=solar_year)
+    try:
+        cost, solar_cap, bess_energy, _ = optimise_bess_fast(
+            profile, solar_capex, bess_capex, availability=availability, efficiency=efficiency
+        )
+    except ValueError as e:
+        return {"key": key, "error": str(e)}
+    return {"key": key, "cost": cost, "solar_cap": solar_cap, "bess_energy": bess_energy}
+
+
+def size_cells(cells, solar_year=2023, availability=0.8, efficiency=0.9, processes=None,
+               cache_path=DEFAULT_CACHE_PATH):
+    """
+    Size every cell (needs 'Latitude', 'Longitude', 'Solar_Capex', 'BESS_Capex').
+
+    Cached results are reused; the rest are solved in a process pool and
+    appended to the cache as they finish, so an interrupted run loses nothing.
+
+    Returns:
+        pd.DataFrame: `cells` with 'Solar_Capacity_MW', 'BESS_Energy_MWh' and 'Cost' added.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    cache = load_sizing_cache(cache_path)
+
+    keys = [
+        sizing_key(round(float(lat), 4), round(float(lon), 4), int(solar_year), sc, bc, availability, efficiency)
+        for lat, lon, sc, bc in zip(cells["Latitude"], cells["Longitude"], cells["Solar_Capex"], cells["BESS_Capex"])
+    ]
+    todo = {
+        key: (key, lat, lon, solar_year, sc, bc, availability, efficiency)
+        for key, lat, lon, sc, bc in zip(keys, cells["Latitude"], cells["Longitude"],
+                                         cells["Solar_Capex"], cells["BESS_Capex"])
+        if key not in cache
+    }
+    print(f"Grid sizing: {len(keys) - len(todo)} cells cached, {len(todo)} to solve.")
+
+    if todo:
+        with ProcessPoolExecutor(processes) as pool, open(cache_path, "a") as cache_file:
+            for entry in tqdm(pool.map(_size_cell, todo.values(), chunksize=4), total=len(todo), desc="Sizing cells"):
+                cache[entry["key"]] = entry
+                cache_file.write(json.dumps(entry) + "\n")
+                cache_file.flush()
+
+    cells = cells.copy()
+    cells["Solar_Capacity_MW"] = [cache[k].get("solar_cap", np.nan) for k in keys]
+    cells["BESS_Energy_MWh"] = [cache[k].get("bess_energy", np.nan) for k in keys]
+    cells["Cost"] = [cache[k].get("cost", np.nan) for k in keys]
+    return cells
+
+
+# --- Aggregation ---
+def weighted_quantile(values, weights, quantiles):
+    """Quantiles of `values` where each value counts in proportion to its weight."""
+    values, weights = np.asarray(values, dtype=float), np.asarray(weights, dtype=float)
+    ok = ~np.isnan(values) & (weights > 0)
+    if not ok.any():
+        return np.full(len(quantiles), np.nan)
+    order = np.argsort(values[ok])
+    v, w = values[ok][order], weights[ok][order]
+    cdf = (np.cumsum(w) - 0.5 * w) / w.sum()
+    return np.interp(quantiles, cdf, v)
+
+
+def aggregate_cells(cell_results):
+    """
+    Collapse per-cell LCOEs to a weighted distribution per country and year.
+
+    Returns:
+        pd.DataFrame: 'Country', 'Year', 'Cells', 'LCOE_mean', 'LCOE_p10', 'LCOE_p50',
+        'LCOE_p90', 'LCOE_min', 'LCOE_max'.
+    """
+    rows = []
+    for (country, year), group in cell_results.groupby(["Country", "Year"]):
+        lcoe_vals, weights = group["LCOE"].to_numpy(dtype=float), group["Weight"].to_numpy(dtype=float)
+        ok = ~np.isnan(lcoe_vals) & (weights > 0)
+        p10, p50, p90 = weighted_quantile(lcoe_vals, weights, QUANTILES)
+        rows.append({
+            "Country": country, "Year": year, "Cells": int(ok.sum()),
+            "LCOE_mean": np.average(lcoe_vals[ok], weights=weights[ok]) if ok.any() else np.nan,
+            "LCOE_p10": p10, "LCOE_p50": p50, "LCOE_p90": p90,
+            "LCOE_min": lcoe_vals[ok].min() if ok.any() else np.nan,
+            "LCOE_max": lcoe_vals[ok].max() if ok.any() else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def run_grid(capex_opex_df, countries, years, resolution=1.0, weights="area", population_csv=None,
+             base_year=2024, solar_year=2023, availability=0.8, efficiency=0.9, processes=None,
+             cache_path=DEFAULT_CACHE_PATH, sink=None):
+    """
+    Tile, size and price every cell of `countries`, then aggregate per country.
+
+    Capacities are sized once with base-year capex (as in `main.py`) and priced
+    for every year in `years`.
+
+    Args:
+        sink (ResultsSink, optional): Stream each country's priced cells (CELL_COLS plus
+            'Tech') to this sink as soon as they are priced instead of returning them.
+
+    Returns:
+        tuple: (per-cell results DataFrame, or None with a `sink`; per-country summary DataFrame)
+    """
+    if weights == "population" and not population_csv:
+        raise ValueError("Population weighting needs a population_csv.")
+
+    if not isinstance(capex_opex_df, ParamLookup):
+        capex_opex_df = ParamLookup(capex_opex_df)
+
+    shapes = load_country_shapes()
+    shapes = shapes[shapes["Country"].isin(countries)]
+    missing = set(countries) - set(shapes["Country"])
+    for country in sorted(missing):
+        print(f"WARNING: {country} not found in {os.path.basename(SHAPEFILE_PATH)}. Skipping.")
+
+    # --- Tile countries and attach base-year capex ---
+    all_cells = []
+    for _, shp in shapes.iterrows():
+        country = shp["Country"]
+        try:
+            solar_capex = get_val(capex_opex_df, country, base_year, "capex", "Solar")
+            bess_capex = get_val(capex_opex_df, country, base_year, "capex", "BESS")
+        except ValueError as e:
+            print(f"  ERROR: No base-year capex for {country}. Skipping. Reason: {e}")
+            continue
+        cells = tile_country(shp["geometry"], resolution)
+        cells.insert(0, "Country", country)
+        cells["Solar_Capex"], cells["BESS_Capex"] = solar_capex, bess_capex
+        all_cells.append(cells)
+        print(f"  {country}: {len(cells)} cells at {resolution} deg")
+
+    if not all_cells:
+        raise ValueError("No countries could be tiled.")
+    cells = pd.concat(all_cells, ignore_index=True)
+    cells["Weight"] = (
+        population_weights(cells, population_csv, resolution) if weights == "population" else cells["Area_km2"]
+    )
+
+    # --- Size every cell (parallel, cached) ---
+    cells = size_cells(cells, solar_year, availability, efficiency, processes, cache_path)
+
+    # --- Price every cell for every year; parameters are looked up once per country-year ---
+    results, summaries = [], []
+    for country, group in cells.groupby("Country", sort=False):
+        priced = []
+        for year in years:
+            result = calculate_solar_bess_lcoe(
+                country, year, group["Solar_Capacity_MW"].to_numpy(), group["BESS_Energy_MWh"].to_numpy(),
+                availability, capex_opex_df
+            )
+            if result:
+                priced.append(group.assign(Year=year, LCOE=result["LCOE"], Total_Capex=result["Total_Capex"]))
+        if not priced:
+            continue
+        priced = pd.concat(priced, ignore_index=True)
+        summaries.append(aggregate_cells(priced))
+        if sink is not None:
+            sink.write(priced[CELL_COLS].assign(Tech="Solar+BESS"))
+        else:
+            results.append(priced)
+
+    summary = pd.concat(summaries).sort_values(["Country", "Year"]).reset_index(drop=True) if summaries \
+        else pd.DataFrame()
+    if sink is not None:
+        sink.flush()
+        return None, summary
+    cell_results = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+    return cell_results, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gridded Solar+BESS sizing and country LCOE distributions.")
+    parser.add_argument("--countries", nargs="+", default=["Chile", "Australia", "Spain"])
+    parser.add_argument("--resolution", type=float, default=1.0, help="Cell size in degrees.")
+    parser.add_argument("--weights", choices=["area", "population"], default="area")
+    parser.add_argument("--population-csv", default=None)
+    parser.add_argument("--years", type=int, nargs=2, default=[2010, 2024], metavar=("FIRST", "LAST"))
+    parser.add_argument("--availability", type=float, default=0.8)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    print("Loading input data...")
+    capex_opex_df = read_table(os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx"))
+
+    start_time = time.time()
+    # Cells x years is the largest output of any run, so it is streamed rather than held in memory
+    dataset = os.path.join(OUTPUT_PATH, "grid_lcoe_cells")
+    with ResultsSink(dataset) as sink:
+        _, summary = run_grid(
+            capex_opex_df, args.countries, list(range(args.years[0], args.years[1] + 1)),
+            resolution=args.resolution, weights=args.weights, population_csv=args.population_csv,
+            availability=args.availability, processes=args.processes, sink=sink,
+        )
+
+    n_rows = export_csv(dataset, os.path.join(OUTPUT_PATH, "grid_lcoe_cells.csv"), columns=CELL_COLS)
+    summary.to_csv(os.path.join(OUTPUT_PATH, "grid_lcoe_summary.csv"), index=False)
+    print(f"Grid run finished in {round(time.time() - start_time, 1)} seconds: {n_rows} cell rows "
+          f"in {dataset} (partitioned by Tech/Year) and grid_lcoe_cells.csv.")
+    print(summary.head())
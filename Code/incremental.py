@@ -0,0 +1,99 @@
+"""
+Incremental re-runs of main.py: recompute only the rows whose inputs changed.
+
+Every output row is tied to the inputs that produced it:
+
+  * Solar+BESS sizing per country  <- site, solar year, base-year solar/BESS capex
+  * Solar+BESS row (country, year)  <- that year's Solar+BESS parameters + the sizing + availability
+  * conventional row (country, tech, year) <- that year's tech parameters + whether the country was sized
+
+A manifest stores the hash of those inputs per row and the sizing per country,
+next to a copy of the results. On the next run, sizings whose key is unchanged
+are reused (no `optimise_bess`) and only rows with a new hash are recomputed;
+e.g. editing Gas fuel for Spain recomputes the Spain Gas rows and nothing else.
+"""
+import hashlib
+import json
+import math
+import os
+
+import pandas as pd
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INCREMENTAL_DIR = os.path.join(CWD, "..", "outputs", "incremental")
+
+
+def value_hash(*values) -> str:
+    """Stable hash of numbers/strings; NaN and None hash the same."""
+    norm = [None if v is None or (isinstance(v, float) and math.isnan(v)) else v for v in values]
+    return hashlib.sha1(json.dumps(norm, default=float).encode()).hexdigest()
+
+
+def row_key(group: str, country: str, year: int) -> str:
+    return f"{group}|{country}|{int(year)}"
+
+
+def param_hashes(group: str, params: pd.DataFrame, extra: dict = None) -> dict:
+    """
+    Input hash per row of a parameter frame indexed by (country, year).
+
+    Args:
+        extra (dict, optional): country -> tuple of further inputs (sizing, availability, ...).
+
+    Returns:
+        dict: `row_key` -> hash.
+    """
+    extra = extra or {}
+    return {
+        row_key(group, country, year): value_hash(*values, *extra.get(country, ()))
+        for (country, year), values in zip(params.index, params.itertuples(index=False, name=None))
+    }
+
+
+class RunManifest:
+    """
+    Per-row input hashes, per-country sizing and the results they produced.
+
+    Attributes:
+        sizing (dict): country -> {'key', 'Solar_Capacity_MW', 'BESS_Energy_MWh'} (no capacities if sizing
+            failed, so the next run sizes it again).
+        rows (dict): `row_key` -> input hash.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    RESULTS_FILE = "results.csv"
+
+    def __init__(self, path=DEFAULT_INCREMENTAL_DIR, sizing=None, rows=None):
+        self.path = path
+        self.sizing = sizing or {}
+        self.rows = rows or {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_INCREMENTAL_DIR):
+        manifest_file = os.path.join(path, cls.MANIFEST_FILE)
+        if not os.path.exists(manifest_file):
+            return cls(path)
+        with open(manifest_file) as f:
+            data = json.load(f)
+        return cls(path, data["sizing"], data["rows"])
+
+    def results(self, columns) -> pd.DataFrame:
+        """Results of the previous run (empty with `columns` if there is none)."""
+        results_file = os.path.join(self.path, self.RESULTS_FILE)
+        if not os.path.exists(results_file) or not self.rows:
+            return pd.DataFrame(columns=columns)
+        return pd.read_csv(results_file)[columns]
+
+    def changed(self, hashes: dict) -> set:
+        """Row keys whose input hash differs from (or is missing in) the manifest."""
+        return {key for key, h in hashes.items() if self.rows.get(key) != h}
+
+    def save(self, results: pd.DataFrame):
+        os.makedirs(self.path, exist_ok=True)
+        # Results first: a manifest must never describe results that were not written
+        results.to_csv(os.path.join(self.path, self.RESULTS_FILE), index=False)
+        tmp = os.path.join(self.path, self.MANIFEST_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"sizing": self.sizing, "rows": self.rows}, f)
+        os.replace(tmp, os.path.join(self.path, self.MANIFEST_FILE))
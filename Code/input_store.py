@@ -0,0 +1,160 @@
+"""
+Columnar cache for the Excel inputs.
+
+Each workbook sheet is parsed with openpyxl once and written to Parquet with
+categorical dtypes for the low-cardinality text columns (region, tech,
+variable, type, ...). Later reads load the Parquet file directly. A manifest
+next to it records the source's mtime, size and sha256; a changed mtime
+triggers a hash check, and the sheet is re-converted only if the content
+actually changed.
+
+    capex_opex_df = read_table(os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx"))
+"""
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+DEFAULT_CACHE_DIR = os.path.join(CWD, "..", "outputs", "input_cache")
+
+# Stored as pandas categoricals wherever a sheet has them
+CATEGORICAL_COLUMNS = ["region", "tech", "units", "variable", "type", "money", "source", "source region"]
+
+
+def file_hash(path):
+    """sha256 hex digest of a file's bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(path, sheet_name, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}__{sheet_name}"
+    return os.path.join(cache_dir, f"{name}.parquet"), os.path.join(cache_dir, f"{name}.json")
+
+
+def _to_columnar(df, categoricals):
+    """
+    Convert a parsed sheet to Parquet-friendly dtypes.
+
+    Object columns holding a mix of numbers and text (e.g. 'year', which is an
+    int apart from the odd 'all') are stored as strings and listed in the
+    returned `mixed` so `_from_columnar` can restore them.
+    """
+    df = df.copy()
+    mixed = []
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        kinds = {type(v) for v in df[col].dropna()}
+        if len(kinds) > 1:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype("string")
+            mixed.append(col)
+    for col in categoricals:
+        if col in df.columns and col not in mixed:
+            df[col] = df[col].astype("category")
+    return df, mixed
+
+
+def _from_columnar(df, mixed):
+    for col in mixed:
+        numeric = pd.to_numeric(df[col], errors="coerce")
+        df[col] = [
+            (int(n) if float(n).is_integer() else float(n)) if pd.notna(n) else (None if pd.isna(v) else v)
+            for v, n in zip(df[col].astype(object), numeric)
+        ]
+        df[col] = df[col].astype(object)
+    return df
+
+
+def is_fresh(path, sheet_name=0, cache_dir=DEFAULT_CACHE_DIR) -> bool:
+    """True if the cached copy of `path`/`sheet_name` matches the source file."""
+    parquet_path, manifest_path = _cache_paths(path, sheet_name, cache_dir)
+    if not (os.path.exists(parquet_path) and os.path.exists(manifest_path)):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    stat = os.stat(path)
+    if manifest["mtime_ns"] == stat.st_mtime_ns and manifest["size"] == stat.st_size:
+        return True
+    # Touched but possibly unchanged (e.g. a re-save or a checkout): compare content
+    if manifest["sha256"] != file_hash(path):
+        return False
+    manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return True
+
+
+def convert(path, sheet_name=0, cache_dir=DEFAULT_CACHE_DIR, categoricals=CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """Parse one sheet from the workbook and (re)write its Parquet copy and manifest."""
+    os.makedirs(cache_dir, exist_ok=True)
+    parquet_path, manifest_path = _cache_paths(path, sheet_name, cache_dir)
+
+    start_time = time.time()
+    stat = os.stat(path)
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    columnar, mixed = _to_columnar(df, categoricals)
+    # Write to a temp file first so an interrupted run never leaves a half-written cache
+    columnar.to_parquet(parquet_path + ".tmp", index=False)
+    os.replace(parquet_path + ".tmp", parquet_path)
+    with open(manifest_path, "w") as f:
+        json.dump({
+            "source": os.path.abspath(path), "sheet": sheet_name, "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size, "sha256": file_hash(path), "mixed_columns": mixed,
+        }, f, indent=2)
+    print(f"Converted {os.path.basename(path)} [{sheet_name}] to Parquet in "
+          f"{round(time.time() - start_time, 2)} seconds -> {parquet_path}")
+    return _from_columnar(columnar, mixed)
+
+
+def read_table(path, sheet_name=0, cache_dir=DEFAULT_CACHE_DIR, categoricals=CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """
+    Drop-in for `pd.read_excel(path, sheet_name=sheet_name)` backed by the Parquet cache.
+
+    Args:
+        path (str): Source workbook.
+        sheet_name (int or str): Sheet to read (one sheet per call).
+        cache_dir (str): Where the Parquet copies and manifests live.
+        categoricals (list): Columns stored as categoricals when present.
+
+    Returns:
+        pd.DataFrame: The sheet, with categorical text columns.
+    """
+    if not is_fresh(path, sheet_name, cache_dir):
+        return convert(path, sheet_name, cache_dir, categoricals)
+
+    parquet_path, manifest_path = _cache_paths(path, sheet_name, cache_dir)
+    with open(manifest_path) as f:
+        mixed = json.load(f)["mixed_columns"]
+    return _from_columnar(pd.read_parquet(parquet_path), mixed)
+
+
+def read_sheets(path, sheet_names, **kwargs) -> dict:
+    """`read_table` for several sheets of one workbook; returns {sheet_name: DataFrame}."""
+    return {sheet: read_table(path, sheet, **kwargs) for sheet in sheet_names}
+
+
+if __name__ == "__main__":
+    excel_path = os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx")
+
+    start_time = time.time()
+    excel_df = pd.read_excel(excel_path)
+    excel_time = time.time() - start_time
+
+    read_table(excel_path)
+    start_time = time.time()
+    cached_df = read_table(excel_path)
+    cached_time = time.time() - start_time
+
+    print(f"read_excel: {round(excel_time, 3)} s, {excel_df.memory_usage(deep=True).sum() / 1e3:.0f} kB")
+    print(f"read_table: {round(cached_time, 3)} s, {cached_df.memory_usage(deep=True).sum() / 1e3:.0f} kB")
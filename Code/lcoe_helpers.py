@@ -1,48 +1,125 @@
 # lcoe helper functions
+import itertools
+
 import pandas as pd
-from reader import get_val
+from reader import get_val, get_vals
 from lcoe.lcoe import lcoe
 
+# (variable, tech, param_type) of every parameter the helpers below read
+SOLAR_BESS_PARAMS = {
+    "solar_capex": ("capex", "Solar", None),
+    "bess_capex": ("capex", "BESS", None),
+    "solar_opex": ("opex", "Solar", "fixed"),
+    "bess_opex": ("opex", "BESS", "fixed"),
+    "discount_rate": ("discount_rate", None, None),
+    "solar_lifetime": ("lifetime", "Solar", None),
+}
+
+def conventional_params(tech: str) -> dict:
+    """Parameter spec for a conventional tech (plus its capacity factor, which main.py reads)."""
+    return {
+        "capex_kw": ("capex", tech, None),                      # $/kW
+        "opex_fixed_kwyr": ("opex", tech, "fixed"),             # $/kW/yr
+        "opex_var_mwh": ("opex", tech, "variable"),             # $/MWh
+        "fuel_cost_mwh_fuel": ("fuel", tech, None),             # $/MWh_fuel
+        "efficiency": ("efficiency", tech, None),               # 0–1 (or 0–100)
+        "discount_rate": ("discount_rate", None, None),         # 0–1 (or 0–100)
+        "lifetime": ("lifetime", tech, None),                   # years
+        "capacity_factor": ("capacity_factor", tech, None),
+    }
+
+def build_param_queries(countries, years, specs: dict) -> pd.DataFrame:
+    """One `get_vals` query row per (group, parameter, country, year)."""
+    rows = [
+        (group, name, country, year, variable, tech, param_type)
+        for group, spec in specs.items()
+        for (name, (variable, tech, param_type)), country, year in itertools.product(spec.items(), countries, years)
+    ]
+    return pd.DataFrame(rows, columns=["group", "param", "country", "year", "variable", "tech", "param_type"])
+
+def fetch_params(capex_opex_df, countries, years, specs: dict):
+    """
+    Looks up every parameter of every spec for all countries and years in one `get_vals` pass.
+
+    Args:
+        capex_opex_df (pd.DataFrame or ParamLookup): The parameter table.
+        countries, years (iterable): Countries and years to cover.
+        specs (dict): {group name: parameter spec}, e.g. {"Solar+BESS": SOLAR_BESS_PARAMS}.
+
+    Returns:
+        tuple: ({group: DataFrame indexed by (country, year) with one column per parameter,
+        NaN where missing}, the long `get_vals` result with provenance)
+    """
+    lookups = get_vals(capex_opex_df, build_param_queries(list(countries), list(years), specs))
+    params = {}
+    for group, spec in specs.items():
+        wide = lookups[lookups["group"] == group].pivot(index=["country", "year"], columns="param", values="value")
+        params[group] = wide.reindex(columns=list(spec))
+    return params, lookups
+
+def require_params(params, names=None) -> dict:
+    """Returns `params` as a dict, raising ValueError (like get_val) if any of `names` is missing."""
+    params = dict(params)
+    missing = [n for n in (names or params) if pd.isna(params.get(n))]
+    if missing:
+        raise ValueError(f"FATAL: No match found for: {', '.join(missing)}")
+    return params
+
 def _to_frac(x):
     """Allow 0–1 or 0–100 inputs; return fraction 0–1."""
     x = float(x)
     return x/100.0 if x > 1 else x
 
+def get_solar_bess_params(country: str, year: int, capex_opex_df: pd.DataFrame) -> dict:
+    """Looks up the Solar+BESS cost and finance parameters for one country and year."""
+    return {
+        "solar_capex": get_val(capex_opex_df, country, year, "capex", "Solar"),
+        "bess_capex": get_val(capex_opex_df, country, year, "capex", "BESS"),
+        "solar_opex": get_val(capex_opex_df, country, year, "opex", "Solar", param_type="fixed"),
+        "bess_opex": get_val(capex_opex_df, country, year, "opex", "BESS", param_type="fixed"),
+        "discount_rate": get_val(capex_opex_df, country, year, "discount_rate"),  # Assumes discount_rate is a variable
+        "solar_lifetime": int(get_val(capex_opex_df, country, year, "lifetime", "Solar")),
+    }
+
 def calculate_solar_bess_lcoe(
         country: str,
         year: int,
         solar_capacity_mw: float,
         bess_capacity_mwh: float,
         availability: float,
-        capex_opex_df: pd.DataFrame
+        capex_opex_df: pd.DataFrame,
+        params: dict = None
 ) -> dict:
-    """Calculates LCOE for a fixed capacity solar+BESS system for a given year."""
+    """Calculates LCOE for a fixed capacity solar+BESS system for a given year.
+
+    Capacities may also be NumPy arrays (e.g. one entry per grid cell); the
+    parameters are looked up once and the LCOE is returned per entry.
+    Pass `params` (e.g. a row from `fetch_params`) to skip the lookups.
+    """
 
     # This is a simplified LCOE calculation.
     # You should replace this with your detailed lcoe.lcoe function.
     try:
         # Get all required financial and technical parameters for the given year
-        solar_capex = get_val(capex_opex_df, country, year, "capex", "Solar")
-        bess_capex = get_val(capex_opex_df, country, year, "capex", "BESS")
-        solar_opex = get_val(capex_opex_df, country, year, "opex", "Solar", param_type="fixed")
-        bess_opex = get_val(capex_opex_df, country, year, "opex", "BESS", param_type="fixed")
-        discount_rate = get_val(capex_opex_df, country, year, "discount_rate")  # Assumes discount_rate is a variable
-        solar_lifetime = int(get_val(capex_opex_df, country, year, "lifetime", "Solar"))
+        if params is None:
+            params = get_solar_bess_params(country, year, capex_opex_df)
+        else:
+            params = require_params(params, SOLAR_BESS_PARAMS)
 
         af = _to_frac(availability)
-        r = _to_frac(discount_rate)
+        r = _to_frac(params["discount_rate"])
 
         # 1. Total Investment Cost
-        total_capex = (solar_capacity_mw * solar_capex * 1000) + (bess_capacity_mwh * bess_capex * 1000)
+        total_capex = (solar_capacity_mw * params["solar_capex"] * 1000) + (bess_capacity_mwh * params["bess_capex"] * 1000)
 
         # 2. Total Annual Costs
-        annual_opex = (solar_capacity_mw * solar_opex * 1000) + (bess_capacity_mwh * bess_opex * 1000)
+        annual_opex = (solar_capacity_mw * params["solar_opex"] * 1000) + (bess_capacity_mwh * params["bess_opex"] * 1000)
 
         # Use the optimised result from 'optimise_bess' function
         annual_energy_mwh = af * 8760
 
         # lcoe = total_annual_cost / (annual_energy_gwh * 1000) # in USD/MWh
-        lcoe_val = lcoe(annual_energy_mwh, total_capex, annual_opex, r, solar_lifetime)
+        lcoe_val = lcoe(annual_energy_mwh, total_capex, annual_opex, r, int(params["solar_lifetime"]))
 
         return {"LCOE": lcoe_val, "Total_Capex": total_capex}
 
@@ -50,24 +127,45 @@ def calculate_solar_bess_lcoe(
         print(f"  - Could not calculate Solar+BESS LCOE for {year}: {e}")
         return None
 
+def get_conventional_params(country: str, year: int, tech: str, capex_opex_df: pd.DataFrame) -> dict:
+    """Looks up the cost, fuel and finance parameters of a conventional tech for one country and year."""
+    return {
+        "capex_kw": get_val(capex_opex_df, country, year, "capex", tech),
+        "opex_fixed_kwyr": get_val(capex_opex_df, country, year, "opex", tech, param_type="fixed"),
+        "opex_var_mwh": get_val(capex_opex_df, country, year, "opex", tech, param_type="variable"),
+        "fuel_cost_mwh_fuel": get_val(capex_opex_df, country, year, "fuel", tech),
+        "efficiency": get_val(capex_opex_df, country, year, "efficiency", tech),
+        "discount_rate": get_val(capex_opex_df, country, year, "discount_rate"),
+        "lifetime": get_val(capex_opex_df, country, year, "lifetime", tech),
+    }
+
 def calculate_conventional_lcoe(
     country: str,
     year: int,
     tech: str,
     capacity_mw: float,
     capacity_factor: float,
-    capex_opex_df: pd.DataFrame
+    capex_opex_df: pd.DataFrame,
+    params: dict = None
 ) -> dict:
-    """Calculates LCOE for a conventional power plant for a given year (simple version)."""
+    """Calculates LCOE for a conventional power plant for a given year (simple version).
+
+    Pass `params` (e.g. a row from `fetch_params`) to skip the lookups.
+    """
     try:
         # Inputs from table
-        capex_kw = get_val(capex_opex_df, country, year, "capex", tech)                          # $/kW
-        opex_fixed_kwyr = get_val(capex_opex_df, country, year, "opex", tech, param_type="fixed") # $/kW/yr
-        opex_var_mwh = get_val(capex_opex_df, country, year, "opex", tech, param_type="variable") # $/MWh
-        fuel_cost_mwh_fuel = get_val(capex_opex_df, country, year, "fuel", tech)                  # $/MWh_fuel
-        efficiency = _to_frac(get_val(capex_opex_df, country, year, "efficiency", tech))          # 0–1 (or 0–100)
-        discount_rate = get_val(capex_opex_df, country, year, "discount_rate")                    # 0–1 (or 0–100)
-        lifetime = int(get_val(capex_opex_df, country, year, "lifetime", tech))                   # years
+        if params is None:
+            params = get_conventional_params(country, year, tech, capex_opex_df)
+        else:
+            params = require_params(params, [n for n in conventional_params(tech) if n != "capacity_factor"])
+
+        capex_kw = params["capex_kw"]                                # $/kW
+        opex_fixed_kwyr = params["opex_fixed_kwyr"]                  # $/kW/yr
+        opex_var_mwh = params["opex_var_mwh"]                        # $/MWh
+        fuel_cost_mwh_fuel = params["fuel_cost_mwh_fuel"]            # $/MWh_fuel
+        efficiency = _to_frac(params["efficiency"])                  # 0–1 (or 0–100)
+        discount_rate = params["discount_rate"]                      # 0–1 (or 0–100)
+        lifetime = int(params["lifetime"])                           # years
 
         cf = _to_frac(capacity_factor)
         r = _to_frac(discount_rate)
@@ -91,8 +189,3 @@ def calculate_conventional_lcoe(
     except ValueError as e:
         print(f" - Could not calculate {tech} LCOE for {year}: {e}")
         return None
-
-
-    except ValueError as e:
-        print(f"  - Could not calculate {tech} LCOE for {year}: {e}")
-        return None
\ No newline at end of file
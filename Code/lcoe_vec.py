@@ -0,0 +1,122 @@
+"""
+Array LCOE: the `lcoe_helpers` formulas over whole countries x years x techs at once.
+
+`lcoe.lcoe` discounts output and opex with `npf.pv(..., when=1)`, i.e. an
+annuity-due. Its closed form is
+
+    AF = (1 + r) * (1 - (1 + r)^-n) / r        (AF = n when r = 0)
+    LCOE = (capex + opex * AF) / (output * AF)
+
+so every LCOE here is one broadcast expression over aligned arrays, with
+results equal to the scalar path. Missing inputs (NaN) give NaN.
+"""
+import numpy as np
+import pandas as pd
+
+HOURS_PER_YEAR = 8760
+
+
+def to_frac(x):
+    """Array version of `lcoe_helpers._to_frac`: values above 1 are percentages."""
+    x = np.asarray(x, dtype=float)
+    return np.where(x > 1, x / 100.0, x)
+
+
+def annuity_factor(discount_rate, lifetime):
+    """
+    Present value of 1 per year paid at the start of each of `lifetime` years.
+
+    Args:
+        discount_rate (array-like): Fractions (0–1).
+        lifetime (array-like): Years; truncated to whole years as in the scalar path.
+    """
+    r = np.asarray(discount_rate, dtype=float)
+    n = np.trunc(np.asarray(lifetime, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        af = (1 + r) * (1 - (1 + r) ** -n) / r
+    return np.where(r == 0, n, af)
+
+
+def lcoe_vec(annual_output, capital_cost, annual_operating_cost, discount_rate, lifetime):
+    """Broadcast equivalent of `lcoe.lcoe` (without its print)."""
+    af = annuity_factor(discount_rate, lifetime)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (np.asarray(capital_cost, dtype=float) + np.asarray(annual_operating_cost, dtype=float) * af) / (
+            np.asarray(annual_output, dtype=float) * af)
+
+
+def solar_bess_lcoe_vec(solar_capacity_mw, bess_capacity_mwh, availability, solar_capex, bess_capex,
+                        solar_opex, bess_opex, discount_rate, solar_lifetime):
+    """
+    `calculate_solar_bess_lcoe` over arrays.
+
+    Returns:
+        tuple: (LCOE $/MWh, total capex $) arrays.
+    """
+    solar = np.asarray(solar_capacity_mw, dtype=float)
+    bess = np.asarray(bess_capacity_mwh, dtype=float)
+    total_capex = solar * np.asarray(solar_capex) * 1000 + bess * np.asarray(bess_capex) * 1000
+    annual_opex = solar * np.asarray(solar_opex) * 1000 + bess * np.asarray(bess_opex) * 1000
+    annual_energy_mwh = to_frac(availability) * HOURS_PER_YEAR
+    return lcoe_vec(annual_energy_mwh, total_capex, annual_opex, to_frac(discount_rate), solar_lifetime), total_capex
+
+
+def conventional_lcoe_vec(capacity_mw, capacity_factor, capex_kw, opex_fixed_kwyr, opex_var_mwh,
+                          fuel_cost_mwh_fuel, efficiency, discount_rate, lifetime):
+    """
+    `calculate_conventional_lcoe` over arrays.
+
+    Returns:
+        tuple: (LCOE $/MWh, total capex $) arrays.
+    """
+    capacity = np.asarray(capacity_mw, dtype=float)
+    total_capex = capacity * 1000 * np.asarray(capex_kw)
+    annual_fixed_opex = capacity * 1000 * np.asarray(opex_fixed_kwyr)
+
+    annual_energy_mwh = capacity * HOURS_PER_YEAR * to_frac(capacity_factor)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fuel_per_mwh_elec = np.asarray(fuel_cost_mwh_fuel) / to_frac(efficiency)
+    annual_variable_cost = (np.asarray(opex_var_mwh) + fuel_per_mwh_elec) * annual_energy_mwh
+
+    lcoe = lcoe_vec(annual_energy_mwh, total_capex, annual_fixed_opex + annual_variable_cost,
+                    to_frac(discount_rate), lifetime)
+    return lcoe, total_capex
+
+
+# --- DataFrame wrappers over `ParamCube.to_params` / `fetch_params` output ---
+def solar_bess_frame(params: pd.DataFrame, solar_capacity_mw, bess_capacity_mwh, availability) -> pd.DataFrame:
+    """
+    Solar+BESS LCOE for every row of a Solar+BESS parameter frame.
+
+    Args:
+        params (pd.DataFrame): Columns of `lcoe_helpers.SOLAR_BESS_PARAMS`, one row per (country, year).
+        solar_capacity_mw, bess_capacity_mwh (array-like or scalar): Aligned with `params`' rows.
+
+    Returns:
+        pd.DataFrame: 'LCOE' and 'Total_Capex' on `params`' index; NaN where any parameter is missing.
+    """
+    lcoe, total_capex = solar_bess_lcoe_vec(
+        solar_capacity_mw, bess_capacity_mwh, availability,
+        params["solar_capex"], params["bess_capex"], params["solar_opex"], params["bess_opex"],
+        params["discount_rate"], params["solar_lifetime"],
+    )
+    complete = params.notna().all(axis=1).to_numpy()
+    return pd.DataFrame({"LCOE": np.where(complete, lcoe, np.nan),
+                         "Total_Capex": np.where(complete, total_capex, np.nan)}, index=params.index)
+
+
+def conventional_frame(params: pd.DataFrame, capacity_mw=1.0) -> pd.DataFrame:
+    """
+    Conventional LCOE for every row of a `conventional_params(tech)` frame (incl. capacity_factor).
+
+    Returns:
+        pd.DataFrame: 'LCOE' and 'Total_Capex' on `params`' index; NaN where any parameter is missing.
+    """
+    lcoe, total_capex = conventional_lcoe_vec(
+        capacity_mw, params["capacity_factor"], params["capex_kw"], params["opex_fixed_kwyr"],
+        params["opex_var_mwh"], params["fuel_cost_mwh_fuel"], params["efficiency"],
+        params["discount_rate"], params["lifetime"],
+    )
+    complete = params.notna().all(axis=1).to_numpy()
+    return pd.DataFrame({"LCOE": np.where(complete, lcoe, np.nan),
+                         "Total_Capex": np.where(complete, total_capex, np.nan)}, index=params.index)
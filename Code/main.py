@@ -1,14 +1,27 @@
 # main_workflow.py
+import argparse
+import time
+import numpy as np
 import pandas as pd
 import os
-from tqdm import tqdm  # progress bars
 
 # --- Import your custom modules ---
-from reader import get_val
+from param_cube import load_cube
+from planner import plan_lookups, doomed_countries, print_plan, write_plan
+from provenance import get_recorder, provenance_columns
 from profile import generate_hourly_solar_profile
 from optimiser import optimise_bess
-from lcoe_helpers import calculate_solar_bess_lcoe, calculate_conventional_lcoe
-from lcoe.lcoe import lcoe
+from lcoe_helpers import SOLAR_BESS_PARAMS, conventional_params, require_params
+from lcoe_vec import solar_bess_frame, conventional_frame
+from uncertainty import run_uncertainty
+from cashflow import solar_bess_cashflow_lcoe
+from incremental import RunManifest, param_hashes, row_key
+from sizing_cache import sizing_key
+from runner import run_tasks, failures
+from checkpoint import Checkpoint
+from backends import BACKENDS, get_backend
+from results_sink import ResultsSink
+from telemetry import Telemetry, print_summary
 
 # --- Configuration ---
 CWD = os.path.dirname(os.path.abspath(__file__))
@@ -17,130 +30,458 @@ OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
 os.makedirs(OUTPUT_PATH, exist_ok=True)
 
 BASE_YEAR = 2024
+# Weather year of the solar profile used for sizing
+SOLAR_YEAR = 2023
 YEARS = list(range(2010, 2025))
 CONVENTIONAL_TECHS = ["Coal", "Gas"]
+TARGET_COUNTRIES = ["Chile", "Australia", "Spain"]
 
 # Availability used by Solar+BESS LCOE
-availability = 0.8
+AVAILABILITY = 0.8
+
+PARAM_SPECS = {"Solar+BESS": SOLAR_BESS_PARAMS, **{tech: conventional_params(tech) for tech in CONVENTIONAL_TECHS}}
+OUTPUT_COLS = [
+    "Country", "Year", "Tech", "LCOE", "Cost",
+    "Solar_Capacity_MW", "BESS_Energy_MWh"
+]
+# Only written when the matching option is on
+OPTIONAL_COLS = ["LCOE_Cashflow"]
+PROVENANCE_COLS = ["Params_Direct", "Params_Proxy", "Params_World", "Params_Missing", "Fallback_Params"]
+
 
 # --- Load Data ---
-print("Loading input data...")
-countries_df = pd.read_csv(os.path.join(INPUT_PATH, "all_country_coordinates_2.csv"))
-capex_opex_df = pd.read_excel(os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx"))
-print("Data loaded successfully.")
-
-# --- Optional: specify which countries to run ---
-target_countries = ["Chile", "Australia", "Spain"]  # or [] to process all
-if target_countries:
-    countries_to_process = countries_df[countries_df["Country"].isin(target_countries)]
-    print(f"Running analysis for {len(countries_to_process)} selected countries: {', '.join(target_countries)}")
-else:
-    countries_to_process = countries_df
-    print(f"Running analysis for all {len(countries_to_process)} countries.")
-
-# --- Main Analysis Loop ---
-all_results = []
-
-for _, row in tqdm(
-    countries_to_process.iterrows(),
-    total=countries_to_process.shape[0],
-    desc="Processing Countries"
-):
-    country = row["Country"]
-    lat = row["Latitude"]
-    lon = row["Longitude"]
+def load_inputs():
+    """Country coordinates and the parameter cube (only rebuilt from the Excel when inputs change)."""
+    print("Loading input data...")
+    countries_df = pd.read_csv(os.path.join(INPUT_PATH, "all_country_coordinates_2.csv"))
+    cube = load_cube(years=sorted(set(YEARS) | {BASE_YEAR}), specs=PARAM_SPECS)
+    print("Data loaded successfully.")
+    return countries_df, cube
+
+
+def select_countries(countries_df, target_countries):
+    """Rows of `countries_df` to run; an empty `target_countries` means all of them."""
+    if target_countries:
+        countries_to_process = countries_df[countries_df["Country"].isin(target_countries)]
+        print(f"Running analysis for {len(countries_to_process)} selected countries: {', '.join(target_countries)}")
+    else:
+        countries_to_process = countries_df
+        print(f"Running analysis for all {len(countries_to_process)} countries.")
+    return countries_to_process
+
+
+# --- Per-country Sizing ---
+def size_country(country, lat, lon, params, profile=None):
+    """
+    Size Solar+BESS for `country` in the base year.
 
+    Args:
+        params (dict): {group: DataFrame indexed by (country, year)} from `ParamCube.to_params`.
+        profile (np.ndarray, optional): Hourly solar profile; generated for (lat, lon) if not given.
+
+    Returns:
+        dict: Country, Solar_Capacity_MW, BESS_Energy_MWh and 'timings' (profile/solve seconds),
+        or None if the sizing fails.
+    """
     print(f"\nProcessing {country}...")
 
     # Generate solar profile once per country (kept as-is for optimiser)
-    yearly_profile = generate_hourly_solar_profile(lat, lon, solar_year=2023)
+    start = time.perf_counter()
+    yearly_profile = profile
+    if yearly_profile is None:
+        yearly_profile = generate_hourly_solar_profile(lat, lon, solar_year=SOLAR_YEAR)
+    profile_seconds = time.perf_counter() - start
 
     # --- Step 1: Optimize Solar+BESS capacity for the base year ---
     print(f"  Optimizing Solar+BESS for base year {BASE_YEAR}...")
     try:
-        solar_capex_base = get_val(capex_opex_df, country, BASE_YEAR, "capex", "Solar")
-        bess_capex_base = get_val(capex_opex_df, country, BASE_YEAR, "capex", "BESS")
-
+        base_params = require_params(params["Solar+BESS"].loc[(country, BASE_YEAR)], ["solar_capex", "bess_capex"])
         cost, solar_cap, bess_energy, results_1 = optimise_bess(
-            yearly_profile, solar_capex_base, bess_capex_base
+            yearly_profile, base_params["solar_capex"], base_params["bess_capex"]
         )
+    except ValueError as e:
+        print(f"  ERROR: Could not optimize for {country} in {BASE_YEAR}. Skipping. Reason: {e}")
+        return None  # Skip to the next country if optimization fails
 
-        # pass `availability` to the helper
-        result = calculate_solar_bess_lcoe(
-            country, BASE_YEAR, solar_cap, bess_energy, availability, capex_opex_df
-        )
+    print(f"  -> Optimal capacity for {country}: Solar={solar_cap:.2f} MW, BESS={bess_energy:.2f} MWh")
+    return {"Country": country, "Solar_Capacity_MW": solar_cap, "BESS_Energy_MWh": bess_energy,
+            "timings": {"profile": profile_seconds, "solve": time.perf_counter() - start - profile_seconds}}
 
-        # store the LCOE value
-        all_results.append({
-            "Country": country, "Year": BASE_YEAR, "Tech": "Solar+BESS",
-            "LCOE": result.get("LCOE") if result else None,
-            "Cost": result.get("Total_Capex") if result else None,
-            "Solar_Capacity_MW": solar_cap, "BESS_Energy_MWh": bess_energy,
-        })
-        print(f"  -> Optimal capacity for {country}: Solar={solar_cap:.2f} MW, BESS={bess_energy:.2f} MWh")
 
-    except ValueError as e:
-        print(f"  ERROR: Could not optimize for {country} in {BASE_YEAR}. Skipping. Reason: {e}")
-        continue  # Skip to the next country if optimization fails
+def _size_task(task):
+    return size_country(*task)
 
-    # --- Step 2: Historical Solar+BESS LCOE with fixed capacities ---
-    print(f"  Calculating historical Solar+BESS LCOE...")
-    for year in YEARS:
-        if year == BASE_YEAR:
-            continue  # already done
 
-        #pass `availability` (simple helper expects this)
-        result = calculate_solar_bess_lcoe(
-            country, year, solar_cap, bess_energy, availability, capex_opex_df
-        )
+def _size_shared(task, shared):
+    country, lat, lon = task
+    return size_country(country, lat, lon, {"Solar+BESS": shared["params"]}, shared["profiles"].get(country))
 
-        if result:
-            all_results.append({
-                "Country": country, "Year": year, "Tech": "Solar+BESS",
-                "LCOE": result.get("LCOE"), "Cost": result.get("Total_Capex"),
-                "Solar_Capacity_MW": solar_cap, "BESS_Energy_MWh": bess_energy,
-            })
 
-    # --- Step 3: Conventional tech LCOE across all years ---
-    # The helper needs capacity_mw and capacity_factor.
-    # use 1.0 MW (scale-invariant) and read CF from the sheet per (country, year, tech).
+def sizing_keys(countries, params):
+    """country -> `sizing_cache.sizing_key` of its base-year sizing (site, solar year, solar/BESS capex)."""
+    capex = params["Solar+BESS"][["solar_capex", "bess_capex"]]
+    return {
+        country: sizing_key(round(float(lat), 4), round(float(lon), 4), SOLAR_YEAR, *capex.loc[(country, BASE_YEAR)])
+        for country, lat, lon in zip(countries["Country"], countries["Latitude"], countries["Longitude"])
+    }
+
+
+def size_countries(countries, params, processes=1, timeout=None, checkpoint=None, resume=False, profiles=None,
+                   backend=None, telemetry=None):
+    """
+    Step 1 for every row of `countries` ('Country', 'Latitude', 'Longitude'), in a process pool.
+
+    A country whose sizing raises, crashes or exceeds `timeout` seconds is reported
+    and left out; the others are unaffected.
+
+    Args:
+        checkpoint (Checkpoint, optional): Each sizing is stored as soon as it finishes,
+            keyed by (country, BASE_YEAR, 'Solar+BESS', sizing key).
+        resume (bool): Reuse sizings already stored in `checkpoint` instead of solving them again.
+        profiles (dict, optional): country -> hourly solar profile, instead of generating them.
+        backend (optional): A `backends` backend to run the solves on instead of the local
+            runner (`processes` and `timeout` then don't apply). Parameters and profiles
+            are shipped once per worker.
+        telemetry (Telemetry, optional): Records the 'sizing' stage time and every task.
+
+    Returns:
+        dict: country -> `size_country` result (None if it could not be sized), in `countries` order.
+    """
+    keys = sizing_keys(countries, params)
+    sized = {}
+    if checkpoint is not None and resume:
+        for country, key in keys.items():
+            done, result = checkpoint.done(country, BASE_YEAR, "Solar+BESS", key)
+            if done:
+                sized[country] = result
+        print(f"Resuming: {len(sized)} of {len(keys)} countries already sized.")
+
+    def _checkpoint(result):
+        country = result["task"][0]
+        checkpoint.record(country, BASE_YEAR, "Solar+BESS", keys[country], result["result"],
+                          result["error"], result["seconds"])
+
+    base = params["Solar+BESS"]
+    todo = [
+        (country, lat, lon)
+        for country, lat, lon in zip(countries["Country"], countries["Latitude"], countries["Longitude"])
+        if country not in sized
+    ]
+    on_result = _checkpoint if checkpoint is not None else None
+    telemetry = telemetry or Telemetry()
+    telemetry.reused += len(sized)
+    with telemetry.stage("sizing"):
+        if backend is not None:
+            shared = {"params": base.xs(BASE_YEAR, level="year", drop_level=False), "profiles": profiles or {}}
+            results = backend.map(_size_shared, todo, shared, on_result, desc="Processing Countries")
+            # The cluster's size, not --processes, is what the solves had to use
+            telemetry.workers = backend.workers
+        else:
+            # Workers only get their own base-year row, not the whole parameter table
+            tasks = [
+                (country, lat, lon, {"Solar+BESS": base.loc[[(country, BASE_YEAR)]]}, (profiles or {}).get(country))
+                for country, lat, lon in todo
+            ]
+            results = run_tasks(_size_task, tasks, processes, timeout, desc="Processing Countries",
+                                on_result=on_result)
+    for r in results:
+        telemetry.record_task(r["task"][0], r["seconds"], r["ok"] and r["result"] is not None,
+                              (r["result"] or {}).get("timings"))
+    for failed in failures(results):
+        print(f"  ERROR: Sizing failed for {failed['task'][0]}. Skipping. Reason: {failed['error'].splitlines()[0]}")
+    sized.update({r["task"][0]: r["result"] for r in results})
+    return {country: sized[country] for country in keys}
+
+
+# --- Vectorised LCOE ---
+def solar_bess_results(sizing, params, availability=AVAILABILITY):
+    """
+    Step 2: Solar+BESS LCOE for every sized country and year with its capacities held fixed.
+
+    The base-year row is always kept (LCOE/Cost empty if a parameter is missing);
+    other years only where every parameter is present.
+    """
+    frame = params.reset_index().merge(sizing, left_on="country", right_on="Country")
+    result = solar_bess_frame(
+        frame[list(SOLAR_BESS_PARAMS)], frame["Solar_Capacity_MW"], frame["BESS_Energy_MWh"], availability
+    )
+    keep = result["LCOE"].notna().to_numpy() | (frame["year"] == BASE_YEAR).to_numpy()
+    return pd.DataFrame({
+        "Country": frame["Country"], "Year": frame["year"], "Tech": "Solar+BESS",
+        "LCOE": result["LCOE"], "Cost": result["Total_Capex"],
+        "Solar_Capacity_MW": frame["Solar_Capacity_MW"], "BESS_Energy_MWh": frame["BESS_Energy_MWh"],
+    })[keep]
+
+
+def conventional_results(params, countries):
+    """
+    Step 3: Conventional tech LCOE for `countries` across all years.
+
+    Uses 1.0 MW (scale-invariant) and the capacity factor from the sheet per
+    (country, year, tech); rows with any missing parameter are skipped.
+    """
+    rows = []
     for tech in CONVENTIONAL_TECHS:
-        print(f"  Calculating {tech} LCOE for all years...")
-        for year in YEARS:
-            try:
-                cf = get_val(capex_opex_df, country, year, "capacity_factor", tech)
-                result = calculate_conventional_lcoe(
-                    country=country,
-                    year=year,
-                    tech=tech,
-                    capacity_mw=1.0,               # FIX: explicit capacity for helper signature
-                    capacity_factor=cf,             # FIX: pass CF from the table
-                    capex_opex_df=capex_opex_df
-                )
-                if result:
-                    all_results.append({
-                        "Country": country, "Year": year, "Tech": tech,
-                        "LCOE": result.get("LCOE"),
-                        "Cost": result.get("Total_Capex"),
-                        "Solar_Capacity_MW": None, "BESS_Energy_MWh": None,
-                    })
-            except ValueError as e:
-                print(f"   - Skipping {tech} {year} for {country}: {e}")
-                continue
-
-# --- Finalize and Save Results ---
-print("\nAnalysis complete. Compiling and saving results...")
-results_df = pd.DataFrame(all_results)
-
-# Reorder columns for clarity
-output_cols = [
-    "Country", "Year", "Tech", "LCOE", "Cost",
-    "Solar_Capacity_MW", "BESS_Energy_MWh"
-]
-results_df = results_df[output_cols]
+        tech_params = params[tech][params[tech].index.get_level_values("country").isin(countries)]
+        result = conventional_frame(tech_params, capacity_mw=1.0).dropna(subset=["LCOE"]).reset_index()
+        rows.append(pd.DataFrame({
+            "Country": result["country"], "Year": result["year"], "Tech": tech,
+            "LCOE": result["LCOE"], "Cost": result["Total_Capex"],
+            "Solar_Capacity_MW": None, "BESS_Energy_MWh": None,
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+
+def add_cashflow_lcoe(results_df, params, availability=AVAILABILITY):
+    """
+    'LCOE_Cashflow' for the Solar+BESS rows: year-by-year cash flows with BESS
+    replacement and degradation (see cashflow.py) instead of the flat annuity.
+    """
+    results_df = results_df.copy()
+    solar_bess = results_df["Tech"] == "Solar+BESS"
+    rows = results_df[solar_bess]
+    keys = pd.MultiIndex.from_arrays([rows["Country"], rows["Year"]], names=["country", "year"])
+    cashflow = solar_bess_cashflow_lcoe(
+        params.reindex(keys), rows["Solar_Capacity_MW"], rows["BESS_Energy_MWh"], availability
+    )
+    results_df["LCOE_Cashflow"] = np.nan
+    results_df.loc[solar_bess, "LCOE_Cashflow"] = cashflow["LCOE"].to_numpy()
+    return results_df
+
+
+def run_lcoe(sizing, params, availability=AVAILABILITY):
+    """Steps 2 and 3 for all sized countries at once, ordered per country as Solar+BESS, then CONVENTIONAL_TECHS."""
+    if sizing.empty:
+        return pd.DataFrame(columns=OUTPUT_COLS)
+    results_df = pd.concat([
+        solar_bess_results(sizing, params["Solar+BESS"], availability),
+        conventional_results(params, sizing["Country"]),
+    ], ignore_index=True)
+    results_df = results_df[results_df["Year"].isin(YEARS + [BASE_YEAR])]
+    return order_results(results_df, sizing["Country"])
+
+
+def order_results(results_df, countries):
+    """Per country (in `countries` order): base-year Solar+BESS first, then the other years, then each conventional tech."""
+    order = pd.DataFrame({
+        "country": results_df["Country"].map({c: i for i, c in enumerate(countries)}),
+        "tech": results_df["Tech"].map({t: i for i, t in enumerate(["Solar+BESS"] + CONVENTIONAL_TECHS)}),
+        "base": ~((results_df["Tech"] == "Solar+BESS") & (results_df["Year"] == BASE_YEAR)),
+        "year": results_df["Year"],
+    })
+    return results_df.loc[order.sort_values(["country", "tech", "base", "year"], kind="stable").index]
+
+
+def _row_keys(results_df):
+    return [row_key(t, c, y) for t, c, y in zip(results_df["Tech"], results_df["Country"], results_df["Year"])]
+
+
+def run_incremental(countries_to_process, params, availability=AVAILABILITY, manifest=None, processes=1,
+                    timeout=None, checkpoint=None, resume=False, backend=None, telemetry=None):
+    """
+    Steps 1-3, recomputing only what changed since the last incremental run (see incremental.py).
+
+    Countries whose sizing inputs are unchanged reuse the stored capacities without
+    calling `optimise_bess` (a failed or timed-out sizing stores none and is retried); rows whose inputs are unchanged are copied from the
+    previous results. Countries outside `countries_to_process` keep their manifest entries.
+    """
+    manifest = manifest or RunManifest.load()
+
+    # --- Step 1: size only countries whose site or base-year capex changed, or whose sizing failed ---
+    keys = sizing_keys(countries_to_process, params)
+    stale = countries_to_process[[
+        country not in manifest.sizing or manifest.sizing[country]["key"] != key
+        or "Solar_Capacity_MW" not in manifest.sizing[country]
+        for country, key in keys.items()
+    ]]
+    telemetry = telemetry or Telemetry()
+    telemetry.reused += len(countries_to_process) - len(stale)
+    sized_stale = size_countries(stale, params, processes, timeout, checkpoint, resume, backend=backend,
+                                 telemetry=telemetry)
+    for country, sized in sized_stale.items():
+        manifest.sizing[country] = {"key": keys[country], **{
+            k: v for k, v in (sized or {}).items() if k in ("Solar_Capacity_MW", "BESS_Energy_MWh")
+        }}
+    solved = len(stale)
+
+    sizing = [
+        {"Country": country, **{k: manifest.sizing[country][k] for k in ("Solar_Capacity_MW", "BESS_Energy_MWh")}}
+        for country in keys if "Solar_Capacity_MW" in manifest.sizing[country]
+    ]
+    sizing = pd.DataFrame(sizing, columns=["Country", "Solar_Capacity_MW", "BESS_Energy_MWh"])
+
+    # --- Input hash of every row this run can produce ---
+    hashes = param_hashes("Solar+BESS", params["Solar+BESS"], {
+        country: (solar, bess, availability) for country, solar, bess in sizing.itertuples(index=False)
+    })
+    for tech in CONVENTIONAL_TECHS:
+        hashes.update(param_hashes(tech, params[tech], {country: (True,) for country in sizing["Country"]}))
+    changed = manifest.changed(hashes)
+
+    # --- Steps 2 and 3 for the changed rows only ---
+    with telemetry.stage("lcoe"):
+        changed_countries = {key.split("|")[1] for key in changed}
+        fresh = run_lcoe(sizing[sizing["Country"].isin(changed_countries)], params, availability)
+        fresh = fresh[[key in changed for key in _row_keys(fresh)]]
+    with telemetry.stage("io"):
+        previous = manifest.results(OUTPUT_COLS)
+    previous_keys = _row_keys(previous)
+    kept = previous[[key in hashes and key not in changed for key in previous_keys]]
+    parts = [part for part in (kept, fresh) if not part.empty]
+    results_df = order_results(pd.concat(parts, ignore_index=True), sizing["Country"]) if parts \
+        else pd.DataFrame(columns=OUTPUT_COLS)
+    print(f"\nIncremental run: {solved} sizing solves, {len(changed)} of {len(hashes)} rows recomputed.")
+    telemetry.count("rows_recomputed", len(changed))
+
+    # Rows of countries not run this time stay in the manifest for later runs
+    other = previous[[key not in hashes for key in previous_keys]]
+    manifest.rows.update(hashes)
+    with telemetry.stage("io"):
+        manifest.save(pd.concat([other, results_df[OUTPUT_COLS]], ignore_index=True))
+    return results_df
+
+
+def save_results(results_df, lookups=None, parquet=False):
+    """
+    Write lcoe_results.csv (columns in OUTPUT_COLS order) and return the DataFrame.
+
+    With `lookups`, each row also gets the provenance of the parameters behind it
+    (PROVENANCE_COLS) and the run's provenance summary is written alongside. With
+    `parquet`, the finished table is also exported to the outputs/lcoe_results/ dataset,
+    partitioned by Tech and Year. This is a post-run export, not streaming: a main.py run
+    holds at most countries x years x techs rows, so the table is built in memory first
+    (scenarios.py is what streams, scenario by scenario).
+    """
+    print("\nAnalysis complete. Compiling and saving results...")
+    results_df = results_df[OUTPUT_COLS + [c for c in OPTIONAL_COLS if c in results_df]].reset_index(drop=True)
+
+    if lookups is not None:
+        provenance = provenance_columns(lookups)
+        results_df = results_df.join(provenance[PROVENANCE_COLS], on=["Tech", "Country", "Year"])
+
+    output_file = os.path.join(OUTPUT_PATH, "lcoe_results.csv")
+    results_df.to_csv(output_file, index=False)
+    print(f"Results successfully saved to {output_file}")
+    if parquet:
+        dataset = os.path.join(OUTPUT_PATH, "lcoe_results")
+        with ResultsSink(dataset, dtypes={"Solar_Capacity_MW": float, "BESS_Energy_MWh": float,
+                                          "Fallback_Params": "string"}) as sink:
+            sink.write(results_df)
+        print(f"Results also saved to {dataset} ({sink.rows_written} rows, partitioned by Tech/Year)")
+
+    recorder = get_recorder()
+    summary_file = os.path.join(OUTPUT_PATH, "provenance_summary.csv")
+    recorder.summary().to_csv(summary_file, index=False)
+    print(f"Parameter provenance {recorder.totals()} saved to {summary_file}")
+    if recorder.keep_records:
+        recorder.records().to_csv(os.path.join(OUTPUT_PATH, "provenance_records.csv"), index=False)
+
+    print(results_df[OUTPUT_COLS].head())
+    return results_df
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solar+BESS and conventional LCOE per country and year.")
+    parser.add_argument("--countries", nargs="*", default=TARGET_COUNTRIES,
+                        help="Countries to run (no names = all countries).")
+    parser.add_argument("--availability", type=float, default=AVAILABILITY)
+    parser.add_argument("--plan", action="store_true",
+                        help="Resolve every parameter lookup, report coverage and exit without solving.")
+    parser.add_argument("--skip-doomed", action="store_true",
+                        help="Don't solve countries whose Solar+BESS LCOE the plan shows cannot be computed.")
+    parser.add_argument("--cashflow", action="store_true",
+                        help="Add a Solar+BESS LCOE from year-by-year cash flows (BESS replacement, degradation).")
+    parser.add_argument("--uncertainty", type=int, default=0, metavar="DRAWS",
+                        help="Also write Monte Carlo LCOE bands with this many draws to lcoe_uncertainty.csv.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --uncertainty.")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Countries sized in parallel (0 = one per CPU).")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Seconds before a country's sizing is abandoned.")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="Run the sizing solves on a local pool, a Dask or a Ray cluster instead of --processes.")
+    parser.add_argument("--address", default=None,
+                        help="Dask scheduler or Ray head address for --backend (default: start a local cluster).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip countries already sized by an interrupted run with the same inputs.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-solve sizings and recompute rows whose inputs changed since the last --incremental run.")
+    parser.add_argument("--parquet", action="store_true",
+                        help="After the run, also export the results to outputs/lcoe_results/ "
+                             "(Parquet, partitioned by Tech and Year).")
+    parser.add_argument("--provenance-records", action="store_true",
+                        help="Also write every parameter lookup to provenance_records.csv.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    telemetry = Telemetry(args.processes or os.cpu_count())
+    with telemetry.stage("lookup"):
+        countries_df, cube = load_inputs()
+        countries_to_process = select_countries(countries_df, args.countries)
+
+        # --- Parameter Lookups ---
+        # Every parameter for every selected country, year and tech sliced from the cube,
+        # instead of one get_val call per value inside the loops below.
+        params, lookups = cube.to_params(PARAM_SPECS, countries_to_process["Country"],
+                                         sorted(set(YEARS) | {BASE_YEAR}))
+    recorder = get_recorder()
+    recorder.keep_records = args.provenance_records
+
+    if args.plan or args.skip_doomed:
+        plan = plan_lookups(lookups, BASE_YEAR)
+        print_plan(plan)
+        if args.plan:
+            write_plan(plan, lookups)
+            return plan
+        doomed = doomed_countries(plan)
+        if doomed:
+            print(f"\nSkipping {len(doomed)} countries with no computable Solar+BESS LCOE: {', '.join(doomed)}")
+            countries_to_process = countries_to_process[~countries_to_process["Country"].isin(doomed)]
+            lookups = lookups[~lookups["country"].isin(doomed)]
+    recorder.record_frame(lookups)
+
+    backend = get_backend(args.backend, args.address, args.processes or None) if args.backend else None
+    # Every finished sizing is checkpointed, so an interrupted run can continue with --resume
+    with Checkpoint() as checkpoint:
+        if args.incremental:
+            results_df = run_incremental(countries_to_process, params, args.availability, processes=args.processes,
+                                         timeout=args.timeout, checkpoint=checkpoint, resume=args.resume,
+                                         backend=backend, telemetry=telemetry)
+        else:
+            # --- Main Analysis Loop: size each country ---
+            sized = size_countries(countries_to_process, params, args.processes, args.timeout,
+                                   checkpoint, args.resume, backend=backend, telemetry=telemetry)
+            sizing = [result for result in sized.values() if result]
+
+            # --- Steps 2 and 3: every LCOE in one pass ---
+            print("\nCalculating Solar+BESS and conventional LCOE for all years...")
+            sizing = pd.DataFrame(sizing, columns=["Country", "Solar_Capacity_MW", "BESS_Energy_MWh"])
+            with telemetry.stage("lcoe"):
+                results_df = run_lcoe(sizing, params, args.availability)
+    if backend is not None:
+        backend.close()
+    if args.cashflow:
+        with telemetry.stage("lcoe"):
+            results_df = add_cashflow_lcoe(results_df, params["Solar+BESS"], args.availability)
+
+    # --- Finalize and Save Results ---
+    with telemetry.stage("io"):
+        results_df = save_results(results_df, lookups, args.parquet)
+
+    if args.uncertainty:
+        with telemetry.stage("uncertainty"):
+            bands = run_uncertainty(results_df, params, args.availability, args.uncertainty, seed=args.seed)
+            bands_file = os.path.join(OUTPUT_PATH, "lcoe_uncertainty.csv")
+            bands.to_csv(bands_file, index=False)
+        print(f"LCOE bands from {args.uncertainty} draws saved to {bands_file}")
 
-output_file = os.path.join(OUTPUT_PATH, "lcoe_results.csv")
-results_df.to_csv(output_file, index=False)
+    # --- Telemetry ---
+    report = telemetry.report(recorder.totals(), len(results_df))
+    print_summary(report)
+    print(f"Telemetry report saved to {telemetry.write(report)}")
+    return results_df
 
-print(f"Results successfully saved to {output_file}")
-print(results_df.head())
+if __name__ == "__main__":
+    main()
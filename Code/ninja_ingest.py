@@ -0,0 +1,172 @@
+"""
+Bulk ingestion of Renewables.ninja wind and solar CSVs into a columnar resource store.
+
+Scans a directory of ninja downloads, parses them in parallel (site coordinates
+and technology come from each file's metadata header) and writes one Parquet
+file with one row group per site, plus a site index. Profiles then load lazily
+by site without re-parsing any CSV:
+
+    python ninja_ingest.py C:/path/to/ninja_downloads
+    store = ResourceStore()
+    wind = store.load(store.nearest("wind", 54.78, -1.98))
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from profile import read_ninja_metadata
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESOURCE_PATH = os.path.join(CWD, "..", "resources")
+DATA_FILE = "ninja_profiles.parquet"
+SITES_FILE = "ninja_sites.csv"
+
+
+def parse_ninja_file(filepath):
+    """
+    Parse one Renewables.ninja CSV.
+
+    Returns:
+        tuple: (metadata dict, times as datetime64[ns] array, normalised float32 values)
+    """
+    meta = read_ninja_metadata(filepath)
+    df = pd.read_csv(filepath, skiprows=3, usecols=["time", "electricity"], parse_dates=["time"])
+
+    # Same normalisation as profile.parse_renewables_ninja
+    values = df["electricity"].to_numpy(dtype=np.float64)
+    peak = values.max()
+    values = values / peak if peak > 0 else values
+
+    meta["source_file"] = os.path.abspath(filepath)
+    return meta, df["time"].to_numpy(dtype="datetime64[ns]"), values.astype(np.float32)
+
+
+def ingest_directory(directory, out_dir=DEFAULT_RESOURCE_PATH, processes=None, pattern="*.csv"):
+    """
+    Parse every ninja CSV under `directory` and (re)build the resource store.
+
+    Args:
+        directory (str): Folder searched recursively for CSVs.
+        out_dir (str, optional): Store directory.
+        processes (int, optional): Parser processes. Defaults to the CPU count.
+        pattern (str, optional): Glob for candidate files.
+
+    Returns:
+        pd.DataFrame: The site index that was written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    files = sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+    if not files:
+        raise ValueError(f"No files matching '{pattern}' under {directory}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    schema = pa.schema([
+        ("site_id", pa.int32()),
+        ("time", pa.timestamp("ns")),
+        ("value", pa.float32()),
+    ])
+    tmp_path = os.path.join(out_dir, DATA_FILE + ".tmp")
+    sites = []
+    skipped = []
+
+    with ProcessPoolExecutor(processes) as pool, pq.ParquetWriter(tmp_path, schema) as writer:
+        results = pool.map(_parse_or_none, files, chunksize=8)
+        for filepath, result in tqdm(zip(files, results), total=len(files), desc="Ingesting ninja CSVs"):
+            if result is None:
+                skipped.append(filepath)
+                continue
+            meta, times, values = result
+            site_id = len(sites)
+            # One write_table call per site -> one row group per site, which is what makes loads lazy
+            writer.write_table(pa.table({
+                "site_id": pa.array(np.full(len(values), site_id, dtype=np.int32)),
+                "time": pa.array(times),
+                "value": pa.array(values),
+            }, schema=schema))
+            sites.append({
+                "site_id": site_id,
+                "tech": meta.get("tech"),
+                "lat": meta.get("lat"),
+                "lon": meta.get("lon"),
+                "dataset": meta.get("dataset"),
+                "date_from": meta.get("date_from"),
+                "date_to": meta.get("date_to"),
+                "hours": len(values),
+                "row_group": site_id,
+                "source_file": meta["source_file"],
+            })
+
+    os.replace(tmp_path, os.path.join(out_dir, DATA_FILE))
+    sites_df = pd.DataFrame(sites)
+    sites_df.to_csv(os.path.join(out_dir, SITES_FILE), index=False)
+
+    for filepath in skipped:
+        print(f"WARNING: Skipped {filepath}: not a Renewables.ninja time series.")
+    return sites_df
+
+
+def _parse_or_none(filepath):
+    try:
+        return parse_ninja_file(filepath)
+    except (ValueError, KeyError, UnicodeDecodeError):
+        return None
+
+
+class ResourceStore:
+    """Lazy, per-site reader for a store written by `ingest_directory`."""
+
+    def __init__(self, path=DEFAULT_RESOURCE_PATH):
+        self.path = path
+        self.sites = pd.read_csv(os.path.join(path, SITES_FILE))
+        self._file = None
+
+    def _parquet(self):
+        import pyarrow.parquet as pq
+
+        if self._file is None:
+            self._file = pq.ParquetFile(os.path.join(self.path, DATA_FILE))
+        return self._file
+
+    def load(self, site_id, with_time=False):
+        """
+        Read one site's normalised profile (only that site's row group is touched).
+
+        Returns:
+            np.ndarray of float32, or a pd.Series indexed by time if `with_time`.
+        """
+        row_group = int(self.sites.loc[self.sites["site_id"] == site_id, "row_group"].iloc[0])
+        table = self._parquet().read_row_group(row_group, columns=["time", "value"] if with_time else ["value"])
+        values = table.column("value").to_numpy()
+        if with_time:
+            return pd.Series(values, index=pd.DatetimeIndex(table.column("time").to_numpy()), name="value")
+        return values
+
+    def nearest(self, tech, latitude, longitude):
+        """site_id of the closest site for `tech` ('wind' or 'solar')."""
+        candidates = self.sites[self.sites["tech"] == tech]
+        if candidates.empty:
+            raise ValueError(f"No '{tech}' sites in resource store {self.path}")
+        dist = (candidates["lat"] - latitude) ** 2 + (candidates["lon"] - longitude) ** 2
+        return int(candidates.loc[dist.idxmin(), "site_id"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest Renewables.ninja CSVs into the resource store.")
+    parser.add_argument("directory")
+    parser.add_argument("--out", default=DEFAULT_RESOURCE_PATH)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    sites_df = ingest_directory(args.directory, args.out, args.processes)
+    print(f"Ingested {len(sites_df)} sites in {round(time.time() - start_time, 1)} seconds "
+          f"({sites_df['tech'].value_counts().to_dict()}) -> {os.path.abspath(args.out)}")
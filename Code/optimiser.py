@@ -1,11 +1,15 @@
 from Code.archive.assumptions import *
 from profile import generate_hourly_solar_profile
+from profile_store import attach_profile_matrix
 
 import pyomo.environ as pyo
 import pandas as pd
 import numpy as np
 import time
+from multiprocessing import Pool
 from pyomo.opt import SolverFactory
+from scipy import sparse
+from scipy.optimize import linprog
 
 #===Model Setup===
 # -----------------------------
@@ -121,6 +125,110 @@ def optimise_bess(
             pyo.value(model.bess_energy),
             results_data)
 
+def optimise_bess_fast(
+    solar_profile,
+    solar_capex,
+    bess_energy_capex,
+    load=1.0,
+    availability=0.8,
+    efficiency=0.9,
+    start_soc=0.5,
+):
+    """
+    Same LP as `optimise_bess`, built directly as sparse matrices and solved with HiGHS.
+
+    Skips Pyomo model construction (which dominates runtime for 8760-hour
+    models), so it is the sizing path for many-site runs such as grid mode.
+
+    Variables are ordered [solar_capacity, bess_energy, bess_flow[T], soc[T], energy_served[T]].
+
+    Returns:
+        tuple: (cost, solar_capacity, bess_energy, None), as `optimise_bess` without timeseries.
+    """
+    return optimise_bess_joint([solar_profile], solar_capex, bess_energy_capex, load=load,
+                               availability=availability, efficiency=efficiency, start_soc=start_soc)
+
+def optimise_bess_joint(
+    solar_profiles,
+    solar_capex,
+    bess_energy_capex,
+    load=1.0,
+    availability=0.8,
+    efficiency=0.9,
+    start_soc=0.5,
+):
+    """
+    Least-cost solar and BESS capacities that meet the target in each of several profiles.
+
+    Each profile (e.g. one year) is dispatched on its own from `start_soc` and must
+    serve `availability` of its own demand, so the design works in every one of them.
+    With one profile this is `optimise_bess_fast`.
+
+    Variables are ordered [solar_capacity, bess_energy] followed by
+    [bess_flow[T], soc[T], energy_served[T]] for each profile in turn.
+
+    Returns:
+        tuple: (cost, solar_capacity, bess_energy, None), as `optimise_bess_fast`.
+    """
+    S, B = 0, 1
+
+    def block(rows, cols, vals):
+        return np.asarray(rows).ravel(), np.asarray(cols).ravel(), np.broadcast_to(vals, np.shape(rows)).ravel()
+
+    eq, ub, b_ub, bounds = [], [], [], [(0, None), (0, None)]
+    var, eq_row, ub_row = 2, 0, 0
+    for solar_profile in solar_profiles:
+        p = np.asarray(solar_profile, dtype=float)
+        n = len(p)
+        demand = np.full(n, load, dtype=float)
+        t = np.arange(n)
+        f, soc, e = var + t, var + n + t, var + 2 * n + t
+
+        # --- Equalities ---
+        # soc[0] = start_soc * B ; soc[t] - soc[t-1] + flow[t] / efficiency = 0
+        r = eq_row + t
+        eq += [
+            block([eq_row, eq_row], [soc[0], B], [1.0, -start_soc]),
+            block(r[1:], soc[1:], 1.0),
+            block(r[1:], soc[:-1], -1.0),
+            block(r[1:], f[1:], 1.0 / efficiency),
+            # energy_served[t] - profile[t] * S - flow[t] = 0
+            block(n + r, e, 1.0),
+            block(n + r, np.full(n, S), -p),
+            block(n + r, f, -1.0),
+        ]
+
+        # --- Inequalities (<= 0 unless noted) ---
+        Sc, Bc = np.full(n, S), np.full(n, B)
+        r = ub_row + t
+        ub += [
+            block(r, soc, 1.0), block(r, Bc, -1.0),                    # soc <= B
+            block(n + r, f, 1.0), block(n + r, Sc, -1.0),              # flow <= S
+            block(2 * n + r, f, -1.0), block(2 * n + r, Sc, -1.0),     # -flow <= S
+            block(3 * n + r, f, 1.0), block(3 * n + r, soc, -efficiency),  # flow <= soc * efficiency
+            block(4 * n + r, f, -1.0), block(4 * n + r, Sc, -p),       # -flow <= S * profile
+            block(np.full(n, ub_row + 5 * n), e, -1.0),                # -sum(served) <= -availability * sum(demand)
+        ]
+        b_ub.append(np.zeros(5 * n + 1))
+        b_ub[-1][-1] = -availability * demand.sum()
+        bounds += [(None, None)] * n + [(0, None)] * n + list(zip(np.zeros(n), demand))
+        var, eq_row, ub_row = var + 3 * n, eq_row + 2 * n, ub_row + 5 * n + 1
+
+    rows, cols, vals = (np.concatenate(x) for x in zip(*eq))
+    A_eq = sparse.csr_matrix((vals, (rows, cols)), shape=(eq_row, var))
+    b_eq = np.zeros(eq_row)
+    rows, cols, vals = (np.concatenate(x) for x in zip(*ub))
+    A_ub = sparse.csr_matrix((vals, (rows, cols)), shape=(ub_row, var))
+
+    c = np.zeros(var)
+    c[S], c[B] = solar_capex, bess_energy_capex
+
+    res = linprog(c, A_ub=A_ub, b_ub=np.concatenate(b_ub), A_eq=A_eq, b_eq=b_eq, bounds=bounds, method="highs")
+    if res.status != 0:
+        raise ValueError(f"Fast sizing LP failed: {res.message}")
+
+    return float(res.fun), float(res.x[S]), float(res.x[B]), None
+
 def optimise_availability(solar_profile, solar_capacity, bess_energy, load,
                           efficiency=efficiency, start_soc=start_soc):
     """
@@ -207,6 +315,136 @@ def optimise_availability(solar_profile, solar_capacity, bess_energy, load,
 
     return availability, pd.DataFrame(results)
 
+def optimise_availability_stream(profile_chunks, solar_capacity, bess_energy, load,
+                                 efficiency=efficiency, start_soc=start_soc):
+    """
+    Dispatch fixed capacities over a stream of yearly profile chunks.
+
+    Each chunk (e.g. from `profile.iter_hourly_solar_profile`) is dispatched on
+    its own and the final state of charge carries into the next, so multi-year
+    horizons are evaluated one year at a time.
+
+    Args:
+        profile_chunks (iterable): (year, per-unit solar profile) tuples.
+        solar_capacity, bess_energy, load, efficiency, start_soc: As `optimise_availability`.
+
+    Returns:
+        pd.DataFrame: One row per year with 'Year', 'Hours', 'Availability' and 'End_SOC_MWh'.
+    """
+    rows = []
+    soc_fraction = start_soc
+    for year, chunk in profile_chunks:
+        availability, results = optimise_availability(
+            chunk, solar_capacity, bess_energy, load, efficiency=efficiency, start_soc=soc_fraction
+        )
+        end_soc = results["soc"].iloc[-1] if len(results) else 0.0
+        soc_fraction = end_soc / bess_energy if bess_energy > 0 else 0.0
+        rows.append({"Year": year, "Hours": len(chunk), "Availability": availability, "End_SOC_MWh": end_soc})
+    return pd.DataFrame(rows)
+
+def optimise_bess_stream(profile_chunks, solar_capex, bess_energy_capex, load=1.0, availability=0.8,
+                         efficiency=0.9, start_soc=0.5):
+    """
+    Sizes Solar+BESS so the availability target is met in every year of a profile stream.
+
+    Each year is first sized on its own with `optimise_bess`. A design that meets
+    one year's target can miss another's (a cloudy spell needs storage, a dimmer
+    year needs solar), so the design of the costliest year is dispatched in every
+    year with `optimise_availability`. Years that miss the target are kept and the
+    design is re-sized against all kept years jointly (`optimise_bess_joint`) until
+    every year passes. Only those years are held in memory; the others are read
+    one chunk at a time.
+
+    Args:
+        profile_chunks (callable or sequence): A zero-argument callable returning a fresh
+            (year, per-unit solar profile) stream, e.g.
+            `lambda: iter_hourly_solar_profile(lat, lon, 2005, 2023)`, or a list of such
+            tuples. The stream is read once to size and once per check.
+        solar_capex, bess_energy_capex, load, availability, efficiency, start_soc: As `optimise_bess`.
+
+    Returns:
+        tuple: (cost, solar_capacity, bess_energy, per-year DataFrame with 'Year', 'Cost',
+        'Solar_Capacity_MW', 'BESS_Energy_MWh' of that year alone and the design's 'Availability')
+    """
+    if callable(profile_chunks):
+        stream = profile_chunks
+    elif iter(profile_chunks) is profile_chunks:
+        raise TypeError("profile_chunks is read more than once: pass a callable returning the stream, "
+                        "not a generator")
+    else:
+        stream = lambda: iter(profile_chunks)
+
+    rows, costliest = [], None
+    for year, chunk in stream():
+        cost, solar_capacity, bess_energy, _ = optimise_bess(
+            chunk, solar_capex, bess_energy_capex, load=load, availability=availability,
+            efficiency=efficiency, start_soc=start_soc
+        )
+        rows.append({"Year": year, "Cost": cost, "Solar_Capacity_MW": solar_capacity, "BESS_Energy_MWh": bess_energy})
+        if costliest is None or cost > rows[costliest[0]]["Cost"]:
+            costliest = (len(rows) - 1, chunk)
+    by_year = pd.DataFrame(rows)
+
+    design = by_year.iloc[costliest[0]]
+    cost, solar_capacity, bess_energy = design["Cost"], design["Solar_Capacity_MW"], design["BESS_Energy_MWh"]
+    binding = {design["Year"]: costliest[1]}
+    while True:
+        met, missed = [], {}
+        for year, chunk in stream():
+            met.append(optimise_availability(chunk, solar_capacity, bess_energy, load, efficiency=efficiency,
+                                             start_soc=start_soc)[0])
+            # Allow for the solvers' tolerance on the target
+            if met[-1] < availability - 1e-6 and year not in binding:
+                missed[year] = chunk
+        if not missed:
+            break
+        binding.update(missed)
+        cost, solar_capacity, bess_energy, _ = optimise_bess_joint(
+            list(binding.values()), solar_capex, bess_energy_capex, load=load, availability=availability,
+            efficiency=efficiency, start_soc=start_soc
+        )
+    by_year["Availability"] = met
+    return cost, solar_capacity, bess_energy, by_year
+
+def _attach_worker(matrix_path):
+    attach_profile_matrix(matrix_path)
+
+def _optimise_site(args):
+    matrix_path, row, solar_capex, bess_energy_capex, kwargs = args
+    # The row is a view into the shared memory map; only this site's hours are converted
+    solar_profile = np.asarray(attach_profile_matrix(matrix_path).row(row), dtype=float)
+    cost, solar_capacity, bess_energy, _ = optimise_bess(solar_profile, solar_capex, bess_energy_capex, **kwargs)
+    return row, cost, solar_capacity, bess_energy
+
+def optimise_sites(matrix_path, rows, solar_capex, bess_energy_capex, processes=None, **kwargs):
+    """
+    Runs `optimise_bess` for many sites of a ProfileMatrix in a process pool.
+
+    Workers map the matrix file once and read their site's row from it, so only
+    (row, capex) tuples cross process boundaries.
+
+    Args:
+        matrix_path (str): Directory of a `profile_store.ProfileMatrix`.
+        rows (iterable of int): Site rows to optimise.
+        solar_capex, bess_energy_capex (float or dict): Capex, or {row: capex} per site.
+        processes (int, optional): Pool size. Defaults to the CPU count.
+        **kwargs: Passed through to `optimise_bess` (load, availability, efficiency, ...).
+
+    Returns:
+        pd.DataFrame: One row per site with 'row', 'cost', 'solar_capacity' and 'bess_energy'.
+    """
+    def _per_row(value, row):
+        return value[row] if isinstance(value, dict) else value
+
+    tasks = [
+        (matrix_path, int(row), _per_row(solar_capex, row), _per_row(bess_energy_capex, row), kwargs)
+        for row in rows
+    ]
+    with Pool(processes, initializer=_attach_worker, initargs=(matrix_path,)) as pool:
+        results = pool.map(_optimise_site, tasks, chunksize=1)
+
+    return pd.DataFrame(results, columns=["row", "cost", "solar_capacity", "bess_energy"])
+
 if __name__ == "__main__":
     latitude = 19.4326
     longitude = 99.1332
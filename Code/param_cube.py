@@ -0,0 +1,258 @@
+"""
+Dense parameter cube: the capex/opex table expanded to country x year x tech x variable x type.
+
+Every cell is resolved once through the proxy rules and region map (with
+`reader.get_vals`), and a provenance mask records whether it came from the
+country itself, its proxy region, the 'world' default, or is missing. The cube
+is saved as .npz keyed by a hash of the Excel file and mapping CSVs, so later
+runs load it in milliseconds without touching the workbook.
+
+    cube = load_cube()
+    capex = cube.sel("capex", "Solar")            # (country, year) array
+    cube.get("Spain", 2024, "fuel", "Gas")        # scalar, raises ValueError like get_val
+"""
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from input_store import file_hash, read_table as read_input_table
+from reader import ParamLookup, get_vals, DATA_DIR
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+DEFAULT_EXCEL_PATH = os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx")
+DEFAULT_COUNTRIES_PATH = os.path.join(INPUT_PATH, "all_country_coordinates_2.csv")
+DEFAULT_CACHE_DIR = os.path.join(CWD, "..", "outputs", "param_cache")
+MAPPING_PATHS = [os.path.join(DATA_DIR, "proxy_rules.csv"), os.path.join(DATA_DIR, "region_map.csv")]
+
+# Provenance codes stored in the cube's source mask
+SOURCES = ["missing", "direct", "proxy", "world"]
+MISSING, DIRECT, PROXY, WORLD = range(4)
+
+# Part of the cache key; bump when the saved arrays change (2: n_matches added)
+CACHE_FORMAT = 2
+
+
+def input_hash(paths, extra=None) -> str:
+    """sha256 over the bytes of `paths` (in order) plus any JSON-serialisable `extra`."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(bytes.fromhex(file_hash(path)))
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ParamCube:
+    """
+    Fully resolved parameter array with its axes and provenance.
+
+    Attributes:
+        countries, years, techs, variables, types (list): Axis labels. '' on the tech
+            and type axes means "any", i.e. the tech/type filter is not applied.
+        values (np.ndarray): float64, shape (country, year, tech, variable, type); NaN where missing.
+        source (np.ndarray): int8 provenance codes, same shape (see SOURCES).
+        n_matches (np.ndarray): uint16 number of table rows averaged into each value.
+    """
+
+    AXES = ["countries", "years", "techs", "variables", "types"]
+
+    def __init__(self, countries, years, techs, variables, types, values, source, n_matches=None):
+        self.countries, self.years, self.techs = list(countries), [int(y) for y in years], list(techs)
+        self.variables, self.types = list(variables), list(types)
+        self.values, self.source = values, source
+        self.n_matches = n_matches if n_matches is not None else (source != MISSING).astype(np.uint16)
+        self._pos = {
+            "countries": {c.strip().lower(): i for i, c in enumerate(self.countries)},
+            "years": {y: i for i, y in enumerate(self.years)},
+            "techs": {t: i for i, t in enumerate(self.techs)},
+            "variables": {v: i for i, v in enumerate(self.variables)},
+            "types": {p: i for i, p in enumerate(self.types)},
+        }
+
+    # --- Building ---
+    @classmethod
+    def build(cls, capex_opex_df, countries, years=None, specs=None):
+        """
+        Resolve every (country, year, tech, variable, type) cell.
+
+        Args:
+            capex_opex_df (pd.DataFrame or ParamLookup): The parameter table.
+            countries (iterable of str): Country axis.
+            years (iterable of int, optional): Extra years; all integer years in the table are included.
+            specs (dict, optional): `lcoe_helpers`-style {group: {name: (variable, tech, type)}}
+                so requested variables/techs/types are on the axes even if the table lacks them.
+        """
+        lookup = capex_opex_df if isinstance(capex_opex_df, ParamLookup) else ParamLookup(capex_opex_df)
+        df = lookup.df
+
+        def _norm(series):
+            return {str(x).strip().lower() for x in series.dropna()}
+
+        spec_items = [item for spec in (specs or {}).values() for item in spec.values()]
+        variables = sorted(_norm(df["variable"]) | {v.lower() for v, _, _ in spec_items})
+        techs = [""] + sorted((_norm(df["tech"]) if lookup.has_tech else set()) |
+                              {t.lower() for _, t, _ in spec_items if t})
+        types = [""] + sorted((_norm(df["type"]) if lookup.has_type else set()) |
+                              {p.lower() for _, _, p in spec_items if p})
+        data_years = {int(y) for y in pd.to_numeric(df["year"], errors="coerce").dropna()}
+        years = sorted(data_years | {int(y) for y in (years or [])})
+        countries = list(dict.fromkeys(countries))
+
+        # Only (variable, tech, type) combinations with at least one row anywhere can resolve;
+        # the rest stay missing without being queried
+        rows = pd.DataFrame({
+            "variable": df["variable"].str.strip().str.lower(),
+            "tech": df["tech"].str.strip().str.lower() if lookup.has_tech else "",
+            "type": df["type"].str.strip().str.lower() if lookup.has_type else "",
+        }).drop_duplicates()
+        present = set(rows.itertuples(index=False, name=None))
+        combos = [
+            (v, t, p) for v, t, p in itertools.product(variables, techs, types)
+            if any(v == rv and (not t or t == rt) and (not p or p == rp) for rv, rt, rp in present)
+        ]
+
+        queries = pd.DataFrame(
+            [(c, y, v, t, p) for c, y, (v, t, p) in itertools.product(countries, years, combos)],
+            columns=["country", "year", "variable", "tech", "param_type"],
+        )
+        result = get_vals(lookup, queries)
+
+        shape = (len(countries), len(years), len(techs), len(variables), len(types))
+        values = np.full(shape, np.nan)
+        source = np.zeros(shape, dtype=np.int8)
+        n_matches = np.zeros(shape, dtype=np.uint16)
+        if len(result):
+            idx = (
+                result["country"].map({c: i for i, c in enumerate(countries)}).to_numpy(),
+                result["year"].map({y: i for i, y in enumerate(years)}).to_numpy(),
+                result["tech"].map({t: i for i, t in enumerate(techs)}).to_numpy(),
+                result["variable"].map({v: i for i, v in enumerate(variables)}).to_numpy(),
+                result["param_type"].map({p: i for i, p in enumerate(types)}).to_numpy(),
+            )
+            values[idx] = result["value"].to_numpy()
+            source[idx] = result["source"].map({s: i for i, s in enumerate(SOURCES)}).to_numpy()
+            n_matches[idx] = result["n_matches"].to_numpy()
+        return cls(countries, years, techs, variables, types, values, source, n_matches)
+
+    # --- Persistence ---
+    def save(self, path):
+        np.savez_compressed(
+            path, values=self.values, source=self.source, n_matches=self.n_matches,
+            axes=json.dumps({axis: getattr(self, axis) for axis in self.AXES}),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            axes = json.loads(str(data["axes"]))
+            # Cubes saved before n_matches was stored count one match per found cell
+            n_matches = data["n_matches"] if "n_matches" in data.files else None
+            return cls(*(axes[axis] for axis in cls.AXES), data["values"], data["source"], n_matches)
+
+    # --- Access ---
+    def _index(self, axis, label):
+        key = label.strip().lower() if isinstance(label, str) else label
+        try:
+            return self._pos[axis][key]
+        except KeyError:
+            raise ValueError(f"'{label}' is not on the cube's {axis} axis") from None
+
+    def _key(self, variable, tech=None, param_type=None):
+        return (self._index("techs", tech or ""), self._index("variables", variable),
+                self._index("types", param_type or ""))
+
+    def get(self, country, year, variable, tech=None, param_type=None) -> float:
+        """Scalar lookup with `get_val` semantics; raises ValueError if the cell is missing."""
+        t, v, p = self._key(variable, tech, param_type)
+        c, y = self._index("countries", country), self._index("years", int(year))
+        if self.source[c, y, t, v, p] == MISSING:
+            raise ValueError(
+                f"FATAL: No match found for: Country='{country}', Year='{year}', Var='{variable}', Tech='{tech or 'N/A'}'")
+        return float(self.values[c, y, t, v, p])
+
+    def sel(self, variable, tech=None, param_type=None, countries=None, years=None, with_source=False):
+        """
+        (country, year) slab for one parameter, optionally restricted to some countries/years.
+
+        Returns:
+            np.ndarray (and the matching source codes and match counts if `with_source`).
+        """
+        t, v, p = self._key(variable, tech, param_type)
+        c_idx = slice(None) if countries is None else [self._index("countries", c) for c in countries]
+        y_idx = slice(None) if years is None else [self._index("years", int(y)) for y in years]
+        values = self.values[:, :, t, v, p][c_idx][:, y_idx]
+        if with_source:
+            return (values, self.source[:, :, t, v, p][c_idx][:, y_idx],
+                    self.n_matches[:, :, t, v, p][c_idx][:, y_idx])
+        return values
+
+    def to_params(self, specs, countries, years):
+        """
+        Same output as `lcoe_helpers.fetch_params`, read from the cube instead of queried.
+
+        Returns:
+            tuple: ({group: DataFrame indexed by (country, year)}, long provenance DataFrame)
+        """
+        countries, years = list(countries), [int(y) for y in years]
+        index = pd.MultiIndex.from_product([countries, years], names=["country", "year"])
+        params, long = {}, []
+        for group, spec in specs.items():
+            columns = {}
+            for name, (variable, tech, param_type) in spec.items():
+                values, source, n_matches = self.sel(variable, tech, param_type, countries, years, with_source=True)
+                columns[name] = values.ravel()
+                long.append(pd.DataFrame({
+                    "group": group, "param": name,
+                    "country": index.get_level_values(0), "year": index.get_level_values(1),
+                    "variable": variable, "tech": tech, "param_type": param_type,
+                    "value": values.ravel(), "source": np.array(SOURCES, dtype=object)[source.ravel()],
+                    "n_matches": n_matches.ravel(),
+                }))
+            params[group] = pd.DataFrame(columns, index=index)
+        return params, pd.concat(long, ignore_index=True)
+
+
+def load_cube(excel_path=DEFAULT_EXCEL_PATH, countries_path=DEFAULT_COUNTRIES_PATH, years=None, specs=None,
+              cache_dir=DEFAULT_CACHE_DIR, read_table=None):
+    """
+    Load the cube for the current inputs from cache, building and caching it on a miss.
+
+    The cache key hashes the Excel file, the mapping CSVs, the country list,
+    the requested years/specs and CACHE_FORMAT, so any edit to those produces a
+    fresh cube.
+
+    Args:
+        read_table (callable, optional): Reads the parameter table from `excel_path`
+            on a cache miss. Defaults to `input_store.read_table`.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = input_hash([excel_path, countries_path] + MAPPING_PATHS,
+                     extra={"years": years, "specs": specs, "format": CACHE_FORMAT})
+    cache_path = os.path.join(cache_dir, f"param_cube_{key[:16]}.npz")
+
+    if os.path.exists(cache_path):
+        return ParamCube.load(cache_path)
+
+    print("Building parameter cube (cached afterwards)...")
+    start_time = time.time()
+    capex_opex_df = (read_table or read_input_table)(excel_path)
+    countries = pd.read_csv(countries_path, encoding="utf-8-sig")["Country"]
+    cube = ParamCube.build(capex_opex_df, countries, years, specs)
+    cube.save(cache_path)
+    print(f"Parameter cube {cube.values.shape} built in {round(time.time() - start_time, 1)} seconds -> {cache_path}")
+    return cube
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    cube = load_cube()
+    print(f"Loaded cube {cube.values.shape} in {round(time.time() - start_time, 3)} seconds")
+    counts = np.bincount(cube.source.ravel(), minlength=len(SOURCES))
+    print({name: int(n) for name, n in zip(SOURCES, counts)})
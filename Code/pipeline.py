@@ -0,0 +1,312 @@
+"""
+Declarative stage pipeline: convert -> params -> profiles -> size -> lcoe -> render.
+
+Each stage declares the files it reads, the files it writes, the modules
+whose code it runs and the settings it uses (including main.py's run constants
+such as YEARS and PARAM_SPECS). Its key is a hash of the stage function, its
+settings and the content of its input and module source files; a stage runs
+only when that key differs from the last run or one of its outputs is missing
+or was modified. Because stages read each other's output files, an upstream
+stage that rewrites identical bytes does not invalidate anything downstream.
+A stage that finishes with incomplete outputs (countries whose sizing failed or
+timed out) is not recorded, so the next run retries it.
+
+File content hashes are cached by (mtime, size), so an unchanged rerun costs
+one `os.stat` per file plus importing main.py for its constants.
+
+    python pipeline.py                       # run what is stale
+    python pipeline.py --until size          # stop after sizing
+    python pipeline.py --force lcoe          # rerun lcoe (and whatever it invalidates)
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from input_store import file_hash
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(CWD, ".."))
+INPUT_PATH = os.path.join(ROOT, "inputs")
+PIPELINE_PATH = os.path.join(ROOT, "outputs", "pipeline")
+STATE_FILE = os.path.join(PIPELINE_PATH, "state.json")
+
+RAW_WORKBOOK = os.path.join(INPUT_PATH, "capex_opex.xlsx")
+CONVERTED_WORKBOOK = os.path.join(INPUT_PATH, "capex_opex_converted_2025USD.xlsx")
+COUNTRIES_CSV = os.path.join(INPUT_PATH, "all_country_coordinates_2.csv")
+
+
+def _artifact(stage, name):
+    return os.path.join(PIPELINE_PATH, stage, name)
+
+
+def _sources(*modules):
+    return [os.path.join(CWD, f"{module}.py") for module in modules]
+
+
+def run_constants():
+    """main.py's constants the stages depend on, as pipeline settings."""
+    from main import BASE_YEAR, SOLAR_YEAR, YEARS, PARAM_SPECS
+
+    return {"base_year": BASE_YEAR, "solar_year": SOLAR_YEAR, "years": sorted(set(YEARS) | {BASE_YEAR}),
+            "param_specs": PARAM_SPECS}
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name (str): Stage name.
+        run (callable): `run(stage, settings)`; must write every path in `outputs`. Returns
+            False if they are incomplete (e.g. some countries failed to size): the stage is
+            then not recorded, so the next run retries it.
+        inputs (list): Files read by the stage (raw inputs or other stages' outputs).
+        outputs (list): Files written by the stage.
+        settings (list): Names of the pipeline settings the stage depends on.
+        code (list): Source files of the modules the stage runs; hashed like inputs,
+            so editing e.g. the LCOE maths reruns the stages that use it.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), settings=(), code=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.settings = list(settings)
+        self.code = list(code)
+
+
+class Pipeline:
+    """
+    Runs stages in order, skipping those whose key and outputs are unchanged.
+
+    The state file records, per stage, the key of its last successful run and the
+    hashes of the outputs it wrote, plus an (mtime, size) -> sha256 cache per file.
+    """
+
+    def __init__(self, stages, settings, state_file=STATE_FILE):
+        self.stages = stages
+        self.settings = settings
+        self.state_file = state_file
+        self.state = {"files": {}, "stages": {}}
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                self.state = json.load(f)
+
+    def digest(self, path):
+        """Content hash of `path`, recomputed only when its mtime or size changed."""
+        stat = os.stat(path)
+        rel = os.path.relpath(path, ROOT)
+        cached = self.state["files"].get(rel)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        sha = file_hash(path)
+        self.state["files"][rel] = [stat.st_mtime_ns, stat.st_size, sha]
+        return sha
+
+    def key(self, stage):
+        """Hash of the stage's code, settings and input contents."""
+        return hashlib.sha256(json.dumps({
+            "code": inspect.getsource(stage.run),
+            "modules": {os.path.relpath(p, ROOT): self.digest(p) for p in stage.code},
+            "settings": {name: self.settings[name] for name in stage.settings},
+            "inputs": {os.path.relpath(p, ROOT): self.digest(p) for p in stage.inputs},
+        }, sort_keys=True, default=str).encode()).hexdigest()
+
+    def status(self, stage):
+        """
+        Why `stage` would run.
+
+        Returns:
+            str: 'fresh', 'new', 'inputs changed', 'outputs changed' or 'source missing'
+            (an input is absent, so existing outputs are used as they are). A stage whose
+            last run was incomplete has no record, so it is 'new'.
+        """
+        record = self.state["stages"].get(stage.name)
+        outputs_exist = all(os.path.exists(p) for p in stage.outputs)
+        if not all(os.path.exists(p) for p in stage.inputs):
+            if outputs_exist:
+                return "source missing"
+            missing = [p for p in stage.inputs if not os.path.exists(p)]
+            raise FileNotFoundError(f"Stage '{stage.name}' needs {missing}")
+        if record is None:
+            return "new"
+        if record["key"] != self.key(stage):
+            return "inputs changed"
+        if not outputs_exist or any(self.digest(p) != record["outputs"].get(os.path.relpath(p, ROOT))
+                                    for p in stage.outputs):
+            return "outputs changed"
+        return "fresh"
+
+    def run(self, until=None, force=()):
+        """
+        Run every stale stage up to and including `until`.
+
+        Args:
+            force (iterable): Stage names to run even if fresh.
+
+        Returns:
+            pd.DataFrame: 'Stage', 'Status', 'Ran', 'Complete' and 'Seconds' per stage considered.
+        """
+        report = []
+        for stage in self.stages:
+            status = self.status(stage)
+            if stage.name in force and status in ("fresh", "source missing"):
+                status = "forced"
+            ran, complete, seconds = status not in ("fresh", "source missing"), True, 0.0
+            if ran:
+                print(f"[{stage.name}] {status}, running...")
+                for path in stage.outputs:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                start_time = time.time()
+                complete = stage.run(stage, self.settings) is not False
+                seconds = time.time() - start_time
+                if complete:
+                    self.state["stages"][stage.name] = {
+                        "key": self.key(stage),
+                        "outputs": {os.path.relpath(p, ROOT): self.digest(p) for p in stage.outputs},
+                        "seconds": seconds,
+                    }
+                else:
+                    # Downstream stages still run on the partial outputs, but this one is retried next time
+                    print(f"[{stage.name}] incomplete, will rerun next time.")
+                    self.state["stages"].pop(stage.name, None)
+                # Save after every stage so a failure later on keeps the finished ones
+                self._save()
+            else:
+                print(f"[{stage.name}] {status}, skipped.")
+            report.append({"Stage": stage.name, "Status": status, "Ran": ran, "Complete": complete,
+                           "Seconds": round(seconds, 2)})
+            if stage.name == until:
+                break
+        self._save()
+        return pd.DataFrame(report)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_file)
+
+
+# --- Stages ---
+def convert_stage(stage, settings):
+    # converter.py is a script; run it as one
+    subprocess.run([sys.executable, os.path.join(CWD, "converter.py")], cwd=CWD, check=True)
+
+
+def params_stage(stage, settings):
+    from param_cube import load_cube
+
+    cube = load_cube(CONVERTED_WORKBOOK, COUNTRIES_CSV, years=settings["years"], specs=settings["param_specs"])
+    cube.save(stage.outputs[0])
+
+
+def profiles_stage(stage, settings):
+    from profile import generate_hourly_solar_profile
+
+    countries = _selected_countries(settings)
+    profiles = np.stack([
+        generate_hourly_solar_profile(lat, lon, solar_year=settings["solar_year"])
+        for lat, lon in zip(countries["Latitude"], countries["Longitude"])
+    ]) if len(countries) else np.empty((0, 0))
+    np.savez(stage.outputs[0], countries=countries["Country"].to_numpy(dtype=str),
+             latitude=countries["Latitude"].to_numpy(), longitude=countries["Longitude"].to_numpy(),
+             profiles=profiles)
+
+
+def size_stage(stage, settings):
+    from main import size_countries
+    from param_cube import ParamCube
+
+    with np.load(stage.inputs[0]) as data:
+        countries = pd.DataFrame({"Country": data["countries"], "Latitude": data["latitude"],
+                                  "Longitude": data["longitude"]})
+        profiles = dict(zip(data["countries"], data["profiles"]))
+    params, _ = ParamCube.load(stage.inputs[1]).to_params(
+        {"Solar+BESS": settings["param_specs"]["Solar+BESS"]}, countries["Country"], [settings["base_year"]]
+    )
+    sized = size_countries(countries, params, settings["processes"], settings["timeout"], profiles=profiles)
+    sizing = pd.DataFrame([result for result in sized.values() if result],
+                          columns=["Country", "Solar_Capacity_MW", "BESS_Energy_MWh"])
+    sizing.to_csv(stage.outputs[0], index=False)
+    # Countries without base-year capex can never be sized; any other country missing
+    # from sizing.csv failed or timed out, so the stage is incomplete
+    capex = params["Solar+BESS"][["solar_capex", "bess_capex"]]
+    return len(sizing) >= int(capex.notna().all(axis=1).sum())
+
+
+def lcoe_stage(stage, settings):
+    from main import OUTPUT_COLS, run_lcoe
+    from param_cube import ParamCube
+
+    sizing = pd.read_csv(stage.inputs[0])
+    params, _ = ParamCube.load(stage.inputs[1]).to_params(settings["param_specs"], sizing["Country"], settings["years"])
+    run_lcoe(sizing, params, settings["availability"])[OUTPUT_COLS].to_csv(stage.outputs[0], index=False)
+
+
+def render_stage(stage, settings):
+    from visualiser import lcoe_choropleth
+
+    results_df = pd.read_csv(stage.inputs[0])
+    lcoe_choropleth(results_df[results_df["Tech"] == "Solar+BESS"]).write_html(stage.outputs[0])
+
+
+def _selected_countries(settings):
+    countries = pd.read_csv(COUNTRIES_CSV)
+    if settings["countries"]:
+        countries = countries[countries["Country"].isin(settings["countries"])]
+    return countries
+
+
+def default_stages():
+    from param_cube import MAPPING_PATHS
+
+    cube = _artifact("params", "param_cube.npz")
+    profiles = _artifact("profiles", "profiles.npz")
+    sizing = _artifact("size", "sizing.csv")
+    results = _artifact("lcoe", "lcoe_results.csv")
+    # main.py is listed wherever its functions run; its constants are in the settings
+    return [
+        # converter.py also writes conversion_log.csv, which nothing downstream reads
+        Stage("convert", convert_stage, [RAW_WORKBOOK], [CONVERTED_WORKBOOK], code=_sources("converter")),
+        Stage("params", params_stage, [CONVERTED_WORKBOOK, COUNTRIES_CSV] + MAPPING_PATHS, [cube],
+              ["years", "param_specs"], _sources("param_cube", "input_store", "reader")),
+        Stage("profiles", profiles_stage, [COUNTRIES_CSV], [profiles], ["countries", "solar_year"],
+              _sources("profile")),
+        Stage("size", size_stage, [profiles, cube], [sizing], ["base_year", "param_specs", "timeout"],
+              _sources("main", "optimiser", "profile_store", "lcoe_helpers", "param_cube", "runner")),
+        Stage("lcoe", lcoe_stage, [sizing, cube], [results], ["availability", "years", "param_specs"],
+              _sources("main", "lcoe_vec", "lcoe_helpers", "param_cube")),
+        Stage("render", render_stage, [results], [_artifact("render", "lcoe_map.html")], code=_sources("visualiser")),
+    ]
+
+
+if __name__ == "__main__":
+    # Defaults as in main.py
+    parser = argparse.ArgumentParser(description="Run the stale stages of the LCOE pipeline.")
+    parser.add_argument("--countries", nargs="*", default=["Chile", "Australia", "Spain"],
+                        help="No names = all countries.")
+    parser.add_argument("--availability", type=float, default=0.8)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--until", default=None, help="Last stage to run.")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to rerun even if fresh.")
+    args = parser.parse_args()
+
+    settings = {"countries": sorted(args.countries), "availability": args.availability,
+                "processes": args.processes, "timeout": args.timeout, **run_constants()}
+    start_time = time.time()
+    report = Pipeline(default_stages(), settings).run(args.until, args.force)
+    print(report.to_string(index=False))
+    print(f"Pipeline finished in {round(time.time() - start_time, 2)} seconds.")
@@ -0,0 +1,110 @@
+"""
+Dry-run coverage planner for the parameter lookups of a run.
+
+Enumerates every parameter `main.py` will read for the selected countries,
+years and techs, resolves them in one pass (from the parameter cube), and
+reports per country and tech how many came direct, via a proxy region, from
+the 'World' default or are missing. Countries whose LCOE is bound to come out
+`None` are flagged before any solve starts.
+
+    python main.py --plan
+"""
+import os
+
+import pandas as pd
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+
+SOURCES = ["direct", "proxy", "world", "missing"]
+# Needed at the base year to size Solar+BESS at all
+SIZING_PARAMS = ["solar_capex", "bess_capex"]
+
+
+def plan_lookups(lookups: pd.DataFrame, base_year: int, sizing_group: str = "Solar+BESS") -> pd.DataFrame:
+    """
+    Summarise resolved lookups per (country, group).
+
+    Args:
+        lookups (pd.DataFrame): Long lookups as returned by `ParamCube.to_params`
+            or `lcoe_helpers.fetch_params` ('group', 'param', 'country', 'year', 'value', 'source').
+        base_year (int): Year the Solar+BESS system is sized in.
+        sizing_group (str): Group whose base-year capex drives the sizing solve.
+
+    Returns:
+        pd.DataFrame: One row per (Country, Group) with lookup counts per source,
+        'Runnable_Years' (years with every parameter present), 'Missing_Params',
+        'Can_Size' (sizing group only) and 'Status' ('ok', 'partial' or 'doomed').
+    """
+    counts = (
+        pd.crosstab([lookups["country"], lookups["group"]], lookups["source"])
+        .reindex(columns=SOURCES, fill_value=0)
+    )
+
+    missing = lookups[lookups["source"] == "missing"]
+    missing_params = missing.groupby(["country", "group"])["param"].agg(lambda s: ", ".join(sorted(set(s))))
+    years = lookups.groupby(["country", "group"])["year"].nunique()
+    complete = (
+        lookups.assign(ok=lookups["source"] != "missing")
+        .groupby(["country", "group", "year"])["ok"].all()
+        .groupby(["country", "group"]).sum()
+    )
+
+    plan = counts.copy()
+    plan["Years"] = years
+    plan["Runnable_Years"] = complete.astype(int)
+    plan["Missing_Params"] = missing_params.reindex(plan.index).fillna("")
+
+    sizing = lookups[
+        (lookups["group"] == sizing_group) & (lookups["year"] == base_year) & lookups["param"].isin(SIZING_PARAMS)
+    ]
+    can_size = sizing.groupby(["country", "group"])["source"].agg(lambda s: bool((s != "missing").all()))
+    plan["Can_Size"] = can_size.reindex(plan.index)
+
+    plan["Status"] = "partial"
+    plan.loc[plan["Runnable_Years"] == plan["Years"], "Status"] = "ok"
+    plan.loc[plan["Runnable_Years"] == 0, "Status"] = "doomed"
+    plan = plan.reset_index().rename(columns={"country": "Country", "group": "Group"})
+    plan.columns.name = None
+    return plan
+
+
+def doomed_countries(plan: pd.DataFrame, group: str = "Solar+BESS") -> list:
+    """Countries whose `group` LCOE cannot be computed for any year, or can't be sized at all."""
+    rows = plan[plan["Group"] == group]
+    doomed = (rows["Status"] == "doomed") | (rows["Can_Size"] == False)  # noqa: E712 (NaN for other groups)
+    return rows.loc[doomed, "Country"].tolist()
+
+
+def print_plan(plan: pd.DataFrame):
+    """Console report of the plan: totals per source and the groups that will not run."""
+    totals = plan[SOURCES].sum()
+    print(f"\nLookup plan: {int(totals.sum())} lookups across {plan['Country'].nunique()} countries")
+    for source in SOURCES:
+        print(f"  {source:<8} {int(totals[source]):>8}")
+
+    for status in ("doomed", "partial"):
+        rows = plan[plan["Status"] == status]
+        if rows.empty:
+            continue
+        print(f"\n{status.upper()} ({len(rows)}):")
+        for _, r in rows.iterrows():
+            print(f"  {r['Country']} / {r['Group']}: {r['Runnable_Years']}/{r['Years']} years runnable; "
+                  f"missing {r['Missing_Params'] or '-'}")
+
+    unsizable = plan[plan["Can_Size"] == False]  # noqa: E712
+    if not unsizable.empty:
+        print(f"\nCannot size Solar+BESS (no base-year {' / '.join(SIZING_PARAMS)}): "
+              f"{', '.join(unsizable['Country'])}")
+
+
+def write_plan(plan: pd.DataFrame, lookups: pd.DataFrame, output_path: str = OUTPUT_PATH):
+    """Write the per-group plan and the full per-lookup table to `output_path`."""
+    os.makedirs(output_path, exist_ok=True)
+    plan_file = os.path.join(output_path, "lookup_plan.csv")
+    plan.to_csv(plan_file, index=False)
+    lookups.to_csv(os.path.join(output_path, "lookup_plan_detail.csv"), index=False)
+    print(f"\nLookup plan saved to {os.path.abspath(plan_file)}")
+    return plan_file
+
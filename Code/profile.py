@@ -1,15 +1,27 @@
+import json
+import os
+
 from pvlib.location import Location
 
+import numpy as np
 import pandas as pd
 from pvlib.iotools import get_pvgis_hourly
 
-def generate_real_hourly_solar_profile(latitude, longitude, solar_year=2023):
+def generate_real_hourly_solar_profile(latitude, longitude, solar_year=2023, store=None):
     """
     Downloads real GHI data for the specified location and year using PVGIS.
 
+    If a `ProfileStore` is given and already holds this site-year (e.g. filled in
+    bulk by `pvgis_fetch.py`), the stored profile is returned without a download.
+
     Returns:
         A NumPy array of normalized hourly GHI values (availability factor between 0 and 1).
     """
+    if store is not None:
+        key = store.key("pvgis", latitude, longitude, solar_year)
+        if store.has(key):
+            return store.read(key)
+
     # Download hourly PVGIS data (includes GHI, DNI, DHI)
     df, meta = get_pvgis_hourly(
         latitude, longitude,
@@ -34,23 +46,78 @@ def generate_real_hourly_solar_profile(latitude, longitude, solar_year=2023):
 
     return normalized_output.values
 
-def generate_hourly_solar_profile(latitude, longitude, solar_year=2024):
+def _clearsky_year(site, year, tz=None, drop_leap_day=False):
+    """Normalised clear-sky GHI for one full calendar year at `site` (float32)."""
+    tz = tz or site.tz
+    # Half-open [Jan 1, next Jan 1) in the target timezone: 8760 hours, 8784 in leap years
+    times = pd.date_range(
+        start=pd.Timestamp(f'{year}-01-01', tz=tz), end=pd.Timestamp(f'{year + 1}-01-01', tz=tz),
+        freq='h', inclusive='left'
+    )
+    if drop_leap_day:
+        times = times[~((times.month == 2) & (times.day == 29))]
+
+    ghi = site.get_clearsky(times)['ghi'].values
+    return (ghi / ghi.max()).astype(np.float32)
+
+
+def generate_hourly_solar_profile(latitude, longitude, solar_year=2024, tz=None):
     # Define location
     site = Location(latitude, longitude)
 
-    # Generate hourly times for the year
-    times = pd.date_range(start=f'{solar_year}-01-01', end=f'{solar_year}-06-30 23:00:00', freq='h', tz=site.tz)
+    # Clear-sky GHI as a proxy for solar availability, normalised to its max (0 to 1).
+    # One value per hour of the full calendar year: 8760 values (8784 in leap years).
+    return _clearsky_year(site, solar_year, tz=tz).astype(float)
+
+
+def iter_hourly_solar_profile(latitude, longitude, start_year, end_year, tz=None, drop_leap_day=False):
+    """
+    Stream clear-sky solar profiles one calendar year at a time.
+
+    Only one year's timestamps exist as pandas objects at any point, so long
+    horizons (e.g. 2005-2023) never materialise the whole series.
+
+    Args:
+        latitude (float), longitude (float): Site location.
+        start_year (int), end_year (int): Inclusive range of years.
+        tz (str, optional): Timezone the calendar years are cut in. Defaults to the site's (UTC).
+        drop_leap_day (bool, optional): Drop 29 February so every chunk has 8760 values.
+
+    Yields:
+        tuple: (year, np.ndarray of float32 availability factors 0-1)
+    """
+    site = Location(latitude, longitude)
+    for year in range(start_year, end_year + 1):
+        yield year, _clearsky_year(site, year, tz=tz, drop_leap_day=drop_leap_day)
+
 
-    # Get solar position and clear-sky irradiance
-    solar_position = site.get_solarposition(times)
-    clearsky = site.get_clearsky(times)
+def read_ninja_metadata(filepath):
+    """
+    Read the 3-line comment header of a Renewables.ninja CSV.
 
-    # Use GHI (Global Horizontal Irradiance) as a proxy for solar availability
-    ghi = clearsky['ghi']
+    Line 1 names the model (wind or solar PV), line 3 is a JSON blob with the
+    request parameters (lat, lon, dataset, capacity, ...).
 
-    # Normalize to max value to get availability factor (0 to 1)
-    normalized_output = ghi / ghi.max()
-    return normalized_output.values  # returns a NumPy array of 8760 values
+    Returns:
+        dict: The 'params' from the header plus 'tech' ('wind' or 'solar').
+    """
+    with open(filepath, encoding="utf-8") as f:
+        header = [f.readline().lstrip("#").strip() for _ in range(3)]
+
+    try:
+        meta = json.loads(header[2]).get("params", {})
+    except ValueError:
+        meta = {}
+
+    title = header[0].lower()
+    name = os.path.basename(filepath).lower()
+    if "wind" in title or name.startswith("ninja_wind"):
+        meta["tech"] = "wind"
+    elif "pv" in title or "solar" in title or name.startswith(("ninja_pv", "ninja_solar")):
+        meta["tech"] = "solar"
+    else:
+        meta["tech"] = None
+    return meta
 
 
 def parse_renewables_ninja(filepath):
@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_PATH = os.path.join(CWD, "..", "profiles")
+
+
+class ProfileStore:
+    """
+    On-disk store of normalised hourly resource profiles.
+
+    Each profile is saved as a float32 .npy file under `data/`, named by its key.
+    `index.jsonl` holds one metadata line per profile (source, site, year, hours)
+    and is appended to only after the data file is in place, so an interrupted
+    write is simply redone on the next run.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_PATH):
+        self.root = root
+        self.data_dir = os.path.join(root, "data")
+        self.index_path = os.path.join(root, "index.jsonl")
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source: str, latitude: float, longitude: float, year: int) -> str:
+        """Build the profile key for a site and year, e.g. 'pvgis_40.4637_-3.7492_2023'."""
+        return f"{source}_{float(latitude):.4f}_{float(longitude):.4f}_{int(year)}"
+
+    def _load_index(self) -> dict:
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        index[entry["key"]] = entry  # later lines win
+        return index
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.data_dir, f"{key}.npy")
+
+    def has(self, key: str) -> bool:
+        """True if the profile has been fully written and indexed."""
+        return key in self._index
+
+    def write(self, key: str, values, **meta):
+        """
+        Save a profile and record it in the index.
+
+        Args:
+            key (str): Profile key, normally from `ProfileStore.key`.
+            values (array-like): Hourly values (stored as float32).
+            **meta: Extra metadata for the index (source, latitude, longitude, year, country...).
+        """
+        values = np.asarray(values, dtype=np.float32)
+        tmp_path = self.path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp_path, self.path(key))
+
+        entry = {"key": key, "hours": int(values.shape[0]), **meta}
+        with self._lock, open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            self._index[key] = entry
+
+    def read(self, key: str, mmap: bool = True) -> np.ndarray:
+        """Load a profile; memory-mapped read-only by default."""
+        if not self.has(key):
+            raise KeyError(f"Profile '{key}' not found in store {self.root}")
+        return np.load(self.path(key), mmap_mode="r" if mmap else None)
+
+    def index(self) -> pd.DataFrame:
+        """Return the store index as a DataFrame (one row per profile)."""
+        return pd.DataFrame(list(self._index.values()))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return self.has(key)
+
+
+class ProfileMatrix:
+    """
+    Memory-mapped (site x hour) float32 profile array with a site index.
+
+    Rows are C-contiguous, so one site's year is a single contiguous block of
+    `hours * 4` bytes. The array lives in `<path>/profiles.f32` next to
+    `sites.csv` (row, lat, lon, country, ...) and `meta.json` (shape).
+
+    Opening is cheap and read-only opens share the OS page cache, so worker
+    processes attach by path instead of receiving pickled arrays: pickling a
+    ProfileMatrix only sends its path, and memory per worker stays flat
+    regardless of how many sites the matrix holds.
+    """
+
+    DATA_FILE = "profiles.f32"
+    SITES_FILE = "sites.csv"
+    META_FILE = "meta.json"
+
+    def __init__(self, path: str, mode: str = "r"):
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, self.META_FILE)) as f:
+            meta = json.load(f)
+        self.shape = (meta["n_sites"], meta["hours"])
+        self.sites = pd.read_csv(os.path.join(path, self.SITES_FILE))
+        self.data = np.memmap(os.path.join(path, self.DATA_FILE), dtype=np.float32, mode=mode, shape=self.shape)
+
+    @classmethod
+    def create(cls, path: str, sites: pd.DataFrame, hours: int = 8760) -> "ProfileMatrix":
+        """
+        Allocate an empty matrix on disk for `sites` (needs 'Latitude' and 'Longitude';
+        any other columns, e.g. 'Country', are kept in the site index). Rows are
+        filled afterwards with `write_row`.
+        """
+        os.makedirs(path, exist_ok=True)
+        sites = sites.reset_index(drop=True).copy()
+        sites.insert(0, "row", np.arange(len(sites)))
+        sites.to_csv(os.path.join(path, cls.SITES_FILE), index=False)
+        with open(os.path.join(path, cls.META_FILE), "w") as f:
+            json.dump({"n_sites": len(sites), "hours": int(hours), "dtype": "float32"}, f)
+        # Allocate the full file up front (sparse on most filesystems)
+        np.memmap(os.path.join(path, cls.DATA_FILE), dtype=np.float32, mode="w+", shape=(len(sites), hours)).flush()
+        return cls(path, mode="r+")
+
+    @classmethod
+    def from_store(cls, store: ProfileStore, path: str, source: str = "pvgis", year: int = 2023) -> "ProfileMatrix":
+        """Pack every `source` profile for `year` in a ProfileStore into one matrix."""
+        index = store.index()
+        index = index[(index["source"] == source) & (index["year"] == year)].sort_values(["country", "key"])
+        if index.empty:
+            raise ValueError(f"No '{source}' profiles for {year} in store {store.root}")
+        hours = index["hours"].unique()
+        if len(hours) != 1:
+            raise ValueError(f"Profiles for {year} have mixed lengths {sorted(hours)}; cannot pack into one matrix.")
+
+        sites = index.rename(columns={"latitude": "Latitude", "longitude": "Longitude", "country": "Country"})
+        matrix = cls.create(path, sites[["key", "Country", "Latitude", "Longitude"]], int(hours[0]))
+        for i, key in enumerate(sites["key"]):
+            matrix.write_row(i, store.read(key))
+        matrix.flush()
+        return matrix
+
+    def write_row(self, row: int, values):
+        self.data[row, :] = np.asarray(values, dtype=np.float32)
+
+    def row(self, row: int) -> np.ndarray:
+        """Zero-copy view of one site's profile."""
+        return self.data[row]
+
+    def flush(self):
+        self.data.flush()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __reduce__(self):
+        # Ship the path, not the data; the receiving process maps the file itself
+        return self.__class__, (self.path, "r")
+
+
+_ATTACHED = {}
+
+
+def attach_profile_matrix(path: str) -> ProfileMatrix:
+    """Open a ProfileMatrix read-only once per process and reuse it afterwards."""
+    if path not in _ATTACHED:
+        _ATTACHED[path] = ProfileMatrix(path, mode="r")
+    return _ATTACHED[path]
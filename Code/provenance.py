@@ -0,0 +1,122 @@
+"""
+Low-overhead record of where every parameter value came from.
+
+`get_val` reports each lookup to the process-wide recorder (a counter
+increment, no printing). Batch lookups (`get_vals`, `ParamCube.to_params`)
+are added in one call with `record_frame`. Counters are always kept; the
+per-lookup records only when `keep_records` is on.
+
+    recorder = get_recorder()
+    recorder.record_frame(lookups)
+    recorder.summary().to_csv("provenance_summary.csv", index=False)
+"""
+from collections import Counter
+
+import pandas as pd
+
+SOURCES = ["direct", "proxy", "world", "missing"]
+RECORD_COLUMNS = ["country", "year", "variable", "tech", "param_type", "source", "region", "n_matches"]
+
+
+class ProvenanceRecorder:
+    """
+    Counts lookups per (variable, tech, param_type, source), plus how many of
+    them averaged duplicate rows.
+
+    Attributes:
+        keep_records (bool): Also keep one tuple per lookup (see RECORD_COLUMNS).
+        counts (Counter): (variable, tech, param_type, source) -> lookups.
+        averaged (Counter): Same keys -> lookups that returned a mean over >1 rows.
+    """
+
+    def __init__(self, keep_records: bool = False):
+        self.keep_records = keep_records
+        self.reset()
+
+    def reset(self):
+        self.counts = Counter()
+        self.averaged = Counter()
+        self._records = []
+        self._frames = []
+
+    def record(self, country, year, variable, tech, param_type, source, region=None, n_matches=1):
+        """Record one lookup. `source` is 'direct', 'proxy', 'world' or 'missing'."""
+        key = (variable, tech or "", param_type or "", source)
+        self.counts[key] += 1
+        if n_matches > 1:
+            self.averaged[key] += 1
+        if self.keep_records:
+            self._records.append((country, year, variable, tech, param_type, source, region, n_matches))
+
+    def record_frame(self, lookups: pd.DataFrame):
+        """
+        Record a batch of resolved lookups in one go.
+
+        Args:
+            lookups (pd.DataFrame): 'country', 'year', 'variable', 'source' and optionally
+                'tech', 'param_type', 'region', 'n_matches' (as from `get_vals`).
+        """
+        if lookups.empty:
+            return
+        frame = pd.DataFrame({col: lookups[col] if col in lookups.columns else None for col in RECORD_COLUMNS})
+        frame["n_matches"] = frame["n_matches"].fillna(1)
+        keys = frame[["variable", "tech", "param_type", "source"]].fillna("")
+        keys["variable"] = keys["variable"].str.lower()
+        keys["tech"] = keys["tech"].str.lower()
+        keys["param_type"] = keys["param_type"].str.lower()
+
+        self.counts.update(dict(keys.value_counts().items()))
+        multi = keys[(frame["n_matches"] > 1).to_numpy()]
+        if len(multi):
+            self.averaged.update(dict(multi.value_counts().items()))
+        if self.keep_records:
+            self._frames.append(frame)
+
+    def totals(self) -> dict:
+        """Lookups per source across everything recorded."""
+        totals = dict.fromkeys(SOURCES, 0)
+        for (_, _, _, source), n in self.counts.items():
+            totals[source] = totals.get(source, 0) + n
+        return totals
+
+    def summary(self) -> pd.DataFrame:
+        """One row per (variable, tech, param_type, source) with 'lookups' and 'averaged' counts."""
+        rows = [(*key, n, self.averaged.get(key, 0)) for key, n in self.counts.items()]
+        summary = pd.DataFrame(rows, columns=["variable", "tech", "param_type", "source", "lookups", "averaged"])
+        return summary.sort_values(["variable", "tech", "param_type", "source"]).reset_index(drop=True)
+
+    def records(self) -> pd.DataFrame:
+        """Every recorded lookup (only populated with `keep_records=True`)."""
+        frames = self._frames + ([pd.DataFrame(self._records, columns=RECORD_COLUMNS)] if self._records else [])
+        if not frames:
+            return pd.DataFrame(columns=RECORD_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+
+def provenance_columns(lookups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-result provenance from long lookups ('group', 'param', 'country', 'year', 'source').
+
+    Returns:
+        pd.DataFrame: Indexed by (group, country, year) with 'Params_Direct', 'Params_Proxy',
+        'Params_World', 'Params_Missing' counts and 'Fallback_Params' (e.g.
+        "discount_rate:world; solar_opex:proxy") listing everything not found directly.
+    """
+    keys = ["group", "country", "year"]
+    counts = pd.crosstab([lookups[k] for k in keys], lookups["source"]).reindex(columns=SOURCES, fill_value=0)
+    counts.columns = [f"Params_{source.title()}" for source in SOURCES]
+
+    fallback = lookups[lookups["source"] != "direct"]
+    labels = fallback["param"] + ":" + fallback["source"]
+    counts["Fallback_Params"] = labels.groupby([fallback[k] for k in keys]).agg("; ".join).reindex(counts.index)
+    counts["Fallback_Params"] = counts["Fallback_Params"].fillna("")
+    counts.index.names = keys
+    return counts
+
+
+# Process-wide recorder used by `get_val` unless one is passed in
+_RECORDER = ProvenanceRecorder()
+
+
+def get_recorder() -> ProvenanceRecorder:
+    return _RECORDER
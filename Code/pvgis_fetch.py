@@ -0,0 +1,280 @@
+"""
+Concurrent bulk download of PVGIS hourly irradiance into the profile store.
+
+Replaces one blocking `get_pvgis_hourly` call per site with an asyncio job that
+keeps a bounded number of requests in flight, respects a request rate limit,
+retries transient failures with exponential backoff and skips any (site, year)
+already in the store, so an interrupted run picks up where it stopped.
+
+Point `--base-url` at `pvgis_stub_server.py` to run without network.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from profile_store import ProfileStore
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+
+# Same endpoint pvlib uses; override with PVGIS_URL or --base-url
+PVGIS_URL = os.environ.get("PVGIS_URL", "https://re.jrc.ec.europa.eu/api/v5_2/")
+SOURCE = "pvgis"
+
+# PVGIS allows 30 requests/s per IP; stay a little under it
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 25.0
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_TIMEOUT = 120
+
+
+class PVGISError(Exception):
+    """Non-retryable PVGIS error (e.g. location over the sea, bad year range)."""
+
+
+class _RetryableError(Exception):
+    pass
+
+
+def pvgis_params(latitude, longitude, start_year, end_year, raddatabase="PVGIS-ERA5"):
+    """
+    Query parameters for a `seriescalc` request, matching the settings used by
+    `profile.generate_real_hourly_solar_profile` (horizontal plane, horizon on,
+    irradiance components).
+    """
+    return {
+        "lat": round(float(latitude), 4),
+        "lon": round(float(longitude), 4),
+        "startyear": int(start_year),
+        "endyear": int(end_year),
+        "raddatabase": raddatabase,
+        "angle": 0,
+        "aspect": 0,  # pvlib surface_azimuth=180 -> PVGIS aspect 0
+        "pvcalculation": 0,
+        "components": 1,
+        "usehorizon": 1,
+        "outputformat": "json",
+    }
+
+
+def parse_pvgis_hourly_json(data: dict) -> dict:
+    """
+    Split a PVGIS hourly JSON response into normalised per-year profiles.
+
+    Plane-of-array irradiance is Gb(i) + Gd(i) + Gr(i) (pvlib's poa_direct +
+    poa_sky_diffuse + poa_ground_diffuse), normalised to each year's maximum.
+
+    Returns:
+        dict: {year: np.ndarray of float32}
+    """
+    hourly = data["outputs"]["hourly"]
+    years = np.fromiter((int(h["time"][:4]) for h in hourly), dtype=np.int32, count=len(hourly))
+    poa = np.fromiter(
+        (h["Gb(i)"] + h["Gd(i)"] + h["Gr(i)"] for h in hourly),
+        dtype=np.float64, count=len(hourly)
+    )
+
+    profiles = {}
+    for year in np.unique(years):
+        values = poa[years == year]
+        peak = values.max()
+        profiles[int(year)] = (values / peak if peak > 0 else values).astype(np.float32)
+    return profiles
+
+
+class RateLimiter:
+    """Space request starts at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _request(session, url, params, limiter, retries, backoff, timeout):
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        try:
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status == 429 or resp.status >= 500:
+                    raise _RetryableError(f"HTTP {resp.status}")
+                if resp.status >= 400:
+                    try:
+                        message = (await resp.json(content_type=None)).get("message")
+                    except (ValueError, aiohttp.ContentTypeError):
+                        message = await resp.text()
+                    raise PVGISError(f"HTTP {resp.status}: {message}")
+                return await resp.json(content_type=None)
+        except (_RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise PVGISError(f"Gave up after {retries + 1} attempts: {e}") from e
+            # Exponential backoff with jitter so retries from many tasks don't align
+            await asyncio.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+
+
+async def _fetch_site(session, sem, limiter, store, site, years, base_url, options, record_dir):
+    country, lat, lon = site
+    params = pvgis_params(lat, lon, min(years), max(years), options["raddatabase"])
+
+    async with sem:
+        try:
+            data = await _request(
+                session, base_url.rstrip("/") + "/seriescalc", params, limiter,
+                options["retries"], options["backoff"], options["timeout"]
+            )
+        except PVGISError as e:
+            return country, 0, str(e)
+
+    def _store():
+        if record_dir:
+            with open(os.path.join(record_dir, recording_name(params)), "w") as f:
+                json.dump(data, f)
+        profiles = {y: v for y, v in parse_pvgis_hourly_json(data).items() if y in years}
+        for year, values in profiles.items():
+            store.write(
+                ProfileStore.key(SOURCE, lat, lon, year), values,
+                source=SOURCE, country=country, latitude=float(lat), longitude=float(lon), year=year,
+                raddatabase=options["raddatabase"],
+            )
+        return country, len(profiles), None
+
+    # Parsing and writing are CPU/disk work; keep them off the event loop
+    return await asyncio.to_thread(_store)
+
+
+def recording_name(params: dict) -> str:
+    """File name used to record/replay a `seriescalc` response."""
+    return (f"seriescalc_{params['lat']:.4f}_{params['lon']:.4f}_"
+            f"{params['startyear']}_{params['endyear']}_{params['raddatabase']}.json")
+
+
+async def fetch_pvgis_profiles_async(
+        sites: pd.DataFrame,
+        start_year: int,
+        end_year: int,
+        store: ProfileStore = None,
+        base_url: str = PVGIS_URL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: float = DEFAULT_RATE,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+        raddatabase: str = "PVGIS-ERA5",
+        record_dir: str = None,
+) -> dict:
+    """
+    Download hourly PVGIS profiles for every site and year not already in the store.
+
+    Args:
+        sites (pd.DataFrame): Must have 'Country', 'Latitude' and 'Longitude' columns.
+        start_year (int), end_year (int): Inclusive range of years to fetch.
+        store (ProfileStore, optional): Destination store. Defaults to the default store path.
+        base_url (str, optional): PVGIS API root (the part before 'seriescalc').
+        concurrency (int, optional): Maximum requests in flight.
+        rate (float, optional): Maximum request starts per second (0 disables the limit).
+        retries (int, optional): Retries per site on timeouts, 429 and 5xx responses.
+        backoff (float, optional): Base backoff in seconds, doubled on every retry.
+        timeout (float, optional): Per-request timeout in seconds.
+        raddatabase (str, optional): PVGIS radiation database.
+        record_dir (str, optional): If given, raw JSON responses are saved here for replay.
+
+    Returns:
+        dict: Summary with 'fetched', 'skipped' and 'failed' ({country: reason}) entries.
+    """
+    import aiohttp
+
+    store = ProfileStore() if store is None else store
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+    options = {"raddatabase": raddatabase, "retries": retries, "backoff": backoff, "timeout": timeout}
+
+    # --- Work out what is still missing (this is what makes the job resumable) ---
+    todo = []
+    skipped = 0
+    for _, row in sites.iterrows():
+        site = (row["Country"], row["Latitude"], row["Longitude"])
+        missing = [
+            y for y in range(start_year, end_year + 1)
+            if not store.has(ProfileStore.key(SOURCE, site[1], site[2], y))
+        ]
+        skipped += (end_year - start_year + 1) - len(missing)
+        if missing:
+            todo.append((site, missing))
+
+    print(f"PVGIS: {len(todo)} sites to fetch, {skipped} site-years already in store.")
+
+    sem = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    summary = {"fetched": 0, "skipped": skipped, "failed": {}}
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [
+            _fetch_site(session, sem, limiter, store, site, years, base_url, options, record_dir)
+            for site, years in todo
+        ]
+        with tqdm(total=len(tasks), desc="Fetching PVGIS") as bar:
+            for future in asyncio.as_completed(tasks):
+                country, n_years, error = await future
+                if error:
+                    summary["failed"][country] = error
+                summary["fetched"] += n_years
+                bar.update(1)
+
+    return summary
+
+
+def fetch_pvgis_profiles(sites: pd.DataFrame, start_year: int, end_year: int, **kwargs) -> dict:
+    """Blocking wrapper around `fetch_pvgis_profiles_async`."""
+    return asyncio.run(fetch_pvgis_profiles_async(sites, start_year, end_year, **kwargs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-download PVGIS hourly profiles into the profile store.")
+    parser.add_argument("--start", type=int, default=2013)
+    parser.add_argument("--end", type=int, default=2023)
+    parser.add_argument("--countries", nargs="*", help="Restrict to these countries (default: all).")
+    parser.add_argument("--base-url", default=PVGIS_URL)
+    parser.add_argument("--store", default=None, help="Profile store directory.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--record-dir", default=None, help="Save raw responses here for the stand-in server.")
+    args = parser.parse_args()
+
+    sites = pd.read_csv(os.path.join(INPUT_PATH, "all_country_coordinates_2.csv"))
+    if args.countries:
+        sites = sites[sites["Country"].isin(args.countries)]
+
+    start_time = time.time()
+    summary = fetch_pvgis_profiles(
+        sites, args.start, args.end,
+        store=ProfileStore(args.store) if args.store else None,
+        base_url=args.base_url, concurrency=args.concurrency, rate=args.rate,
+        retries=args.retries, record_dir=args.record_dir,
+    )
+    print(f"Fetched {summary['fetched']} site-years in {round(time.time() - start_time, 1)} seconds "
+          f"({summary['skipped']} already stored).")
+    for country, reason in summary["failed"].items():
+        print(f"  FAILED {country}: {reason}")
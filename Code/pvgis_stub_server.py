@@ -0,0 +1,161 @@
+"""
+Local stand-in for the PVGIS `seriescalc` endpoint.
+
+Replays JSON responses recorded with `pvgis_fetch.py --record-dir`, so the bulk
+fetcher can be tested and benchmarked without network access. With
+`--synthesise`, requests that have no recording get a clear-sky response in the
+same JSON shape instead of a 404.
+
+    python pvgis_stub_server.py --recordings ../inputs/pvgis_recordings --port 8080 --synthesise
+    python pvgis_fetch.py --base-url http://127.0.0.1:8080/api/v5_2/ --start 2022 --end 2023
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pvgis_fetch import recording_name
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RECORDINGS_PATH = os.path.join(CWD, "..", "inputs", "pvgis_recordings")
+
+
+def synthesise_seriescalc(params: dict) -> dict:
+    """
+    Build a PVGIS-shaped hourly response from pvlib clear-sky irradiance.
+
+    Gb(i) is the beam component on the horizontal plane, Gd(i) the diffuse and
+    Gr(i) (ground-reflected) is zero, which is what PVGIS returns for angle=0.
+    """
+    import numpy as np
+    import pandas as pd
+    from pvlib.location import Location
+
+    site = Location(params["lat"], params["lon"])
+    # PVGIS timestamps are UTC and sit at hh:10
+    times = pd.date_range(
+        start=f"{params['startyear']}-01-01 00:10", end=f"{params['endyear']}-12-31 23:10",
+        freq="h", tz="UTC"
+    )
+    clearsky = site.get_clearsky(times)
+    zenith = site.get_solarposition(times)["apparent_zenith"]
+    beam = (clearsky["dni"] * np.cos(np.radians(zenith))).clip(lower=0)
+
+    hourly = [
+        {"time": t.strftime("%Y%m%d:%H%M"), "Gb(i)": round(float(b), 2), "Gd(i)": round(float(d), 2),
+         "Gr(i)": 0.0, "H_sun": 0.0, "T2m": 0.0, "WS10m": 0.0, "Int": 0.0}
+        for t, b, d in zip(times, beam, clearsky["dhi"])
+    ]
+    return {
+        "inputs": {"location": {"latitude": params["lat"], "longitude": params["lon"]},
+                   "meteo_data": {"radiation_db": params["raddatabase"], "year_min": params["startyear"],
+                                  "year_max": params["endyear"]}},
+        "outputs": {"hourly": hourly},
+        "meta": {"stub": True},
+    }
+
+
+class PVGISStubHandler(BaseHTTPRequestHandler):
+    # Options, lock and counters live on the server instance (see `make_server`)
+    server_version = "PVGISStub/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.rstrip("/").endswith("seriescalc"):
+            return self._send(404, {"message": f"Unknown endpoint {url.path}", "status": 404})
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            params = {
+                "lat": round(float(query["lat"]), 4),
+                "lon": round(float(query["lon"]), 4),
+                "startyear": int(query["startyear"]),
+                "endyear": int(query["endyear"]),
+                "raddatabase": query.get("raddatabase", "PVGIS-ERA5"),
+            }
+        except (KeyError, ValueError) as e:
+            return self._send(400, {"message": f"Bad request: {e}", "status": 400})
+
+        options = self.server.options
+        if options["latency"]:
+            time.sleep(options["latency"])
+        if options["fail_rate"] and random.random() < options["fail_rate"]:
+            return self._send(503, {"message": "Simulated overload", "status": 503})
+
+        path = os.path.join(options["recordings"], recording_name(params))
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return self._send_raw(200, f.read())
+        if options["synthesise"]:
+            with self.server.lock:
+                self.server.synthesised += 1
+            return self._send(200, synthesise_seriescalc(params))
+        return self._send(404, {"message": f"No recording for {recording_name(params)}", "status": 404})
+
+    def _send(self, status, payload):
+        self._send_raw(status, json.dumps(payload).encode())
+
+    def _send_raw(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.options["verbose"]:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8080, recordings=DEFAULT_RECORDINGS_PATH, synthesise=False,
+                latency=0.0, fail_rate=0.0, verbose=False) -> ThreadingHTTPServer:
+    """
+    Create (but don't start) a stand-in server. Use port=0 to pick a free port;
+    the chosen one is `server.server_address[1]`.
+
+    Args:
+        recordings (str): Directory of recorded `seriescalc` JSON responses.
+        synthesise (bool): Answer unrecorded requests with clear-sky data instead of 404.
+        latency (float): Seconds to sleep before every response, to mimic the real API.
+        fail_rate (float): Fraction of requests answered with 503, to exercise retries.
+    """
+    server = ThreadingHTTPServer((host, port), PVGISStubHandler)
+    server.options = {"recordings": recordings, "synthesise": synthesise, "latency": latency,
+                      "fail_rate": fail_rate, "verbose": verbose}
+    server.lock = threading.Lock()
+    server.synthesised = 0
+    return server
+
+
+def serve_in_thread(**kwargs):
+    """Start a stand-in server on a background thread; returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/api/v5_2/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded PVGIS responses locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS_PATH)
+    parser.add_argument("--synthesise", action="store_true", help="Clear-sky responses for unrecorded sites.")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.recordings, args.synthesise,
+                         args.latency, args.fail_rate, args.verbose)
+    print(f"PVGIS stand-in serving {os.path.abspath(args.recordings)} on "
+          f"http://{args.host}:{server.server_address[1]}/api/v5_2/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
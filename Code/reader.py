@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import numpy as np
 
+from provenance import get_recorder
+
 # --- Load and Prepare Default Mappings ---
 try:
     # Project_Root/
@@ -25,6 +27,196 @@ except FileNotFoundError as e:
     _DEFAULT_REGION_MAP = pd.DataFrame()
 
 
+# --- Precompiled Proxy Resolution ---
+def _tokens(value) -> frozenset:
+    """Parse a comma-separated rule cell ("europe, africa, asia") into a set of lower-case tokens."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return frozenset()
+    return frozenset(t.strip().lower() for t in str(value).split(",") if t.strip())
+
+
+class ProxyResolver:
+    """
+    Proxy rules and region map compiled into (country, variable, tech) -> fallback chain.
+
+    Rules are matched in file order on whole tokens (so "niger" no longer matches
+    "nigeria"): the country itself, then its subregion, then its continent. The
+    token "all" matches every country. Resolutions are precomputed for every
+    country in the region map and memoised for any other country on first use,
+    so a lookup that needs a fallback costs the same dict hit as a direct one.
+    """
+
+    WILDCARD = "all"
+
+    def __init__(self, proxy_rules: pd.DataFrame, region_map: pd.DataFrame):
+        self._rules = []
+        self._regions = {}
+        self._cache = {}
+        if proxy_rules.empty or region_map.empty:
+            return
+
+        # region_map may come indexed by country (as the default) or with a 'country' column
+        if "country" in region_map.columns:
+            region_map = region_map.set_index("country")
+        for country, row in region_map.iterrows():
+            self._regions[str(country).strip().lower()] = (
+                str(row["subregion"]).strip().lower(), str(row["continent"]).strip().lower()
+            )
+
+        for rule in proxy_rules.to_dict("records"):
+            tech = rule.get("tech")
+            self._rules.append((
+                str(rule["variable"]).strip().lower(),
+                "" if pd.isna(tech) else str(tech).strip().lower(),
+                str(rule["proxy_region"]).strip().lower(),
+                _tokens(rule.get("applies_to_countries")),
+                _tokens(rule.get("applies_to_regions")),
+                _tokens(rule.get("applies_to_continents")),
+            ))
+        self._variables = {r[0] for r in self._rules}
+
+        # Precompute the full table for every known country
+        rule_keys = {(r[0], r[1]) for r in self._rules} | {(r[0], None) for r in self._rules}
+        countries = set(self._regions) | {c for r in self._rules for c in r[3] if c != self.WILDCARD}
+        for country in countries:
+            for variable, tech in rule_keys:
+                self.proxy(country, variable, tech)
+
+    def _match(self, country, variable, tech):
+        subregion, continent = self._regions.get(country, (None, None))
+        for rule_variable, rule_tech, proxy, countries, regions, continents in self._rules:
+            if rule_variable != variable or (tech and rule_tech != tech):
+                continue
+            if country in countries or self.WILDCARD in countries:
+                return proxy
+            if subregion and (subregion in regions or self.WILDCARD in regions):
+                return proxy
+            if continent and (continent in continents or self.WILDCARD in continents):
+                return proxy
+        return None
+
+    def proxy(self, country: str, variable: str, tech: str = None):
+        """Proxy region for already-normalised (lower-case) inputs, or None."""
+        if not self._rules or variable not in self._variables:
+            return None
+        key = (country, variable, tech or None)
+        if key not in self._cache:
+            self._cache[key] = self._match(country, variable, tech)
+        return self._cache[key]
+
+    def chain(self, country: str, variable: str, tech: str = None) -> tuple:
+        """Ordered regions to try: the country, its proxy (if any), then 'world'."""
+        proxy = self.proxy(country, variable, tech)
+        return tuple(dict.fromkeys(r for r in (country, proxy, "world") if r))
+
+    def table(self) -> pd.DataFrame:
+        """Every resolved (country, variable, tech) with its proxy and fallback chain, for auditing."""
+        rows = [
+            {"country": c, "variable": v, "tech": t or "", "proxy_region": p or "",
+             "chain": " > ".join(self.chain(c, v, t))}
+            for (c, v, t), p in sorted(self._cache.items(), key=lambda kv: (kv[0][0], kv[0][1], kv[0][2] or ""))
+        ]
+        return pd.DataFrame(rows, columns=["country", "variable", "tech", "proxy_region", "chain"])
+
+    def export(self, path: str):
+        """Write `table()` to CSV."""
+        self.table().to_csv(path, index=False)
+
+
+_DEFAULT_RESOLVER = ProxyResolver(_DEFAULT_PROXY_RULES, _DEFAULT_REGION_MAP)
+_RESOLVERS = {}
+
+
+def get_resolver(proxy_rules: pd.DataFrame = None, region_map: pd.DataFrame = None) -> ProxyResolver:
+    """The compiled resolver for these mappings (the defaults unless given); built once per pair."""
+    if proxy_rules is None and region_map is None:
+        return _DEFAULT_RESOLVER
+    proxy_rules = _DEFAULT_PROXY_RULES if proxy_rules is None else proxy_rules
+    region_map = _DEFAULT_REGION_MAP if region_map is None else region_map
+    key = (id(proxy_rules), id(region_map))
+    if key not in _RESOLVERS:
+        # Keep the frames alive alongside the resolver so their ids can't be reused
+        _RESOLVERS[key] = (proxy_rules, region_map, ProxyResolver(proxy_rules, region_map))
+    return _RESOLVERS[key][2]
+
+
+# --- Precompiled Lookup Index ---
+class ParamLookup:
+    """
+    Hashed index over a capex/opex table for constant-time `get_val` lookups.
+
+    The region/variable/tech/type columns are lower-cased once and every row is
+    filed under its (region, year, variable[, tech][, type]) key, once for each
+    combination of tech/type being part of the key (since `get_val` skips those
+    filters when they are not given). Pass the lookup to `get_val` in place of
+    the DataFrame; results are identical, including the mean over duplicates.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.has_tech = "tech" in df.columns
+        self.has_type = "type" in df.columns
+        self._values = {}
+
+        region = df["region"].str.lower().tolist()
+        year = df["year"].tolist()
+        variable = df["variable"].str.lower().tolist()
+        tech = df["tech"].str.lower().tolist() if self.has_tech else None
+        param_type = df["type"].str.lower().tolist() if self.has_type else None
+
+        self._index = {}
+        for use_tech in (False, True):
+            for use_type in (False, True):
+                if (use_tech and not self.has_tech) or (use_type and not self.has_type):
+                    continue
+                cols = [region, year, variable] + ([tech] if use_tech else []) + ([param_type] if use_type else [])
+                index = {}
+                for i, key in enumerate(zip(*cols)):
+                    index.setdefault(key, []).append(i)
+                self._index[(use_tech, use_type)] = {k: np.array(v, dtype=np.intp) for k, v in index.items()}
+
+    def values(self, value_col: str = "value") -> np.ndarray:
+        if value_col not in self._values:
+            self._values[value_col] = self.df[value_col].to_numpy()
+        return self._values[value_col]
+
+    def aggregated(self, use_tech: bool, use_type: bool, value_col: str = "value") -> pd.DataFrame:
+        """
+        One row per key of the (use_tech, use_type) index with the value `get_val`
+        would return for it ('value') and the number of matching rows ('n_matches').
+        Used as the right-hand side of the merges in `get_vals`.
+        """
+        cache_key = ("agg", use_tech, use_type, value_col)
+        if cache_key not in self._values:
+            values = self.values(value_col)
+            index = self._index[(use_tech, use_type)]
+            key_cols = ["region", "year", "variable"] + (["tech"] if use_tech else []) + (["type"] if use_type else [])
+            agg = pd.DataFrame(list(index.keys()), columns=key_cols)
+            agg["year"] = agg["year"].astype(object)
+            agg["n_matches"] = [len(rows) for rows in index.values()]
+            # Single match -> that value; duplicates -> their (NaN-skipping) mean, as in get_val
+            agg["value"] = [
+                float(values[rows[0]]) if len(rows) == 1 else pd.Series(values[rows]).mean()
+                for rows in index.values()
+            ]
+            self._values[cache_key] = agg
+        return self._values[cache_key]
+
+    def find(self, region: str, year, variable: str, tech: str = None, param_type: str = None,
+             value_col: str = "value") -> np.ndarray:
+        """
+        All values matching an already-normalised (lower-case) key; empty if none.
+        tech/param_type of None mean "any", exactly as in `get_val`.
+        """
+        use_tech = bool(tech) and self.has_tech
+        use_type = bool(param_type) and self.has_type
+        key = (region, year, variable) + ((tech,) if use_tech else ()) + ((param_type,) if use_type else ())
+        rows = self._index[(use_tech, use_type)].get(key)
+        if rows is None:
+            return self.values(value_col)[:0]
+        return self.values(value_col)[rows]
+
+
 # --- Main Data Retrieval Function ---
 def get_val(
         df: pd.DataFrame,
@@ -37,12 +229,14 @@ def get_val(
         proxy_rules: pd.DataFrame = None,
         region_map: pd.DataFrame = None,
         used_fallbacks: dict = None,
+        recorder=None,
 ) -> float:
     """
     Retrieve a data value with hierarchical fallback using proxy rules & region map.
 
     Args:
-        df (pd.DataFrame): The main data DataFrame.
+        df (pd.DataFrame or ParamLookup): The main data DataFrame, or a ParamLookup built
+            from it once (much faster when making many lookups).
         country (str): The target country.
         year (int): The target year.
         variable (str): The variable to look up (e.g., 'capex', 'fuel').
@@ -52,6 +246,8 @@ def get_val(
         proxy_rules (pd.DataFrame, optional): DataFrame with proxy rules. Defaults to loaded default.
         region_map (pd.DataFrame, optional): DataFrame mapping countries to regions. Defaults to loaded default.
         used_fallbacks (dict, optional): A dictionary to record when fallbacks are used.
+        recorder (ProvenanceRecorder, optional): Where the lookup's source is recorded.
+            Defaults to the process-wide `provenance.get_recorder()`.
 
     Returns:
         float: The retrieved data value.
@@ -60,8 +256,7 @@ def get_val(
         ValueError: If no value can be found after all fallbacks.
     """
     # Use defaults if not provided
-    proxy_rules = _DEFAULT_PROXY_RULES if proxy_rules is None else proxy_rules
-    region_map = _DEFAULT_REGION_MAP if region_map is None else region_map
+    resolver = get_resolver(proxy_rules, region_map)
 
     # --- 1. Normalize all inputs for consistent matching ---
     country = country.strip().lower()
@@ -70,81 +265,155 @@ def get_val(
     param_type = param_type.strip().lower() if param_type else None
 
     # --- Helper to perform the actual lookup ---
-    def find_value(target_region: str):
-        # Build a boolean mask to filter the DataFrame
-        mask = (
-                (df["region"].str.lower() == target_region) &
-                (df["year"] == year) &
-                (df["variable"].str.lower() == variable)
-        )
-        # Conditionally add filters for tech and type if they are provided
-        if tech and "tech" in df.columns:
-            mask &= df["tech"].str.lower() == tech
-        if param_type and "type" in df.columns:
-            mask &= df["type"].str.lower() == param_type
-
-        return df[mask]
-
-    # --- Helper to find a proxy region from the rules ---
-    def get_proxy_region():
-        if proxy_rules.empty or region_map.empty:
-            return None
+    if isinstance(df, ParamLookup):
+        lookup = df
 
-        try:
-            country_info = region_map.loc[country]
-            subregion = country_info['subregion'].lower()
-            continent = country_info['continent'].lower()
-        except KeyError:  # Country not in region map
-            subregion, continent = None, None
-
-        # Filter rules for the specific variable and tech
-        rule_mask = (proxy_rules["variable"].str.lower() == variable)
-        # Handle cases where tech might be None or not applicable
-        if tech:
-            rule_mask &= (proxy_rules["tech"].fillna('').str.lower() == tech)
-
-        filtered_rules = proxy_rules[rule_mask]
-
-        for _, rule in filtered_rules.iterrows():
-            # Check for country, then region, then continent match
-            if country in str(rule.get("applies_to_countries", "")).lower():
-                return rule["proxy_region"].lower()
-            if subregion and subregion in str(rule.get("applies_to_regions", "")).lower():
-                return rule["proxy_region"].lower()
-            if continent and continent in str(rule.get("applies_to_continents", "")).lower():
-                return rule["proxy_region"].lower()
-        return None
+        def find_value(target_region: str):
+            return lookup.find(target_region, year, variable, tech, param_type, value_col)
+    else:
+        def find_value(target_region: str):
+            # Build a boolean mask to filter the DataFrame
+            mask = (
+                    (df["region"].str.lower() == target_region) &
+                    (df["year"] == year) &
+                    (df["variable"].str.lower() == variable)
+            )
+            # Conditionally add filters for tech and type if they are provided
+            if tech and "tech" in df.columns:
+                mask &= df["tech"].str.lower() == tech
+            if param_type and "type" in df.columns:
+                mask &= df["type"].str.lower() == param_type
+
+            return df.loc[mask, value_col].to_numpy()
 
     # --- 2. Attempt lookups in hierarchical order ---
     # Level 1: Direct country match
     subset = find_value(country)
+    source, region = "direct", country
 
     # Level 2: Proxy region fallback
-    if subset.empty:
-        proxy = get_proxy_region()
+    if len(subset) == 0:
+        proxy = resolver.proxy(country, variable, tech)
         if proxy:
             subset = find_value(proxy)
-            if not subset.empty and used_fallbacks is not None:
+            source, region = "proxy", proxy
+            if len(subset) and used_fallbacks is not None:
                 used_fallbacks[(country, variable, tech, year)] = proxy
-                print(
-                    f"INFO: No direct data for {country.title()} ({variable}, {tech or ''}, {year}). Using proxy '{proxy.title()}'.")
 
     # Level 3: Global 'world' fallback
-    if subset.empty:
+    if len(subset) == 0:
         subset = find_value("world")
-        if not subset.empty and used_fallbacks is not None:
+        source, region = "world", "world"
+        if len(subset) and used_fallbacks is not None:
             used_fallbacks[(country, variable, tech, year)] = "world"
-            print(
-                f"INFO: No direct/proxy data for {country.title()} ({variable}, {tech or ''}, {year}). Using 'World' default.")
 
     # --- 3. Process the result or raise an error ---
-    if subset.empty:
+    if len(subset) == 0:
+        source, region = "missing", None
+    (recorder or get_recorder()).record(country, year, variable, tech, param_type, source, region, len(subset))
+
+    if len(subset) == 0:
         raise ValueError(
             f"FATAL: No match found for: Country='{country}', Year='{year}', Var='{variable}', Tech='{tech or 'N/A'}'")
 
     if len(subset) > 1:
-        val = subset[value_col].mean()
-        print(f"WARNING: Found {len(subset)} matches for the query. Returning the mean value: {val}.")
-        return val
+        # Duplicate rows are averaged; the recorder counts these under 'averaged'
+        return pd.Series(subset).mean()
+
+    return float(subset[0])
+
+
+# --- Batch Data Retrieval ---
+def get_vals(
+        df,
+        queries: pd.DataFrame,
+        value_col: str = "value",
+        proxy_rules: pd.DataFrame = None,
+        region_map: pd.DataFrame = None,
+) -> pd.DataFrame:
+    """
+    Resolve many `get_val` queries at once with joins instead of per-call scans.
+
+    Every query is matched against the normalised table for its country, then for
+    its proxy region, then for 'world', each level being one merge over all
+    queries still unresolved. Values are the same as `get_val` would return.
+
+    Args:
+        df (pd.DataFrame or ParamLookup): The main data DataFrame (or its ParamLookup).
+        queries (pd.DataFrame): Columns 'country', 'year', 'variable' and optionally
+            'tech' and 'param_type' (None/NaN/empty means "any", as in `get_val`).
+        value_col (str, optional): The name of the column containing the value.
+        proxy_rules, region_map (pd.DataFrame, optional): As in `get_val`.
+
+    Returns:
+        pd.DataFrame: `queries` (same index) plus 'value' (NaN if missing),
+        'source' ('direct', 'proxy', 'world' or 'missing'), 'region' (the region the
+        value came from) and 'n_matches' (rows averaged).
+    """
+    lookup = df if isinstance(df, ParamLookup) else ParamLookup(df)
+    resolver = get_resolver(proxy_rules, region_map)
+
+    def _norm(col):
+        if col not in queries.columns:
+            return pd.Series("", index=queries.index, dtype=object)
+        return queries[col].fillna("").astype(str).str.strip().str.lower().astype(object)
+
+    q = pd.DataFrame({
+        "country": _norm("country"),
+        "year": queries["year"].astype(object),
+        "variable": _norm("variable"),
+        "tech": _norm("tech"),
+        "type": _norm("param_type"),
+    }, index=queries.index)
+    q["_row"] = np.arange(len(q))
+
+    # --- Proxy per unique (country, variable, tech) from the compiled table ---
+    combos = q[["country", "variable", "tech"]].drop_duplicates()
+    combos["proxy"] = [
+        resolver.proxy(c, v, t or None) or "" for c, v, t in combos.itertuples(index=False, name=None)
+    ]
+    q = q.merge(combos, on=["country", "variable", "tech"], how="left")
+
+    value = np.full(len(q), np.nan)
+    n_matches = np.zeros(len(q), dtype=int)
+    source = np.full(len(q), "missing", dtype=object)
+    region = np.full(len(q), "", dtype=object)
+    resolved = np.zeros(len(q), dtype=bool)
+
+    # tech/type only filter when given and present in the table, as in get_val
+    use_tech = (q["tech"] != "").to_numpy() & lookup.has_tech
+    use_type = (q["type"] != "").to_numpy() & lookup.has_type
+
+    for level, region_col in (("direct", "country"), ("proxy", "proxy"), ("world", None)):
+        for ut in (False, True):
+            for uy in (False, True):
+                mask = ~resolved & (use_tech == ut) & (use_type == uy)
+                if level == "proxy":
+                    mask &= (q["proxy"] != "").to_numpy()
+                if not mask.any():
+                    continue
+                agg = lookup.aggregated(ut, uy, value_col)
+                key_cols = ["region", "year", "variable"] + (["tech"] if ut else []) + (["type"] if uy else [])
+                left = q.loc[mask, ["_row", "year", "variable", "tech", "type"]].copy()
+                left["region"] = q.loc[mask, region_col] if region_col else "world"
+                hits = left[key_cols + ["_row"]].merge(agg, on=key_cols, how="inner")
+                rows = hits["_row"].to_numpy()
+                value[rows] = hits["value"].to_numpy()
+                n_matches[rows] = hits["n_matches"].to_numpy()
+                source[rows] = level
+                region[rows] = hits["region"].to_numpy()
+                resolved[rows] = True
+
+    out = queries.copy()
+    out["value"] = value
+    out["source"] = source
+    out["region"] = region
+    out["n_matches"] = n_matches
+    return out
+
 
-    return float(subset.iloc[0][value_col])
\ No newline at end of file
+if __name__ == "__main__":
+    # Export the resolved proxy table for auditing
+    output_file = os.path.join(os.path.dirname(__file__), "..", "outputs", "proxy_resolution.csv")
+    _DEFAULT_RESOLVER.export(output_file)
+    print(f"Proxy resolution table saved to {os.path.abspath(output_file)}")
@@ -0,0 +1,158 @@
+"""
+Streaming results sink: result batches go to a partitioned Parquet dataset as they complete.
+
+Rows are buffered up to `batch_rows` and then written, one file per partition
+(hive layout, e.g. `Tech=Gas/Year=2020/part-000003.parquet`), so memory stays
+bounded by the batch size however large the run is. Each file is written under
+a dot-prefixed temporary name and renamed into place, and Parquet readers
+skip dot-prefixed files, so the dataset can be read at any point during a run:
+
+    read_results("outputs/lcoe_results")                           # everything written so far
+    read_results("outputs/lcoe_results", filters=[("Tech", "==", "Gas")])
+
+The partition columns' types are saved in `_partitions.json` next to the data,
+and `read_results` / `export_csv` read them back with it; without it pyarrow
+guesses from the directory names (an id like '0123' would come back as 123).
+
+`export_csv` streams the dataset to a single CSV for tools that need one.
+"""
+import glob
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+
+DEFAULT_PARTITIONS = ["Tech", "Year"]
+PARTITIONS_FILE = "_partitions.json"
+
+
+class ResultsSink:
+    """
+    Append-only partitioned Parquet writer.
+
+    Args:
+        root (str): Dataset directory.
+        partition_cols (list): Columns to partition by; each becomes a `name=value` directory level.
+        batch_rows (int): Rows buffered before a flush.
+        dtypes (dict, optional): Column -> dtype applied to every batch, so files agree
+            on a schema even when a batch has an all-empty column.
+        overwrite (bool): Remove an existing dataset at `root` first; otherwise new files
+            are added next to it (e.g. when resuming).
+
+    Use as a context manager, or call `close()`, to flush the last batch.
+    """
+
+    def __init__(self, root, partition_cols=DEFAULT_PARTITIONS, batch_rows=100_000, dtypes=None, overwrite=True):
+        self.root = root
+        self.partition_cols = list(partition_cols)
+        self.batch_rows = batch_rows
+        self.dtypes = dtypes or {}
+        if overwrite and os.path.exists(root):
+            shutil.rmtree(root)
+        os.makedirs(root, exist_ok=True)
+        self._buffer = []
+        self._buffered = 0
+        # Continue numbering after existing parts so appends never overwrite them
+        self._part = len(glob.glob(os.path.join(root, "**", "part-*.parquet"), recursive=True))
+        self.rows_written = 0
+
+    def write(self, batch: pd.DataFrame):
+        """Queue a batch of rows; flushed to disk once `batch_rows` are buffered."""
+        if batch.empty:
+            return
+        self._buffer.append(batch)
+        self._buffered += len(batch)
+        if self._buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows, one file per partition."""
+        if not self._buffer:
+            return
+        frame = pd.concat(self._buffer, ignore_index=True)
+        self._buffer, self._buffered = [], 0
+        for column, dtype in self.dtypes.items():
+            if column in frame:
+                frame[column] = frame[column].astype(dtype)
+        self._save_partition_types(frame)
+
+        groups = frame.groupby(self.partition_cols, sort=False, dropna=False) if self.partition_cols \
+            else [((), frame)]
+        for values, group in groups:
+            values = values if isinstance(values, tuple) else (values,)
+            directory = os.path.join(self.root, *(f"{c}={v}" for c, v in zip(self.partition_cols, values)))
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{self._part:06d}.parquet"
+            self._part += 1
+            tmp_path = os.path.join(directory, "." + name)
+            group.drop(columns=self.partition_cols).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, os.path.join(directory, name))
+            self.rows_written += len(group)
+
+    def _save_partition_types(self, frame):
+        path = os.path.join(self.root, PARTITIONS_FILE)
+        if not self.partition_cols or os.path.exists(path):
+            return
+        schema = pa.Schema.from_pandas(frame[self.partition_cols], preserve_index=False)
+        with open(path, "w") as f:
+            json.dump({column: str(schema.field(column).type) for column in self.partition_cols}, f)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Keep whatever completed, also when the run failed
+        self.close()
+
+
+def partitioning(root):
+    """Hive partitioning of the dataset at `root`, typed as its sink saved them."""
+    import pyarrow.dataset as ds
+
+    path = os.path.join(root, PARTITIONS_FILE)
+    if not os.path.exists(path):
+        return "hive"
+    with open(path) as f:
+        types = json.load(f)
+    return ds.partitioning(pa.schema([(column, pa.type_for_alias(t)) for column, t in types.items()]),
+                           flavor="hive")
+
+
+def read_results(root, columns=None, filters=None) -> pd.DataFrame:
+    """Everything written to `root` so far (partition columns included), optionally filtered."""
+    return pd.read_parquet(root, columns=columns, filters=filters, partitioning=partitioning(root))
+
+
+def export_csv(root, output_file, columns=None, batch_size=100_000) -> int:
+    """
+    Stream a results dataset to one CSV without loading it whole.
+
+    Args:
+        columns (list, optional): Column order of the CSV; defaults to the dataset's.
+
+    Returns:
+        int: Rows written.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning(root))
+    rows = 0
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            frame = batch.to_pandas()
+            frame.to_csv(f, index=False, header=rows == 0)
+            rows += len(frame)
+        if rows == 0:
+            pd.DataFrame(columns=columns or dataset.schema.names).to_csv(f, index=False)
+    os.replace(tmp_path, output_file)
+    return rows
@@ -0,0 +1,156 @@
+"""
+Process-pool task runner with per-task timeouts and fault isolation.
+
+Every task runs in its own worker process (at most `processes` at a time), so
+a solve that hangs can be killed at its timeout and one that raises or crashes
+the interpreter only fails that task. On POSIX each worker leads its own
+process group, and killing it kills the group, so solver subprocesses (CBC)
+don't outlive a timed-out task. Results come back in task order whatever
+order they finish in, and progress is a single tqdm bar.
+
+    results = run_tasks(size_site, [(lat, lon, capex), ...], processes=8, timeout=600)
+"""
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+
+from tqdm import tqdm
+
+
+def error_message(e):
+    """'Type: message' followed by the traceback of the exception being handled."""
+    return f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+
+
+def _worker(conn, fn, task):
+    if hasattr(os, "setsid"):
+        # Own process group, so _kill also reaches the processes the task starts
+        os.setsid()
+    try:
+        conn.send(("ok", fn(task)))
+    except Exception as e:
+        conn.send(("error", error_message(e)))
+    finally:
+        conn.close()
+
+
+def _kill(proc):
+    """Kill a worker and, on POSIX, everything in its process group."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):  # group gone, or not created yet
+            pass
+    proc.kill()
+
+
+def task_result(task, status, value, started):
+    """The per-task dict returned by `run_tasks` (status 'ok' or 'error')."""
+    return {
+        "task": task,
+        "ok": status == "ok",
+        "result": value if status == "ok" else None,
+        "error": None if status == "ok" else value,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def _run_inline(fn, tasks, bar, on_result):
+    results = []
+    for task in tasks:
+        started = time.monotonic()
+        try:
+            results.append(task_result(task, "ok", fn(task), started))
+        except Exception as e:
+            results.append(task_result(task, "error", error_message(e), started))
+        if on_result:
+            on_result(results[-1])
+        bar.update()
+    return results
+
+
+def run_tasks(fn, tasks, processes=None, timeout=None, desc="Tasks", start_method=None, on_result=None):
+    """
+    Run `fn(task)` for every task, isolating failures.
+
+    Args:
+        fn (callable): Module-level function (must be picklable for 'spawn').
+        tasks (iterable): Arguments, one per call; should be small, as each is sent to its worker.
+        processes (int, optional): Concurrent workers. Defaults to the CPU count. With 1 worker
+            and no timeout, tasks run in this process.
+        timeout (float, optional): Seconds before a task's worker is killed and the task failed.
+        start_method (str, optional): multiprocessing start method ('fork', 'spawn', ...).
+        on_result (callable, optional): Called in this process with each task's result dict
+            as soon as it finishes (e.g. to checkpoint it).
+
+    Returns:
+        list: One dict per task, in task order, with 'task', 'ok', 'result', 'error'
+        (message and traceback, timeout or exit code) and 'seconds'.
+    """
+    tasks = list(tasks)
+    processes = max(1, processes or os.cpu_count() or 1)
+    with tqdm(total=len(tasks), desc=desc) as bar:
+        if processes == 1 and timeout is None:
+            return _run_inline(fn, tasks, bar, on_result)
+
+        ctx = multiprocessing.get_context(start_method)
+        results = [None] * len(tasks)
+        pending = deque(enumerate(tasks))
+        running = {}  # reader -> (index, process, start time)
+        try:
+            while pending or running:
+                while pending and len(running) < processes:
+                    i, task = pending.popleft()
+                    reader, writer = ctx.Pipe(duplex=False)
+                    proc = ctx.Process(target=_worker, args=(writer, fn, task), daemon=True)
+                    proc.start()
+                    writer.close()
+                    running[reader] = (i, proc, time.monotonic())
+
+                # Wake on a result, a worker exiting, or the nearest deadline
+                wait_for = None
+                if timeout is not None:
+                    wait_for = max(0.0, min(s for _, _, s in running.values()) + timeout - time.monotonic())
+                wait(list(running) + [proc.sentinel for _, proc, _ in running.values()], timeout=wait_for)
+
+                for reader, (i, proc, started) in list(running.items()):
+                    # Checked before polling: a worker that sends its result and exits in
+                    # between would otherwise look like it died without one
+                    exited = not proc.is_alive()
+                    if reader.poll():
+                        try:
+                            status, value = reader.recv()
+                        except EOFError:
+                            proc.join()
+                            status, value = "error", f"Worker exited with code {proc.exitcode}"
+                    elif exited:
+                        status, value = "error", f"Worker exited with code {proc.exitcode}"
+                    elif timeout is not None and time.monotonic() - started > timeout:
+                        _kill(proc)
+                        status, value = "error", f"Timed out after {timeout} s"
+                    else:
+                        continue
+                    if status == "error":
+                        # Also reaps a solver left behind by a worker that died
+                        _kill(proc)
+                    proc.join()
+                    reader.close()
+                    del running[reader]
+                    results[i] = task_result(tasks[i], status, value, started)
+                    if on_result:
+                        on_result(results[i])
+                    bar.update()
+        finally:
+            # Only left running when interrupted (e.g. Ctrl-C), which their own process groups don't receive
+            for _, proc, _ in running.values():
+                _kill(proc)
+    return results
+
+
+def failures(results) -> list:
+    """The failed entries of `run_tasks` output."""
+    return [r for r in results if not r["ok"]]
@@ -0,0 +1,262 @@
+"""
+Scenario matrix: the cartesian product of run settings, with shared work done once.
+
+A config file (YAML or JSON) lists the values to combine:
+
+    countries: [Chile, Australia, Spain]     # empty or missing = all countries
+    techs: [Solar+BESS, Coal, Gas]
+    years: [2015, 2020, 2024]                # optional, defaults to main.YEARS
+    matrix:
+      availability: [0.8, 0.9, 0.95]
+      base_year: [2024]
+      solar_year: [2022, 2023]
+      efficiency: [0.85, 0.9]
+
+Rather than one full run per scenario, the whole matrix is planned up front:
+
+  * one profile per (country, solar_year)
+  * one parameter lookup per (country, year) over the union of all years
+  * one sizing per distinct (profile, solar/BESS capex ratio, availability,
+    efficiency), shared with sensitivity.py's on-disk sizing cache
+  * conventional LCOEs, which no matrix setting affects, once per tech
+
+and each scenario's Solar+BESS LCOEs come from one `lcoe_vec` broadcast.
+The output is one long table tagged with 'Scenario_Id', optionally streamed
+scenario by scenario to a partitioned Parquet dataset (see results_sink.py).
+
+    python scenarios.py scenarios.yaml --processes 8 --parquet
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from lcoe_helpers import SOLAR_BESS_PARAMS, conventional_params
+from lcoe_vec import solar_bess_frame, conventional_frame
+from profile import generate_hourly_solar_profile
+from results_sink import ResultsSink, export_csv
+from runner import run_tasks
+from sensitivity import DEFAULT_CACHE_PATH, size_for_ratio
+from sizing_cache import load_sizing_cache, profile_hash, sizing_key
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+
+# main.py's hard-coded settings, used for any that the matrix leaves out
+DEFAULT_SETTINGS = {"availability": 0.8, "base_year": 2024, "solar_year": 2023, "efficiency": 0.9}
+RESULT_COLS = ["Scenario_Id", "Country", "Year", "Tech", "LCOE", "Cost", "Solar_Capacity_MW", "BESS_Energy_MWh"]
+RESULT_DTYPES = {"LCOE": float, "Cost": float, "Solar_Capacity_MW": float, "BESS_Energy_MWh": float}
+
+
+def load_config(path) -> dict:
+    """Read a YAML (.yaml/.yml) or JSON scenario config."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def scenario_id(settings: dict) -> str:
+    """Short, stable id of a settings combination (the same settings always get the same id)."""
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=float).encode()).hexdigest()[:10]
+
+
+def expand(matrix: dict) -> pd.DataFrame:
+    """
+    Every combination of the matrix values.
+
+    Raises:
+        ValueError: For a setting the runner does not know.
+
+    Returns:
+        pd.DataFrame: 'Scenario_Id' plus one column per setting in DEFAULT_SETTINGS.
+    """
+    unknown = set(matrix or {}) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown matrix settings {sorted(unknown)}; expected some of {list(DEFAULT_SETTINGS)}")
+    values = {name: (matrix or {}).get(name, [default]) for name, default in DEFAULT_SETTINGS.items()}
+    values = {name: v if isinstance(v, list) else [v] for name, v in values.items()}
+    rows = [dict(zip(values, combo)) for combo in itertools.product(*values.values())]
+    scenarios = pd.DataFrame(rows, columns=list(DEFAULT_SETTINGS))
+    scenarios.insert(0, "Scenario_Id", [scenario_id(row) for row in rows])
+    return scenarios.drop_duplicates("Scenario_Id").reset_index(drop=True)
+
+
+def _size_task(task):
+    return size_for_ratio(*task)
+
+
+def plan_sizing(scenarios, countries, solar_bess_params, profiles):
+    """
+    The sizing each (scenario, country) needs, keyed so that shared sizings coincide.
+
+    Args:
+        profiles (dict): (country, solar_year) -> profile.
+
+    Returns:
+        pd.DataFrame: 'Scenario_Id', 'Country', 'key' (None where base-year capex is missing)
+        and the task inputs 'ratio', 'availability', 'efficiency', 'solar_year'.
+    """
+    digests = {site: profile_hash(profile) for site, profile in profiles.items()}
+    pairs = scenarios.merge(countries[["Country"]], how="cross")
+    capex = solar_bess_params[["solar_capex", "bess_capex"]].reindex(
+        pd.MultiIndex.from_arrays([pairs["Country"], pairs["base_year"]])
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pairs["ratio"] = (capex["solar_capex"] / capex["bess_capex"]).to_numpy()
+    pairs["key"] = [
+        sizing_key(digests[(country, solar_year)], ratio, availability, efficiency)
+        if np.isfinite(ratio) else None
+        for country, solar_year, ratio, availability, efficiency in zip(
+            pairs["Country"], pairs["solar_year"], pairs["ratio"], pairs["availability"], pairs["efficiency"])
+    ]
+    return pairs
+
+
+def run_matrix(config: dict, countries_df: pd.DataFrame, cube, processes=1, timeout=None,
+               cache_path=DEFAULT_CACHE_PATH, sink=None):
+    """
+    Run every scenario of `config` (see module docstring).
+
+    Args:
+        sink (ResultsSink, optional): Stream each scenario's rows to this sink as soon as
+            they are computed instead of returning them.
+
+    Returns:
+        tuple: (scenarios DataFrame, long results DataFrame with RESULT_COLS, or None with a `sink`)
+    """
+    from main import YEARS, CONVENTIONAL_TECHS
+
+    scenarios = expand(config.get("matrix"))
+    countries = countries_df
+    if config.get("countries"):
+        countries = countries_df[countries_df["Country"].isin(config["countries"])]
+    techs = config.get("techs") or ["Solar+BESS"] + CONVENTIONAL_TECHS
+    years = sorted(config.get("years") or YEARS)
+    all_years = sorted(set(years) | set(scenarios["base_year"]))
+
+    # --- Shared parameter lookups: every country and year once ---
+    specs = {tech: SOLAR_BESS_PARAMS if tech == "Solar+BESS" else conventional_params(tech) for tech in techs}
+    params, _ = cube.to_params(specs, countries["Country"], all_years)
+
+    rows = []
+
+    def emit(frame):
+        if sink is not None:
+            sink.write(frame[RESULT_COLS])
+        else:
+            rows.append(frame)
+
+    if "Solar+BESS" in techs:
+        # --- Shared profiles: one per (country, solar year) ---
+        sites = countries.set_index("Country")[["Latitude", "Longitude"]]
+        profiles = {
+            (country, int(solar_year)): generate_hourly_solar_profile(lat, lon, solar_year=int(solar_year))
+            for solar_year in scenarios["solar_year"].unique()
+            for country, (lat, lon) in sites.iterrows()
+        }
+
+        # --- Shared sizing: one solve per distinct (profile, capex ratio, availability, efficiency) ---
+        pairs = plan_sizing(scenarios, countries, params["Solar+BESS"], profiles)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        cache = load_sizing_cache(cache_path)
+        todo = pairs.dropna(subset=["key"]).drop_duplicates("key")
+        todo = todo[~todo["key"].isin(list(cache))]
+        print(f"Scenario matrix: {len(scenarios)} scenarios x {len(countries)} countries; "
+              f"{len(profiles)} profiles, {pairs['key'].nunique()} distinct sizings "
+              f"({len(todo)} to solve, the rest cached).")
+
+        tasks = [
+            (profiles[(country, int(solar_year))], ratio, availability, efficiency)
+            for country, solar_year, ratio, availability, efficiency in zip(
+                todo["Country"], todo["solar_year"], todo["ratio"], todo["availability"], todo["efficiency"])
+        ]
+        results = run_tasks(_size_task, tasks, processes, timeout, desc="Sizing")
+        with open(cache_path, "a") as cache_file:
+            for key, result in zip(todo["key"], results):
+                # Timeouts and crashes are not cached, so the next run retries them
+                if result["ok"]:
+                    cache[key] = {"key": key, **result["result"]}
+                    cache_file.write(json.dumps(cache[key]) + "\n")
+
+        sized = [cache.get(key, {}) if key else {} for key in pairs["key"]]
+        pairs["Solar_Capacity_MW"] = [s.get("solar_cap", np.nan) for s in sized]
+        pairs["BESS_Energy_MWh"] = [s.get("bess_energy", np.nan) for s in sized]
+        pairs = pairs.dropna(subset=["Solar_Capacity_MW"])
+
+        # --- Solar+BESS LCOE: one broadcast per scenario over all its countries and years ---
+        solar_bess = params["Solar+BESS"].reset_index()
+        for _, scenario_pairs in pairs.groupby("Scenario_Id", sort=False):
+            frame = scenario_pairs.merge(solar_bess, left_on="Country", right_on="country")
+            frame = frame[frame["year"].isin(years) | (frame["year"] == frame["base_year"])]
+            lcoe = solar_bess_frame(frame[list(SOLAR_BESS_PARAMS)], frame["Solar_Capacity_MW"],
+                                    frame["BESS_Energy_MWh"], frame["availability"].to_numpy())
+            keep = lcoe["LCOE"].notna().to_numpy() | (frame["year"] == frame["base_year"]).to_numpy()
+            emit(pd.DataFrame({
+                "Scenario_Id": frame["Scenario_Id"], "Country": frame["Country"], "Year": frame["year"],
+                "Tech": "Solar+BESS", "LCOE": lcoe["LCOE"], "Cost": lcoe["Total_Capex"],
+                "Solar_Capacity_MW": frame["Solar_Capacity_MW"], "BESS_Energy_MWh": frame["BESS_Energy_MWh"],
+            })[keep])
+
+    # --- Conventional LCOEs: no matrix setting affects them, so computed once and tagged ---
+    for tech in [t for t in techs if t != "Solar+BESS"]:
+        tech_params = params[tech][params[tech].index.get_level_values("year").isin(years)]
+        result = conventional_frame(tech_params, capacity_mw=1.0).dropna(subset=["LCOE"]).reset_index()
+        tech_rows = pd.DataFrame({
+            "Country": result["country"], "Year": result["year"], "Tech": tech,
+            "LCOE": result["LCOE"], "Cost": result["Total_Capex"],
+            "Solar_Capacity_MW": np.nan, "BESS_Energy_MWh": np.nan,
+        })
+        for sid in scenarios["Scenario_Id"]:
+            emit(tech_rows.assign(Scenario_Id=sid))
+
+    if sink is not None:
+        sink.flush()
+        return scenarios, None
+    results_df = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=RESULT_COLS)
+    results_df = results_df[RESULT_COLS].sort_values(["Scenario_Id", "Country", "Tech", "Year"], kind="stable")
+    return scenarios, results_df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from param_cube import load_cube
+    from main import BASE_YEAR, YEARS, PARAM_SPECS
+
+    parser = argparse.ArgumentParser(description="Run a scenario matrix from a YAML/JSON config.")
+    parser.add_argument("config", help="Scenario config (.yaml, .yml or .json).")
+    parser.add_argument("--processes", type=int, default=1, help="Parallel sizing solves (0 = one per CPU).")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds before a sizing solve is abandoned.")
+    parser.add_argument("--parquet", action="store_true",
+                        help="Stream results to outputs/scenario_results/ (partitioned Parquet) while running, "
+                             "then export the CSV from it.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    countries_df = pd.read_csv(os.path.join(INPUT_PATH, "all_country_coordinates_2.csv"))
+    base_years = (config.get("matrix") or {}).get("base_year", [BASE_YEAR])
+    years = sorted(set(config.get("years") or YEARS) | set(base_years if isinstance(base_years, list) else [base_years]))
+    cube = load_cube(years=years, specs=PARAM_SPECS)
+
+    start_time = time.time()
+    output_file = os.path.join(OUTPUT_PATH, "scenario_results.csv")
+    if args.parquet:
+        dataset = os.path.join(OUTPUT_PATH, "scenario_results")
+        with ResultsSink(dataset, ["Scenario_Id", "Tech", "Year"], dtypes=RESULT_DTYPES) as sink:
+            scenarios, _ = run_matrix(config, countries_df, cube, args.processes, args.timeout, sink=sink)
+        n_rows = export_csv(dataset, output_file, columns=RESULT_COLS)
+    else:
+        scenarios, results_df = run_matrix(config, countries_df, cube, args.processes, args.timeout)
+        results_df.to_csv(output_file, index=False)
+        n_rows = len(results_df)
+    scenarios.to_csv(os.path.join(OUTPUT_PATH, "scenarios.csv"), index=False)
+    print(f"{n_rows} rows for {len(scenarios)} scenarios in {round(time.time() - start_time, 1)} "
+          f"seconds -> {output_file}")
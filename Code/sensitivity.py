@@ -0,0 +1,193 @@
+"""
+One-at-a-time (tornado) sensitivity of the base-year Solar+BESS LCOE per country.
+
+Each input is moved by -delta and +delta on its own. The sizing LP only
+depends on the solar/BESS capex *ratio*, the availability target and the BESS
+efficiency, so:
+
+  * opex, discount rate and lifetime perturbations reuse the baseline sizing;
+  * capex, availability and efficiency perturbations are sized once per
+    distinct (profile, capex ratio, availability, efficiency) and cached on
+    disk, so repeated runs (or another delta hitting the same key) don't re-solve.
+
+All scenario LCOEs are then evaluated in one `lcoe_vec` broadcast.
+
+    python sensitivity.py --countries Chile Spain --delta 0.1
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from lcoe_helpers import SOLAR_BESS_PARAMS
+from lcoe_vec import solar_bess_lcoe_vec, to_frac
+from profile import generate_hourly_solar_profile
+from sizing_cache import load_sizing_cache, profile_hash, sizing_key
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+DEFAULT_CACHE_PATH = os.path.join(OUTPUT_PATH, "sensitivity_cache", "sizing.jsonl")
+
+INPUTS = ["solar_capex", "bess_capex", "solar_opex", "bess_opex", "discount_rate", "solar_lifetime",
+          "availability", "efficiency"]
+
+
+# --- Sizing ---
+def size_for_ratio(profile, capex_ratio, availability, efficiency):
+    # Imported here so financial-only runs never load the solver
+    from optimiser import optimise_bess_fast
+
+    # The LP is scale-invariant in capex, so solve with BESS capex normalised to 1
+    try:
+        _, solar_cap, bess_energy, _ = optimise_bess_fast(
+            profile, capex_ratio, 1.0, availability=availability, efficiency=efficiency
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"solar_cap": solar_cap, "bess_energy": bess_energy}
+
+
+# --- Scenarios ---
+def perturb(base: dict, name: str, factor: float) -> dict:
+    """Copy of `base` inputs with `name` scaled by (1 + factor); availability is capped at 1."""
+    inputs = dict(base)
+    if name == "availability":
+        inputs[name] = min(base[name] * (1 + factor), 1.0)
+    else:
+        inputs[name] = base[name] * (1 + factor)
+    return inputs
+
+
+def country_scenarios(country: str, params: dict, availability: float, efficiency: float, delta: float) -> list:
+    """Baseline plus a -delta and a +delta scenario per input, as dicts of every LCOE/sizing input."""
+    base = {**{name: params.get(name, np.nan) for name in SOLAR_BESS_PARAMS},
+            "availability": availability, "efficiency": efficiency}
+    # Perturb the rate as a fraction even when the table has it in percent
+    base["discount_rate"] = float(to_frac(base["discount_rate"]))
+    scenarios = [{"Country": country, "Input": "base", "Direction": "base", **base}]
+    for name in INPUTS:
+        for direction, factor in (("low", -delta), ("high", delta)):
+            scenarios.append({"Country": country, "Input": name, "Direction": direction,
+                              **perturb(base, name, factor)})
+    return scenarios
+
+
+def tornado(countries: pd.DataFrame, params: pd.DataFrame, year: int, delta: float = 0.1,
+            availability: float = 0.8, efficiency: float = 0.9, solar_year: int = 2023,
+            cache_path: str = DEFAULT_CACHE_PATH) -> pd.DataFrame:
+    """
+    Tornado table for each country.
+
+    Args:
+        countries (pd.DataFrame): 'Country', 'Latitude', 'Longitude'.
+        params (pd.DataFrame): Solar+BESS parameters indexed by (country, year).
+        year (int): Year whose parameters are perturbed (the sizing base year).
+        delta (float): Relative perturbation, e.g. 0.1 for ±10%.
+
+    Returns:
+        pd.DataFrame: One row per (Country, Input) with the low/high input values, LCOE_Base,
+        LCOE_Low, LCOE_High, 'Swing' (|high - low|) and 'Resized' (whether a perturbation
+        changed the sizing key), sorted by swing within each country.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    cache = load_sizing_cache(cache_path)
+
+    scenarios, solved = [], 0
+    with open(cache_path, "a") as cache_file:
+        for _, row in countries.iterrows():
+            country = row["Country"]
+            base_params = params.loc[(country, year)] if (country, year) in params.index else {}
+            country_rows = pd.DataFrame(country_scenarios(
+                country, dict(base_params), availability, efficiency, delta
+            ))
+
+            # Size each distinct (capex ratio, availability, efficiency) once
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratios = (country_rows["solar_capex"] / country_rows["bess_capex"]).to_numpy()
+            if np.isnan(ratios[0]):
+                print(f"  {country}: no base-year solar/BESS capex, sizing skipped.")
+                country_rows["key"] = None
+                scenarios.append(country_rows)
+                continue
+
+            profile = generate_hourly_solar_profile(row["Latitude"], row["Longitude"], solar_year=solar_year)
+            country_rows["key"] = [
+                sizing_key(profile_hash(profile), ratio, avail, eff)
+                for ratio, avail, eff in zip(ratios, country_rows["availability"], country_rows["efficiency"])
+            ]
+            for key, ratio, avail, eff in zip(country_rows["key"], ratios, country_rows["availability"],
+                                              country_rows["efficiency"]):
+                if key not in cache:
+                    cache[key] = {"key": key, **size_for_ratio(profile, ratio, avail, eff)}
+                    cache_file.write(json.dumps(cache[key]) + "\n")
+                    cache_file.flush()
+                    solved += 1
+            scenarios.append(country_rows)
+
+    scenarios = pd.concat(scenarios, ignore_index=True)
+    sizing = [cache.get(key, {}) if key else {} for key in scenarios["key"]]
+    scenarios["Solar_Capacity_MW"] = [s.get("solar_cap", np.nan) for s in sizing]
+    scenarios["BESS_Energy_MWh"] = [s.get("bess_energy", np.nan) for s in sizing]
+    print(f"Sensitivity: {len(scenarios)} scenarios, {solved} sizing solves "
+          f"({scenarios['key'].nunique()} distinct sizings).")
+
+    # --- Every scenario's LCOE in one broadcast ---
+    lcoe, _ = solar_bess_lcoe_vec(
+        scenarios["Solar_Capacity_MW"], scenarios["BESS_Energy_MWh"], scenarios["availability"],
+        scenarios["solar_capex"], scenarios["bess_capex"], scenarios["solar_opex"], scenarios["bess_opex"],
+        scenarios["discount_rate"], scenarios["solar_lifetime"],
+    )
+    scenarios["LCOE"] = lcoe
+
+    scenarios["Value"] = [
+        r[r["Input"]] if r["Input"] != "base" else np.nan for _, r in scenarios.iterrows()
+    ]
+    base = scenarios[scenarios["Input"] == "base"].set_index("Country")
+    low = scenarios[scenarios["Direction"] == "low"].set_index(["Country", "Input"])
+    high = scenarios[scenarios["Direction"] == "high"].set_index(["Country", "Input"])
+
+    result = pd.DataFrame({
+        "Low_Value": low["Value"], "High_Value": high["Value"],
+        "LCOE_Low": low["LCOE"], "LCOE_High": high["LCOE"],
+    }).reset_index()
+    result.insert(2, "Base_Value", [base.at[c, i] for c, i in zip(result["Country"], result["Input"])])
+    result["LCOE_Base"] = result["Country"].map(base["LCOE"])
+    result["Swing"] = (result["LCOE_High"] - result["LCOE_Low"]).abs()
+    base_key = result["Country"].map(base["key"])
+    result["Resized"] = base_key.notna().to_numpy() & (
+        (low["key"].to_numpy() != base_key.to_numpy()) | (high["key"].to_numpy() != base_key.to_numpy())
+    )
+    return result.sort_values(["Country", "Swing"], ascending=[True, False], na_position="last").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from main import BASE_YEAR, YEARS, PARAM_SPECS, AVAILABILITY, TARGET_COUNTRIES
+    from param_cube import load_cube
+
+    parser = argparse.ArgumentParser(description="Tornado sensitivity of the base-year Solar+BESS LCOE.")
+    parser.add_argument("--countries", nargs="*", default=TARGET_COUNTRIES, help="No names = all countries.")
+    parser.add_argument("--delta", type=float, default=0.1, help="Relative perturbation (0.1 = ±10%%).")
+    parser.add_argument("--year", type=int, default=BASE_YEAR)
+    parser.add_argument("--availability", type=float, default=AVAILABILITY)
+    parser.add_argument("--efficiency", type=float, default=0.9)
+    args = parser.parse_args()
+
+    countries_df = pd.read_csv(os.path.join(INPUT_PATH, "all_country_coordinates_2.csv"))
+    if args.countries:
+        countries_df = countries_df[countries_df["Country"].isin(args.countries)]
+    cube = load_cube(years=sorted(set(YEARS) | {BASE_YEAR}), specs=PARAM_SPECS)
+    params, _ = cube.to_params({"Solar+BESS": SOLAR_BESS_PARAMS}, countries_df["Country"], [args.year])
+
+    start_time = time.time()
+    result = tornado(countries_df, params["Solar+BESS"], args.year, args.delta,
+                     args.availability, args.efficiency)
+    output_file = os.path.join(OUTPUT_PATH, "tornado.csv")
+    result.to_csv(output_file, index=False)
+    print(f"Tornado table for {result['Country'].nunique()} countries in "
+          f"{round(time.time() - start_time, 1)} seconds -> {output_file}")
+    print(result.head(len(INPUTS)))
@@ -0,0 +1,59 @@
+"""
+Solar+BESS sizing cache keys and stores, shared by every module that reuses sizings.
+
+A sizing is keyed by a hash of everything its solve depends on, whatever those
+inputs are for the caller:
+
+  * grid.py         - cell site, solar year, solar/BESS capex, availability, efficiency
+  * sensitivity.py  - profile hash, solar/BESS capex ratio, availability, efficiency
+    and scenarios.py  (the LP is scale-invariant in capex, so the ratio is enough)
+  * main.py         - country site, solar year, solar/BESS capex (incremental and resumed runs)
+
+Finished sizings are appended to a JSONL file, one {"key": ..., ...} object per
+line, so an interrupted run keeps everything solved so far.
+"""
+import hashlib
+import json
+import math
+import numbers
+import os
+
+import numpy as np
+
+
+def _normalise(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    value = float(value)
+    # 12 significant digits: values that differ only by float noise (a recomputed ratio) share a key
+    return None if math.isnan(value) else float(f"{value:.12g}")
+
+
+def sizing_key(*inputs) -> str:
+    """
+    Cache key of one sizing: a stable hash of the inputs its solve depends on.
+
+    Args:
+        *inputs: Numbers and strings; NaN and None hash the same. Round site
+            coordinates before passing them if nearby sites should share a key.
+    """
+    return hashlib.sha1(json.dumps([_normalise(v) for v in inputs]).encode()).hexdigest()
+
+
+def profile_hash(profile) -> str:
+    """Content hash of an hourly profile, for keys of sizings that take the profile itself."""
+    return hashlib.sha1(np.ascontiguousarray(profile, dtype=float).tobytes()).hexdigest()
+
+
+def load_sizing_cache(cache_path) -> dict:
+    """key -> entry for every sizing in the JSONL file at `cache_path` ({} if there is none)."""
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    cache[entry["key"]] = entry
+    return cache
@@ -0,0 +1,215 @@
+"""
+Fast point -> country -> region lookups against the Natural Earth shapefile.
+
+A rasterised country-ID grid (default 0.1 deg) answers most points with one
+array index. Points in raster cells that sit on a border or coastline are
+refined exactly against the polygons with an STRtree. The raster is cached to
+disk, keyed by the shapefile's hash and the resolution, so it is built once.
+
+    index = CountryIndex.load()
+    index.lookup(lats, lons)   # -> Country, ISO_A2, ISO_A3, subregion, continent
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from input_store import file_hash
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+INPUT_PATH = os.path.join(CWD, "..", "inputs")
+SHAPEFILE_PATH = os.path.join(CWD, "..", "visual", "global shape", "ne_110m_admin_0_countries.shp")
+REGION_MAP_PATH = os.path.join(CWD, "..", "mappings", "region_map.csv")
+DEFAULT_CACHE_DIR = os.path.join(CWD, "..", "outputs", "spatial_cache")
+
+NO_COUNTRY = -1
+
+
+def load_country_shapes(shapefile_path=SHAPEFILE_PATH, coordinates_path=None):
+    """
+    Read country polygons from the Natural Earth shapefile.
+
+    Names are taken from `all_country_coordinates_2.csv` (matched on ISO alpha-2)
+    so they line up with the names `get_val` expects; countries missing from
+    that file keep their Natural Earth name.
+
+    Returns:
+        pd.DataFrame: 'Country', 'ISO_A2', 'ISO_A3', Natural Earth 'NE_Subregion' and
+        'NE_Continent', and a shapely 'geometry' column.
+    """
+    import shapefile
+    from shapely.geometry import shape
+
+    coordinates_path = coordinates_path or os.path.join(INPUT_PATH, "all_country_coordinates_2.csv")
+    names = pd.read_csv(coordinates_path, encoding="utf-8-sig").set_index("country")["Country"].to_dict()
+
+    rows = []
+    reader = shapefile.Reader(shapefile_path)
+    for shape_rec in reader.iterShapeRecords():
+        rec = shape_rec.record
+        # ISO_A2 is '-99' for a few countries (e.g. France, Norway); the _EH column fills them in
+        iso2 = rec["ISO_A2_EH"] if rec["ISO_A2"] == "-99" else rec["ISO_A2"]
+        rows.append({
+            "Country": names.get(iso2, rec["ADMIN"]),
+            "ISO_A2": iso2,
+            "ISO_A3": rec["ISO_A3_EH"] if rec["ISO_A3"] == "-99" else rec["ISO_A3"],
+            "NE_Subregion": rec["SUBREGION"],
+            "NE_Continent": rec["CONTINENT"],
+            "geometry": shape(shape_rec.shape.__geo_interface__),
+        })
+    return pd.DataFrame(rows)
+
+
+def _country_regions(countries, region_map_path=REGION_MAP_PATH):
+    """
+    Subregion and continent per country, as used by `reader.get_val` proxy rules.
+
+    `region_map.csv` wins where it has the country; otherwise the Natural Earth
+    SUBREGION/CONTINENT is used and 'region_source' says so.
+    """
+    region_map = pd.read_csv(region_map_path)
+    region_map["key"] = region_map["country"].str.strip().str.lower()
+    region_map = region_map.set_index("key")
+
+    key = countries["Country"].str.strip().str.lower()
+    mapped = key.isin(region_map.index)
+    out = countries[["Country", "ISO_A2", "ISO_A3"]].copy()
+    out["subregion"] = np.where(mapped, key.map(region_map["subregion"]), countries["NE_Subregion"])
+    out["continent"] = np.where(mapped, key.map(region_map["continent"]), countries["NE_Continent"])
+    out["region_source"] = np.where(mapped, "region_map", "natural_earth")
+    return out.reset_index(drop=True)
+
+
+class CountryIndex:
+    """
+    Vectorised point-in-country lookup.
+
+    Attributes:
+        countries (pd.DataFrame): One row per country id (Country, ISO codes, subregion, continent).
+        raster (np.ndarray): int16 country id per cell (rows from -90, columns from -180); -1 is no country.
+        ambiguous (np.ndarray): bool per cell, True where a border/coast crosses it.
+        resolution (float): Cell size in degrees.
+    """
+
+    def __init__(self, countries, geometries, raster, ambiguous, resolution):
+        from shapely import STRtree
+
+        self.countries = countries
+        self.geometries = geometries
+        self.raster = raster
+        self.ambiguous = ambiguous
+        self.resolution = resolution
+        self.tree = STRtree(geometries)
+
+    @classmethod
+    def build(cls, resolution=0.1, shapefile_path=SHAPEFILE_PATH):
+        """Rasterise every country polygon onto a global grid of `resolution` degrees."""
+        import shapely
+
+        shapes = load_country_shapes(shapefile_path)
+        n_rows, n_cols = int(round(180 / resolution)), int(round(360 / resolution))
+        raster = np.full((n_rows, n_cols), NO_COUNTRY, dtype=np.int16)
+        ambiguous = np.zeros((n_rows, n_cols), dtype=bool)
+
+        for country_id, geometry in enumerate(shapes["geometry"]):
+            shapely.prepare(geometry)
+            minx, miny, maxx, maxy = geometry.bounds
+            c0, c1 = int(np.floor((minx + 180) / resolution)), int(np.ceil((maxx + 180) / resolution))
+            r0, r1 = int(np.floor((miny + 90) / resolution)), int(np.ceil((maxy + 90) / resolution))
+            cols, rows = np.meshgrid(np.arange(c0, min(c1, n_cols)), np.arange(r0, min(r1, n_rows)))
+
+            # Cell centres decide the raster value
+            inside = shapely.contains_xy(
+                geometry, (cols + 0.5) * resolution - 180, (rows + 0.5) * resolution - 90
+            )
+            raster[rows[inside], cols[inside]] = country_id
+
+            # Cells the outline passes through need an exact check at lookup time
+            x0, y0 = cols * resolution - 180, rows * resolution - 90
+            boxes = shapely.box(x0.ravel(), y0.ravel(), x0.ravel() + resolution, y0.ravel() + resolution)
+            crosses = shapely.intersects(boxes, geometry.boundary).reshape(cols.shape)
+            ambiguous[rows[crosses], cols[crosses]] = True
+
+        countries = _country_regions(shapes)
+        return cls(countries, shapes["geometry"].to_numpy(), raster, ambiguous, resolution)
+
+    @classmethod
+    def load(cls, resolution=0.1, shapefile_path=SHAPEFILE_PATH, cache_dir=DEFAULT_CACHE_DIR):
+        """Load the cached raster for this shapefile and resolution, building it on first use."""
+        os.makedirs(cache_dir, exist_ok=True)
+        key = f"{file_hash(shapefile_path)[:16]}_{resolution:g}"
+        cache_path = os.path.join(cache_dir, f"country_raster_{key}.npz")
+
+        if os.path.exists(cache_path):
+            cached = np.load(cache_path)
+            shapes = load_country_shapes(shapefile_path)
+            return cls(_country_regions(shapes), shapes["geometry"].to_numpy(),
+                       cached["raster"], cached["ambiguous"], resolution)
+
+        print(f"Building country raster at {resolution} deg (cached afterwards)...")
+        start_time = time.time()
+        index = cls.build(resolution, shapefile_path)
+        np.savez_compressed(cache_path, raster=index.raster, ambiguous=index.ambiguous)
+        print(f"Country raster built in {round(time.time() - start_time, 1)} seconds -> {cache_path}")
+        return index
+
+    def country_ids(self, latitudes, longitudes, nearest=False):
+        """
+        Country id per point (-1 where no country).
+
+        Args:
+            latitudes, longitudes (array-like): Point coordinates in degrees.
+            nearest (bool, optional): Assign points outside every polygon (e.g. just
+                off a coarse coastline) to the nearest country instead of -1.
+        """
+        import shapely
+
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        n_rows, n_cols = self.raster.shape
+        rows = np.clip(((lat + 90) / self.resolution).astype(int), 0, n_rows - 1)
+        cols = np.clip(((lon + 180) / self.resolution).astype(int) % n_cols, 0, n_cols - 1)
+
+        ids = self.raster[rows, cols].astype(np.int32)
+
+        # Exact refinement only where the raster cell straddles an outline
+        check = np.flatnonzero(self.ambiguous[rows, cols])
+        if len(check):
+            points = shapely.points(lon[check], lat[check])
+            ids[check] = NO_COUNTRY
+            point_idx, geom_idx = self.tree.query(points, predicate="intersects")
+            ids[check[point_idx]] = geom_idx
+
+        if nearest:
+            outside = np.flatnonzero(ids == NO_COUNTRY)
+            if len(outside):
+                point_idx, geom_idx = self.tree.query_nearest(shapely.points(lon[outside], lat[outside]))
+                ids[outside[point_idx]] = geom_idx
+        return ids
+
+    def lookup(self, latitudes, longitudes, nearest=False):
+        """
+        Resolve points to country, ISO codes, subregion and continent.
+
+        Returns:
+            pd.DataFrame: One row per point; columns are NaN for points outside every country.
+        """
+        ids = self.country_ids(latitudes, longitudes, nearest=nearest)
+        # Append an all-NaN row and point -1 at it
+        table = pd.concat([self.countries, pd.DataFrame([{}])], ignore_index=True)
+        out = table.iloc[np.where(ids == NO_COUNTRY, len(self.countries), ids)].reset_index(drop=True)
+        out.insert(0, "Country_ID", ids)
+        return out
+
+
+if __name__ == "__main__":
+    index = CountryIndex.load()
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-60, 75, 100_000), rng.uniform(-180, 180, 100_000)
+    start_time = time.time()
+    result = index.lookup(lats, lons)
+    print(f"Resolved {len(lats)} points in {round(time.time() - start_time, 3)} seconds; "
+          f"{int((result['Country_ID'] >= 0).sum())} fall inside a country.")
+    print(result.dropna().head())
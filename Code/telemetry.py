@@ -0,0 +1,162 @@
+"""
+Run-level telemetry: where the time goes, how fast tasks run, and how much memory is used.
+
+A `Telemetry` object collects, for one run,
+
+  * wall time per stage of the main process (`with telemetry.stage("lookup"): ...`)
+  * every sizing task's duration and outcome, with its profile/solve split as
+    measured inside the worker
+  * parameter fallback counts (from the provenance recorder)
+  * worker utilisation (busy task time / (sizing wall time x workers), where
+    workers is the backend's cluster size when sizing runs on Dask or Ray)
+  * peak resident memory of this process, and of the largest local child process
+
+and writes them as one JSON report plus a short console summary, so runs can be
+compared across releases or used to size cluster allocations.
+"""
+import json
+import os
+import platform
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPORT_PATH = os.path.join(CWD, "..", "outputs", "telemetry.json")
+
+SLOWEST = 10
+
+
+def peak_memory_mb() -> dict:
+    """
+    Peak RSS in MB; None where unavailable (Windows).
+
+    'largest_local_child' is the peak of the single largest child process that has
+    exited and been waited for (a pool worker, a CBC run, ...), not a per-worker or
+    total figure, and it never covers workers on other machines.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {"main_process": None, "largest_local_child": None}
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1 / 1024 ** 2 if platform.system() == "Darwin" else 1 / 1024
+    return {
+        "main_process": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+        "largest_local_child": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1),
+    }
+
+
+class Telemetry:
+    """
+    Collects the measurements of one run.
+
+    Args:
+        workers (int): Processes available to the sizing tasks (for utilisation); set
+            from the backend when sizing runs on one.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}
+        self.tasks = []
+        self.reused = 0
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall time of the block to stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record_task(self, name, seconds, ok=True, timings=None):
+        """
+        One finished task.
+
+        Args:
+            timings (dict, optional): Component -> seconds measured inside the task (e.g. profile, solve).
+        """
+        self.tasks.append({"name": name, "seconds": float(seconds), "ok": bool(ok), **(timings or {})})
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, fallbacks=None, rows=None) -> dict:
+        """
+        The telemetry report.
+
+        Args:
+            fallbacks (dict, optional): Parameter lookups per source (direct/proxy/world/missing).
+            rows (int, optional): Output rows produced.
+        """
+        wall = time.perf_counter() - self._t0
+        seconds = np.array([t["seconds"] for t in self.tasks], dtype=float)
+        sizing_wall = self.stages.get("sizing", 0.0)
+        busy = float(seconds.sum())
+
+        solves = {"count": len(self.tasks), "failed": sum(not t["ok"] for t in self.tasks), "reused": self.reused}
+        if len(seconds):
+            solves.update({
+                "mean_s": float(seconds.mean()),
+                **{f"p{q}_s": float(np.percentile(seconds, q)) for q in (50, 90, 99)},
+                "max_s": float(seconds.max()),
+                "slowest": [
+                    {"name": t["name"], "seconds": round(t["seconds"], 3), "ok": t["ok"]}
+                    for t in sorted(self.tasks, key=lambda t: t["seconds"], reverse=True)[:SLOWEST]
+                ],
+            })
+        components = sorted({k for t in self.tasks for k in t} - {"name", "seconds", "ok"})
+
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_seconds": round(wall, 3),
+            "stages": {name: {"seconds": round(s, 3), "share": round(s / wall, 4) if wall else None}
+                       for name, s in self.stages.items()},
+            # Summed over workers, so these can exceed the sizing wall time
+            "task_seconds": {c: round(sum(t.get(c, 0.0) for t in self.tasks), 3) for c in components},
+            "tasks_per_second": round(len(self.tasks) / sizing_wall, 3) if sizing_wall else None,
+            "rows": rows,
+            "rows_per_second": round(rows / wall, 1) if rows is not None and wall else None,
+            "solves": solves,
+            "workers": {
+                "count": self.workers,
+                "busy_seconds": round(busy, 3),
+                "utilisation": round(busy / (sizing_wall * self.workers), 3) if sizing_wall else None,
+            },
+            "fallbacks": fallbacks or {},
+            "counters": self.counters,
+            "peak_memory_mb": peak_memory_mb(),
+        }
+
+    def write(self, report, path=DEFAULT_REPORT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+def print_summary(report):
+    """A few lines of the report for the console."""
+    stages = ", ".join(f"{name} {s['seconds']:.1f}s" for name, s in report["stages"].items())
+    print(f"\nTelemetry: {report['wall_seconds']:.1f}s wall ({stages})")
+    solves = report["solves"]
+    if solves["count"]:
+        print(f"  Sizing: {solves['count']} tasks ({solves['failed']} failed, {solves['reused']} reused), "
+              f"{report['tasks_per_second']} tasks/s, p50 {solves['p50_s']:.2f}s, p90 {solves['p90_s']:.2f}s, "
+              f"max {solves['max_s']:.2f}s; worker utilisation {report['workers']['utilisation']}")
+        print("  Slowest: " + ", ".join(f"{t['name']} {t['seconds']:.2f}s" for t in solves["slowest"][:3]))
+    elif solves["reused"]:
+        print(f"  Sizing: all {solves['reused']} reused, no solves.")
+    if report["fallbacks"]:
+        print("  Parameter lookups: " + ", ".join(f"{k} {v}" for k, v in report["fallbacks"].items()))
+    memory = report["peak_memory_mb"]
+    if memory["main_process"] is not None:
+        print(f"  Peak memory: {memory['main_process']} MB "
+              f"(largest local child process {memory['largest_local_child']} MB)")
@@ -0,0 +1,218 @@
+"""
+Monte Carlo LCOE ranges with the sized capacities held fixed.
+
+Capex, opex, fuel, discount rate and lifetime are scaled by lognormal
+multipliers (mean 1, relative spread `sigma`), optionally correlated through a
+Gaussian copula. The same draws are applied to every country and year (common
+random numbers), so bands are comparable across rows. The LCOE is the
+closed-form annuity formula of `lcoe_vec` over (rows, draws) arrays, chunked
+over rows to bound memory, so tens of thousands of draws for all countries
+take seconds.
+
+    python uncertainty.py --draws 20000          # bands for outputs/lcoe_results.csv
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from lcoe_vec import HOURS_PER_YEAR, annuity_factor, to_frac
+
+# --- Configuration ---
+CWD = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(CWD, "..", "outputs")
+
+FACTORS = ["capex", "opex", "fuel", "discount_rate", "lifetime"]
+# Relative standard deviation of each multiplier
+DEFAULT_SIGMA = {"capex": 0.15, "opex": 0.20, "fuel": 0.25, "discount_rate": 0.20, "lifetime": 0.10}
+# Pairwise correlations of the underlying normals; unlisted pairs are independent
+DEFAULT_CORRELATION = {("capex", "opex"): 0.5}
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def correlation_matrix(correlation: dict = None) -> np.ndarray:
+    """
+    FACTORS x FACTORS correlation matrix from {(factor_a, factor_b): rho}.
+
+    Raises:
+        ValueError: For unknown factors or a matrix that is not positive definite.
+    """
+    corr = np.eye(len(FACTORS))
+    for (a, b), rho in (correlation or {}).items():
+        if a not in FACTORS or b not in FACTORS:
+            raise ValueError(f"Unknown factor in correlation ({a}, {b}); expected one of {FACTORS}")
+        i, j = FACTORS.index(a), FACTORS.index(b)
+        corr[i, j] = corr[j, i] = rho
+    try:
+        np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix is not positive definite") from None
+    return corr
+
+
+def sample_multipliers(draws: int, sigma: dict = None, correlation: dict = None, seed: int = None) -> dict:
+    """
+    Correlated lognormal multipliers with mean 1.
+
+    Returns:
+        dict: factor -> (draws,) array.
+    """
+    sigma = {**DEFAULT_SIGMA, **(sigma or {})}
+    rng = np.random.default_rng(seed)
+    chol = np.linalg.cholesky(correlation_matrix(DEFAULT_CORRELATION if correlation is None else correlation))
+    z = rng.standard_normal((draws, len(FACTORS))) @ chol.T
+    return {
+        factor: np.exp(sigma[factor] * z[:, i] - sigma[factor] ** 2 / 2)
+        for i, factor in enumerate(FACTORS)
+    }
+
+
+def _scaled_rate(discount_rate, multiplier):
+    # Scale the fraction, not a 0–100 input, and keep it a valid fraction
+    return np.clip(to_frac(discount_rate) * multiplier, 0.0, 0.99)
+
+
+def _scaled_lifetime(lifetime, multiplier):
+    return np.maximum(np.asarray(lifetime, dtype=float) * multiplier, 1.0)
+
+
+def _annuity_factors(discount_rate, lifetime, multipliers):
+    """
+    (rows, draws) annuity factors, computed once per distinct (rate, lifetime) pair.
+
+    Rates and lifetimes usually come from a handful of defaults, so this is far
+    cheaper than evaluating the power for every row.
+    """
+    pairs = np.column_stack([to_frac(discount_rate), np.asarray(lifetime, dtype=float)])
+    unique, inverse = np.unique(np.nan_to_num(pairs, nan=-1.0), axis=0, return_inverse=True)
+    af = annuity_factor(
+        _scaled_rate(unique[:, :1], multipliers["discount_rate"][None, :]),
+        _scaled_lifetime(unique[:, 1:], multipliers["lifetime"][None, :]),
+    )
+    return af, inverse.ravel()
+
+
+def _percentiles(samples, percentiles):
+    """`np.percentile(samples, percentiles, axis=1)` (linear), via a full sort, which is faster here."""
+    ordered = np.sort(samples, axis=1)
+    pos = np.asarray(percentiles, dtype=float) / 100 * (samples.shape[1] - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, samples.shape[1] - 1)
+    return ordered[:, lo] + (ordered[:, hi] - ordered[:, lo]) * (pos - lo)
+
+
+def _bands(lcoe_fn, n_rows, percentiles, chunk):
+    """Mean and percentiles over the draws axis of `lcoe_fn(rows)` (an (n, draws) array), chunked over rows."""
+    out = np.full((n_rows, len(percentiles) + 1), np.nan)
+    for start in range(0, n_rows, chunk):
+        rows = slice(start, min(start + chunk, n_rows))
+        samples = lcoe_fn(rows)
+        out[rows, 0] = samples.mean(axis=1)
+        out[rows, 1:] = _percentiles(samples, percentiles)
+    return out
+
+
+def _frame(out, index, percentiles):
+    return pd.DataFrame(out, index=index, columns=["LCOE_mean"] + [f"LCOE_p{p:g}" for p in percentiles])
+
+
+# Both techs use LCOE = capex / (energy * AF) + annual_opex / energy, the `lcoe_vec`
+# formula split so that only the annuity factor needs a (rows, draws) power.
+def solar_bess_bands(params: pd.DataFrame, solar_capacity_mw, bess_capacity_mwh, availability, multipliers: dict,
+                     percentiles=PERCENTILES, chunk: int = 1024) -> pd.DataFrame:
+    """
+    Solar+BESS LCOE mean and percentiles per row of a Solar+BESS parameter frame.
+
+    Rows with a missing parameter are NaN.
+    """
+    p = {k: params[k].to_numpy(dtype=float) for k in params.columns}
+    solar = np.broadcast_to(np.asarray(solar_capacity_mw, dtype=float), len(params))
+    bess = np.broadcast_to(np.asarray(bess_capacity_mwh, dtype=float), len(params))
+    capex = ((solar * p["solar_capex"] + bess * p["bess_capex"]) * 1000)[:, None]
+    opex = ((solar * p["solar_opex"] + bess * p["bess_opex"]) * 1000)[:, None]
+    energy = float(to_frac(availability)) * HOURS_PER_YEAR
+    af, af_row = _annuity_factors(p["discount_rate"], p["solar_lifetime"], multipliers)
+    m_capex, m_opex = multipliers["capex"][None, :], multipliers["opex"][None, :]
+
+    def lcoe(rows):
+        return capex[rows] * m_capex / (energy * af[af_row[rows]]) + opex[rows] * m_opex / energy
+
+    out = _bands(lcoe, len(params), percentiles, chunk)
+    out[~params.notna().all(axis=1).to_numpy()] = np.nan
+    return _frame(out, params.index, percentiles)
+
+
+def conventional_bands(params: pd.DataFrame, multipliers: dict, capacity_mw=1.0,
+                       percentiles=PERCENTILES, chunk: int = 1024) -> pd.DataFrame:
+    """Conventional LCOE mean and percentiles per row of a `conventional_params(tech)` frame."""
+    p = {k: params[k].to_numpy(dtype=float) for k in params.columns}
+    energy = (capacity_mw * HOURS_PER_YEAR * to_frac(p["capacity_factor"]))[:, None]
+    capex = (capacity_mw * 1000 * p["capex_kw"])[:, None]
+    fixed = (capacity_mw * 1000 * p["opex_fixed_kwyr"])[:, None]
+    variable = p["opex_var_mwh"][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fuel = (p["fuel_cost_mwh_fuel"] / to_frac(p["efficiency"]))[:, None]
+    af, af_row = _annuity_factors(p["discount_rate"], p["lifetime"], multipliers)
+    m = {k: v[None, :] for k, v in multipliers.items()}
+
+    def lcoe(rows):
+        return (capex[rows] * m["capex"] / (energy[rows] * af[af_row[rows]])
+                + (fixed[rows] / energy[rows] + variable[rows]) * m["opex"] + fuel[rows] * m["fuel"])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = _bands(lcoe, len(params), percentiles, chunk)
+    out[~params.notna().all(axis=1).to_numpy()] = np.nan
+    return _frame(out, params.index, percentiles)
+
+
+def run_uncertainty(results_df: pd.DataFrame, params: dict, availability: float, draws: int = 10000,
+                    sigma: dict = None, correlation: dict = None, seed: int = None,
+                    percentiles=PERCENTILES) -> pd.DataFrame:
+    """
+    Percentile bands for every row of an `lcoe_results.csv`-style frame.
+
+    Args:
+        results_df (pd.DataFrame): 'Country', 'Year', 'Tech', 'LCOE' and, for Solar+BESS rows,
+            'Solar_Capacity_MW' / 'BESS_Energy_MWh' (held fixed).
+        params (dict): {group: DataFrame indexed by (country, year)} with a group per Tech.
+        draws (int): Monte Carlo draws, shared by every row.
+
+    Returns:
+        pd.DataFrame: 'Country', 'Year', 'Tech', 'LCOE' plus 'LCOE_mean' and 'LCOE_p<q>' columns.
+    """
+    multipliers = sample_multipliers(draws, sigma, correlation, seed)
+    bands = []
+    for tech, rows in results_df.groupby("Tech", sort=False):
+        keys = pd.MultiIndex.from_arrays([rows["Country"], rows["Year"]], names=["country", "year"])
+        tech_params = params[tech].reindex(keys)
+        if tech == "Solar+BESS":
+            band = solar_bess_bands(tech_params, rows["Solar_Capacity_MW"], rows["BESS_Energy_MWh"],
+                                    availability, multipliers, percentiles)
+        else:
+            band = conventional_bands(tech_params, multipliers, percentiles=percentiles)
+        bands.append(pd.concat([rows[["Country", "Year", "Tech", "LCOE"]].reset_index(drop=True),
+                                band.reset_index(drop=True)], axis=1))
+    return pd.concat(bands, ignore_index=True)
+
+
+if __name__ == "__main__":
+    from main import BASE_YEAR, YEARS, PARAM_SPECS, AVAILABILITY
+    from param_cube import load_cube
+
+    parser = argparse.ArgumentParser(description="Monte Carlo LCOE bands for lcoe_results.csv.")
+    parser.add_argument("--draws", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--availability", type=float, default=AVAILABILITY)
+    args = parser.parse_args()
+
+    results_df = pd.read_csv(os.path.join(OUTPUT_PATH, "lcoe_results.csv"))
+    cube = load_cube(years=sorted(set(YEARS) | {BASE_YEAR}), specs=PARAM_SPECS)
+    params, _ = cube.to_params(PARAM_SPECS, results_df["Country"].unique(), sorted(set(YEARS) | {BASE_YEAR}))
+
+    start_time = time.time()
+    bands = run_uncertainty(results_df, params, args.availability, args.draws, seed=args.seed)
+    output_file = os.path.join(OUTPUT_PATH, "lcoe_uncertainty.csv")
+    bands.to_csv(output_file, index=False)
+    print(f"{args.draws} draws for {len(bands)} rows in {round(time.time() - start_time, 2)} seconds -> {output_file}")